@@ -1,8 +1,8 @@
 import requests
-import pandas as pd
 import time
 import re
 import json
+import os
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -10,21 +10,130 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 from fake_useragent import UserAgent
 import logging
+import threading
 from contact_finder import ContactFinder
+from driver_pool import DriverPool
+from browser_policy import get_default_policy
+from list_harvester import ListHarvester
+from browser_extractor import BrowserExtractor, embedded_records
+from http_cache import get_default_cache
+from consent import get_default_consent
+from export_sinks import open_stream, write_excel, WrittenRecords, OUTPUT_DIR, EXHIBITOR_COLUMNS, CONTACT_COLUMNS, DELTA_COLUMNS
+from crawl_state import CrawlState
+from http_session import SessionPool
+from host_scheduler import get_default_scheduler
+from async_fetcher import AsyncFetcher
+from pagination import PaginationCrawler
+from hybrid_fetcher import HybridFetcher
+from xhr_capture import capture_json_responses, discover_endpoint, map_record, record_hash, JsonEndpoint
+from html_parser import make_soup, find_links
+from block_detector import BlockSelector
+from extraction_rules import ExtractionRules, ADVANCED_RULES
+from page_readiness import PageReadiness, EXHIBITOR_READY_SELECTORS, EXHIBITOR_LINK_SELECTORS
+from parse_pool import ParsePool, PageProfile
+from pipeline import Pipeline
+from metrics import get_default_metrics, host_of
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Селекторы блоков участников (компилируются один раз)
+EXHIBITOR_SELECTORS = BlockSelector([
+    '.exhibitor-item',
+    '.aussteller-item',
+    '.company-item',
+    '.exhibitor-card',
+    '.aussteller-card',
+    '[data-exhibitor]',
+    '[class*="exhibitor"]',
+    '[class*="aussteller"]',
+    '[class*="company"]',
+    'article',
+    '.card',
+    '.item'
+])
+
+# Правила извлечения полей участника (компилируются один раз)
+EXHIBITOR_RULES = ExtractionRules(ADVANCED_RULES)
+
+# Разбор страниц каталогов в пуле процессов; для ELTEFA при отсутствии совпадений -
+# повторяющиеся блоки с заголовком и ссылкой или абзацем
+PAGE_PROFILES = {
+    'eltefa': PageProfile(ADVANCED_RULES, EXHIBITOR_SELECTORS.selectors, candidates={
+        'title_tags': ('h1', 'h2', 'h3'),
+        'link_tags': ('a', 'p'),
+        'link_requires_href': False,
+    }),
+    'ihm': PageProfile(ADVANCED_RULES, EXHIBITOR_SELECTORS.selectors),
+}
+
+# Сайты выставок; SCRAPER_ELTEFA_SITE / SCRAPER_IHM_SITE позволяют направить парсер на другой адрес
+# (например, на локальный mock_fair_server.py для нагрузочных прогонов)
+ELTEFA_SITE = os.environ.get('SCRAPER_ELTEFA_SITE', 'https://www.messe-stuttgart.de').rstrip('/')
+IHM_SITE = os.environ.get('SCRAPER_IHM_SITE', 'https://www.ihm.de').rstrip('/')
+
+# Выставки (области состояния обхода)
+FAIRS = ('eltefa', 'ihm')
+
+# Ключевые слова ссылок на каталог участников
+EXHIBITOR_LINK_KEYWORDS = ['aussteller', 'exhibitor', 'teilnehmer']
+
 class AdvancedExhibitionScraper:
-    def __init__(self):
+    def __init__(self, max_drivers=2, incremental=None, capture_api=None, harvest_lists=None, browser_extract=None,
+                 pipeline=None):
         self.ua = UserAgent()
-        self.exhibitors_data = []
-        self.contacts_data = []
+        # Состояние обхода для продолжения прерванного запуска и снимок прошлых запусков
+        self.state = CrawlState(os.path.join(OUTPUT_DIR, 'advanced_state.db'))
+        # Записи сразу пишутся на диск (JSONL и CSV) - при сбое найденные данные сохраняются;
+        # после сбоя файлы дописываются, а не создаются заново (см. restore_from_state)
+        mode = 'a' if self.state.interrupted() else 'w'
+        self.exhibitors_data = open_stream('advanced_exhibitors', EXHIBITOR_COLUMNS, mode)
+        self.contacts_data = open_stream('advanced_contacts', CONTACT_COLUMNS, mode)
+        self.delta_data = open_stream('advanced_delta', DELTA_COLUMNS)  # Изменения относительно прошлого запуска
+        self.written_exhibitors = None  # Записи, оставшиеся в файлах от прерванного запуска
+        self.written_contacts = None
+        # Инкрементальный режим: неизменившиеся участники не извлекаются и не ищутся повторно
+        self.incremental = os.environ.get('SCRAPER_INCREMENTAL') == '1' if incremental is None else incremental
+        # Режим API: каталог загружается через найденный JSON-эндпоинт вместо отрисовки страниц
+        self.capture_api = os.environ.get('SCRAPER_CAPTURE_API') == '1' if capture_api is None else capture_api
+        # Конвейер: контакты ищутся, пока каталоги еще обходятся (SCRAPER_PIPELINE=0 - последовательно)
+        self.use_pipeline = os.environ.get('SCRAPER_PIPELINE', '1') != '0' if pipeline is None else pipeline
+        self.on_exhibitor = None    # Вызывается для каждого нового участника (scope, запись)
         self.contact_finder = ContactFinder()
+        self.resource_policy = get_default_policy()
+        self.driver_pool = DriverPool(self.setup_driver, size=max_drivers)
+        self.readiness = PageReadiness()
+        # Участники извлекаются правилами прямо в браузере - без page_source и повторного разбора HTML
+        browser_extract = os.environ.get('SCRAPER_BROWSER_EXTRACT', '1') != '0' if browser_extract is None else browser_extract
+        self.browser_extractor = BrowserExtractor(EXHIBITOR_RULES, EXHIBITOR_SELECTORS.selectors) if browser_extract else None
+        # Длинные и виртуализированные списки собираются пошаговой прокруткой вместо page_source
+        harvest_lists = os.environ.get('SCRAPER_HARVEST', '1') != '0' if harvest_lists is None else harvest_lists
+        self.harvester = None
+        if harvest_lists:
+            self.harvester = (self.browser_extractor.harvester(EXHIBITOR_READY_SELECTORS) if self.browser_extractor
+                              else ListHarvester(EXHIBITOR_READY_SELECTORS))
+        self.cache = get_default_cache()
+        self.scheduler = get_default_scheduler()
+        self.sessions = SessionPool(cache=self.cache, scheduler=self.scheduler)
+        self.consent = get_default_consent()
+        self.metrics = get_default_metrics()
+        # Сначала обычный HTTP-запрос, браузер - только если в ответе нет нужных данных
+        self.hybrid = HybridFetcher(
+            self.get_page_content,
+            lambda url, **kwargs: self.get_page_content(url, use_selenium=True, **kwargs),
+            path=os.path.join(OUTPUT_DIR, 'advanced_fetch_strategy.json'),
+        )
+        # Страницы участников загружаются параллельно; браузеров одновременно не больше, чем в пуле
+        self.fetcher = AsyncFetcher(self.fetch_exhibitors_page, max_workers=max(4, max_drivers * 2),
+                                    per_host=max(4, max_drivers * 2))
+        # В инкрементальном режиме блоки из снимка не извлекаются правилами
+        self.parse_pool = ParsePool(PAGE_PROFILES, known_hashes=self.state.snapshot_hashes if self.incremental else None)
+        self.paginator = PaginationCrawler(self.fetcher, window=max_drivers, state=self.state)
         
     def setup_driver(self):
         """Настройка веб-драйвера"""
@@ -35,8 +144,6 @@ class AdvancedExhibitionScraper:
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--disable-extensions")
         chrome_options.add_argument("--disable-plugins")
-        chrome_options.add_argument("--disable-images")
-        chrome_options.add_argument("--disable-javascript")
         chrome_options.add_argument("--disable-web-security")
         chrome_options.add_argument("--allow-running-insecure-content")
         chrome_options.add_argument("--disable-features=VizDisplayCompositor")
@@ -44,6 +151,11 @@ class AdvancedExhibitionScraper:
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
         chrome_options.add_argument(f"--user-agent={self.ua.random}")
+        # Изображения, медиа, шрифты и трекеры не загружаются; JavaScript нужен для каталогов
+        self.resource_policy.configure(chrome_options)
+        if self.capture_api:
+            # Журнал сетевых событий нужен для поиска JSON-API каталога
+            chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
         
         try:
             # Попытка использовать webdriver-manager
@@ -61,22 +173,27 @@ class AdvancedExhibitionScraper:
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         return driver
     
-    def get_page_content(self, url, use_selenium=False, wait_time=5):
+    def get_page_content(self, url, use_selenium=False, wait_time=None, ready_selectors=None, harvester=None,
+                         extractor=None):
         """Получение содержимого страницы"""
+        started = time.monotonic()
+        content = None
         try:
             if use_selenium:
-                driver = self.setup_driver()
-                driver.get(url)
-                time.sleep(wait_time)
+                # Отрисованная страница могла остаться в кэше от предыдущего запуска
+                content = self.cache.load_rendered(url)
+                if content is not None:
+                    return content
+                if self.cache.offline:
+                    logger.warning(f"Офлайн-режим: страницы нет в кэше {url}")
+                    return None
                 
-                # Прокручиваем страницу для загрузки динамического контента
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-                driver.execute_script("window.scrollTo(0, 0);")
-                time.sleep(1)
-                
-                content = driver.page_source
-                driver.quit()
+                # Повторы при ошибках браузера через общий планировщик; слот хоста берет render_page
+                content = self.scheduler.run(
+                    url, lambda: self.render_page(url, wait_time, ready_selectors, harvester, extractor), retry_on=(WebDriverException,)
+                )
+                self.metrics.inc('scraper_bytes', len(content.encode('utf-8')), host=host_of(url), source='browser')
+                self.cache.store_rendered(url, content)
                 return content
             else:
                 headers = {
@@ -87,46 +204,183 @@ class AdvancedExhibitionScraper:
                     'Connection': 'keep-alive',
                     'Upgrade-Insecure-Requests': '1',
                 }
-                response = requests.get(url, headers=headers, timeout=30)
-                response.raise_for_status()
-                return response.text
+                # Cookies согласия, полученные для домена раньше, подставляются без разбора баннера
+                content = self.consent.get(self.sessions.get_session(url), url, headers=headers, timeout=30)
+                return content
         except Exception as e:
             logger.error(f"Ошибка при получении страницы {url}: {e}")
+            content = None
+            return None
+        finally:
+            self.metrics.page(url, 'selenium' if use_selenium else 'http', started, content)
+    
+    def render_page(self, url, wait_time=None, ready_selectors=None, harvester=None, extractor=None):
+        """Загрузка страницы в браузере из пула"""
+        # Берем уже запущенный браузер из пула вместо запуска нового
+        with self.driver_pool.lease() as driver:
+            self.resource_policy.apply(driver, url)
+            # Слот хоста берется уже с браузером и только на загрузку и ожидание готовности
+            with self.scheduler.slot(url, kind='browser'):
+                driver.get(url)
+                # Ждем появления нужных элементов или затихания страницы (wait_time - максимум)
+                self.readiness.wait(driver, url, ready_selectors, wait_time)
+            
+            if harvester is not None:
+                # Только элементы списка, собранные по шагам прокрутки; без них - обычная страница
+                content = harvester.harvest_page(driver, url)
+                if content is not None:
+                    return content
+            
+            if extractor is not None:
+                # Записи участников извлекаются в браузере; без блоков - обычная страница
+                content = extractor.extract_page(driver, url)
+                if content is not None:
+                    return content
+            
+            # Прокручиваем страницу для загрузки динамического контента
+            self.readiness.scroll_and_wait(driver, url, wait_time)
+            
+            return driver.page_source
+    
+    def fetch_exhibitors_page(self, url):
+        """Загрузка страницы со списком участников (браузер - только если без него блоков нет)"""
+        return self.hybrid.fetch(url, self.has_exhibitor_blocks, ready_selectors=EXHIBITOR_READY_SELECTORS,
+                                 harvester=self.harvester, extractor=self.browser_extractor)
+    
+    def fetch_main_page(self, url):
+        """Загрузка главной страницы выставки (браузер - только если без него нет ссылок на участников)"""
+        return self.hybrid.fetch(url, self.has_exhibitor_links, ready_selectors=EXHIBITOR_LINK_SELECTORS)
+    
+    def has_exhibitor_blocks(self, content):
+        """Есть ли на странице хотя бы один блок участника с названием"""
+        records = embedded_records(content)
+        if records is not None:
+            return any(record['fields'] for record in records)
+        soup = make_soup(content)
+        for _, blocks in EXHIBITOR_SELECTORS.select(soup):
+            if any(EXHIBITOR_RULES.extract_field(block, 'Name') for block in blocks):
+                return True
+        return False
+    
+    def has_exhibitor_links(self, content):
+        """Есть ли на странице ссылки на каталог участников"""
+        for link_text, href in find_links(content):
+            text = f"{link_text} {href}".lower()
+            if any(keyword in text for keyword in EXHIBITOR_LINK_KEYWORDS):
+                return True
+        return False
+    
+    def discover_api(self, scope, url):
+        """Поиск JSON-API каталога: одна загрузка страницы в браузере с записью XHR"""
+        # Результат поиска (в том числе отрицательный) сохраняется в состоянии обхода
+        key = f"{scope}:api:{url}"
+        saved = self.state.get_meta(key)
+        if saved is not None:
+            return JsonEndpoint.from_dict(saved) if saved else None
+        
+        try:
+            endpoint = self.scheduler.run(url, lambda: self.capture_endpoint(url), retry_on=(WebDriverException,))
+        except Exception as e:
+            logger.warning(f"Не удалось записать XHR-запросы {url}: {e}")
             return None
+        
+        self.state.set_meta(key, endpoint.to_dict() if endpoint else {})
+        return endpoint
+    
+    def capture_endpoint(self, url):
+        """Загрузка страницы в браузере и выбор эндпоинта по перехваченным JSON-ответам"""
+        with self.driver_pool.lease() as driver:
+            driver.get_log('performance')  # Сбрасываем события предыдущих страниц
+            self.resource_policy.apply(driver, url)
+            with self.scheduler.slot(url, kind='browser'):
+                driver.get(url)
+                self.readiness.wait(driver, url, EXHIBITOR_READY_SELECTORS)
+            # Прокрутка вызывает запрос следующей страницы - по нему видно параметры выдачи
+            self.readiness.scroll_and_wait(driver, url)
+            return discover_endpoint(capture_json_responses(driver))
+    
+    def scrape_api(self, scope, endpoint):
+        """Загрузка всего каталога через JSON-API без браузера; возвращает число записей"""
+        session = self.sessions.get_session(endpoint.url)
+        count = 0
+        for records in endpoint.pages(session, headers={'User-Agent': self.ua.random}):
+            for record in records:
+                count += 1
+                exhibitor = map_record(record)
+                if exhibitor['Name'] and self.add_exhibitor(scope, exhibitor, record_hash(record)):
+                    logger.info(f"Добавлен участник: {exhibitor['Name']}")
+        logger.info(f"Через API {endpoint.url} получено записей: {count}")
+        return count
+    
+    def scrape_api_directories(self, scope, exhibitor_urls):
+        """Каталоги, для которых найден JSON-API, загружаются через него; возвращает остальные URL"""
+        remaining = []
+        collected = set()
+        for url in exhibitor_urls:
+            endpoint = self.discover_api(scope, url)
+            if endpoint is None:
+                remaining.append(url)
+            elif endpoint.key in collected or self.scrape_api(scope, endpoint):
+                collected.add(endpoint.key)
+            else:
+                remaining.append(url)
+        return remaining
     
     def scrape_eltefa_advanced(self):
         """Продвинутый парсинг выставки ELTEFA"""
         logger.info("Начинаем продвинутый парсинг ELTEFA...")
         
+        # Ссылки на каталоги, найденные в прерванном запуске, повторно не ищутся
+        exhibitor_urls = self.state.get_meta('eltefa:directory')
+        if exhibitor_urls is None:
+            exhibitor_urls = self.find_eltefa_exhibitor_urls()
+            if exhibitor_urls is None:
+                return
+            self.state.set_meta('eltefa:directory', exhibitor_urls)
+        
+        # Каталоги с JSON-API загружаются постранично без отрисовки HTML
+        if self.capture_api:
+            exhibitor_urls = self.scrape_api_directories('eltefa', exhibitor_urls)
+        
+        # Парсим каждую найденную страницу и все страницы их каталогов
+        # Страницы загружаются параллельно (requests или браузеры из пула), участники добавляются по мере загрузки
+        # HTML разбирается в пуле процессов, в этот процесс возвращаются только записи
+        parse = self.parse_pool.parser('eltefa', 'eltefa')
+        for url, page in self.paginator.crawl(exhibitor_urls, scope='eltefa', parse=parse):
+            logger.info(f"Парсим страницу: {url}")
+            self.scrape_eltefa_exhibitors_page(url, page)
+        
+        # Выставка обработана полностью - при продолжении запуска не повторяется
+        self.state.mark_done('eltefa')
+    
+    def find_eltefa_exhibitor_urls(self):
+        """Поиск ссылок на каталоги участников ELTEFA (None, если главная страница недоступна)"""
         # Основная страница
-        main_url = "https://www.messe-stuttgart.de/eltefa/?hl=de-DE"
-        content = self.get_page_content(main_url, use_selenium=True)
+        main_url = f"{ELTEFA_SITE}/eltefa/?hl=de-DE"
+        content = self.fetch_main_page(main_url)
         if not content:
-            return
-        
-        soup = BeautifulSoup(content, 'html.parser')
+            return None
         
         # Ищем различные варианты ссылок на участников
         exhibitor_urls = []
         
-        # Поиск по тексту ссылок
-        links = soup.find_all('a', href=True)
-        for link in links:
-            link_text = link.get_text(strip=True).lower()
+        # Поиск по тексту ссылок (быстрый XPath-путь без построения soup)
+        links = find_links(content)
+        for link_text, href in links:
+            link_text = link_text.lower()
             if any(keyword in link_text for keyword in ['aussteller', 'exhibitor', 'teilnehmer', 'teilnehmen']):
-                href = link['href']
                 if not href.startswith('http'):
-                    href = f"https://www.messe-stuttgart.de{href}"
+                    href = f"{ELTEFA_SITE}{href}"
                 exhibitor_urls.append(href)
         
         # Поиск по URL
-        for link in links:
-            href = link['href'].lower()
-            if any(keyword in href for keyword in ['aussteller', 'exhibitor', 'teilnehmer']):
-                if not link['href'].startswith('http'):
-                    full_url = f"https://www.messe-stuttgart.de{link['href']}"
+        for _, link_href in links:
+            href = link_href.lower()
+            if any(keyword in href for keyword in EXHIBITOR_LINK_KEYWORDS):
+                if not link_href.startswith('http'):
+                    full_url = f"{ELTEFA_SITE}{link_href}"
                 else:
-                    full_url = link['href']
+                    full_url = link_href
                 if full_url not in exhibitor_urls:
                     exhibitor_urls.append(full_url)
         
@@ -140,89 +394,65 @@ class AdvancedExhibitionScraper:
                 "/exhibitors/"
             ]
             for path in standard_paths:
-                test_url = f"https://www.messe-stuttgart.de{path}"
+                test_url = f"{ELTEFA_SITE}{path}"
                 exhibitor_urls.append(test_url)
         
-        # Парсим каждую найденную страницу
-        for url in exhibitor_urls[:3]:  # Ограничиваем количество для демонстрации
-            logger.info(f"Парсим страницу: {url}")
-            self.scrape_eltefa_exhibitors_page(url)
+        return exhibitor_urls
     
-    def scrape_eltefa_exhibitors_page(self, url):
-        """Парсинг страницы участников ELTEFA"""
-        content = self.get_page_content(url, use_selenium=True, wait_time=8)
-        if not content:
-            return
-        
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        # Различные селекторы для поиска участников
-        exhibitor_selectors = [
-            '.exhibitor-item',
-            '.aussteller-item',
-            '.company-item',
-            '.exhibitor-card',
-            '.aussteller-card',
-            '[data-exhibitor]',
-            '[class*="exhibitor"]',
-            '[class*="aussteller"]',
-            '[class*="company"]',
-            'article',
-            '.card',
-            '.item'
-        ]
-        
-        exhibitor_blocks = []
-        for selector in exhibitor_selectors:
-            blocks = soup.select(selector)
-            if blocks:
-                exhibitor_blocks.extend(blocks)
-                logger.info(f"Найдено {len(blocks)} блоков с селектором: {selector}")
-        
-        # Если не нашли по селекторам, ищем по структуре
-        if not exhibitor_blocks:
-            # Ищем повторяющиеся блоки
-            all_divs = soup.find_all('div')
-            for div in all_divs:
-                if div.find('h1') or div.find('h2') or div.find('h3'):
-                    if div.find('a') or div.find('p'):
-                        exhibitor_blocks.append(div)
-        
-        # Ограничиваем количество для демонстрации
-        exhibitor_blocks = exhibitor_blocks[:20]
-        
-        for block in exhibitor_blocks:
-            try:
-                exhibitor_data = self.extract_exhibitor_data(block)
-                if exhibitor_data and exhibitor_data['Name']:
-                    self.exhibitors_data.append(exhibitor_data)
-                    logger.info(f"Добавлен участник: {exhibitor_data['Name']}")
-                    
-            except Exception as e:
-                logger.error(f"Ошибка при парсинге участника: {e}")
+    def scrape_eltefa_exhibitors_page(self, url, page=None):
+        """Парсинг страницы участников ELTEFA (page - результат пула разбора)"""
+        if page is None:
+            content = self.fetch_exhibitors_page(url)
+            if not content:
+                return
+            page = self.parse_pool.parse('eltefa', url, content, 'eltefa')
+        
+        # Блоки найдены и извлечены в пуле разбора (или правилами в браузере) - здесь только запись
+        self.add_records('eltefa', page['records'])
     
     def scrape_ihm_advanced(self):
         """Продвинутый парсинг выставки IHM"""
         logger.info("Начинаем продвинутый парсинг IHM...")
         
+        # Ссылки на каталоги, найденные в прерванном запуске, повторно не ищутся
+        exhibitor_urls = self.state.get_meta('ihm:directory')
+        if exhibitor_urls is None:
+            exhibitor_urls = self.find_ihm_exhibitor_urls()
+            if exhibitor_urls is None:
+                return
+            self.state.set_meta('ihm:directory', exhibitor_urls)
+        
+        # Каталоги с JSON-API загружаются постранично без отрисовки HTML
+        if self.capture_api:
+            exhibitor_urls = self.scrape_api_directories('ihm', exhibitor_urls)
+        
+        # Парсим каждую найденную страницу и все страницы их каталогов
+        # Страницы загружаются параллельно (requests или браузеры из пула), участники добавляются по мере загрузки
+        # HTML разбирается в пуле процессов, в этот процесс возвращаются только записи
+        parse = self.parse_pool.parser('ihm', 'ihm')
+        for url, page in self.paginator.crawl(exhibitor_urls, scope='ihm', parse=parse):
+            logger.info(f"Парсим страницу: {url}")
+            self.scrape_ihm_exhibitors_page(url, page)
+        
+        # Выставка обработана полностью - при продолжении запуска не повторяется
+        self.state.mark_done('ihm')
+    
+    def find_ihm_exhibitor_urls(self):
+        """Поиск ссылок на каталоги участников IHM (None, если главная страница недоступна)"""
         # Основная страница
-        main_url = "https://www.ihm.de/en/home?hl=de-DE"
-        content = self.get_page_content(main_url, use_selenium=True)
+        main_url = f"{IHM_SITE}/en/home?hl=de-DE"
+        content = self.fetch_main_page(main_url)
         if not content:
-            return
-        
-        soup = BeautifulSoup(content, 'html.parser')
+            return None
         
         # Ищем ссылки на участников
         exhibitor_urls = []
         
-        links = soup.find_all('a', href=True)
-        for link in links:
-            link_text = link.get_text(strip=True).lower()
-            if any(keyword in link_text for keyword in ['aussteller', 'exhibitor', 'teilnehmer']):
-                href = link['href']
+        for link_text, href in find_links(content):
+            link_text = link_text.lower()
+            if any(keyword in link_text for keyword in EXHIBITOR_LINK_KEYWORDS):
                 if not href.startswith('http'):
-                    href = f"https://www.ihm.de{href}"
+                    href = f"{IHM_SITE}{href}"
                 exhibitor_urls.append(href)
         
         # Стандартные пути для IHM
@@ -235,84 +465,45 @@ class AdvancedExhibitionScraper:
                 "/de/aussteller/"
             ]
             for path in standard_paths:
-                test_url = f"https://www.ihm.de{path}"
+                test_url = f"{IHM_SITE}{path}"
                 exhibitor_urls.append(test_url)
         
-        # Парсим каждую найденную страницу
-        for url in exhibitor_urls[:3]:
-            logger.info(f"Парсим страницу: {url}")
-            self.scrape_ihm_exhibitors_page(url)
+        return exhibitor_urls
     
-    def scrape_ihm_exhibitors_page(self, url):
-        """Парсинг страницы участников IHM"""
-        content = self.get_page_content(url, use_selenium=True, wait_time=8)
-        if not content:
-            return
-        
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        # Селекторы для IHM
-        exhibitor_selectors = [
-            '.exhibitor-item',
-            '.aussteller-item',
-            '.company-item',
-            '.exhibitor-card',
-            '.aussteller-card',
-            '[data-exhibitor]',
-            '[class*="exhibitor"]',
-            '[class*="aussteller"]',
-            '[class*="company"]',
-            'article',
-            '.card',
-            '.item'
-        ]
-        
-        exhibitor_blocks = []
-        for selector in exhibitor_selectors:
-            blocks = soup.select(selector)
-            if blocks:
-                exhibitor_blocks.extend(blocks)
-                logger.info(f"Найдено {len(blocks)} блоков с селектором: {selector}")
-        
-        # Ограничиваем количество для демонстрации
-        exhibitor_blocks = exhibitor_blocks[:20]
-        
-        for block in exhibitor_blocks:
+    def scrape_ihm_exhibitors_page(self, url, page=None):
+        """Парсинг страницы участников IHM (page - результат пула разбора)"""
+        if page is None:
+            content = self.fetch_exhibitors_page(url)
+            if not content:
+                return
+            page = self.parse_pool.parse('ihm', url, content, 'ihm')
+        
+        # Блоки найдены и извлечены в пуле разбора (или правилами в браузере) - здесь только запись
+        self.add_records('ihm', page['records'])
+    
+    def add_records(self, scope, records):
+        """Добавление записей (поля, хэш блока) из пула разбора"""
+        for exhibitor_data, content_hash in records:
             try:
-                exhibitor_data = self.extract_exhibitor_data(block)
-                if exhibitor_data and exhibitor_data['Name']:
-                    self.exhibitors_data.append(exhibitor_data)
+                # В инкрементальном режиме блок с тем же текстом берется из снимка
+                # (пул разбора такие блоки не извлекает; отпечаток записей из браузера совпадает с block_hash)
+                if self.incremental:
+                    snapshot = self.state.unchanged_exhibitor(scope, content_hash)
+                    if snapshot is not None:
+                        exhibitor_data = snapshot
+                # Участники, записанные до перезапуска, повторно не добавляются
+                if exhibitor_data and exhibitor_data['Name'] and self.add_exhibitor(scope, exhibitor_data, content_hash):
                     logger.info(f"Добавлен участник: {exhibitor_data['Name']}")
                     
             except Exception as e:
-                logger.error(f"Ошибка при парсинге участника: {e}")
+                logger.error(f"Ошибка при добавлении участника: {e}")
     
     def extract_exhibitor_data(self, element):
         """Извлечение данных участника из элемента"""
         try:
-            # Извлечение названия компании
-            name = self.extract_company_name(element)
-            
-            # Извлечение города
-            city = self.extract_city(element)
-            
-            # Извлечение страны
-            country = self.extract_country(element)
-            
-            # Извлечение веб-сайта
-            website = self.extract_website(element)
-            
-            # Извлечение email
-            email = self.extract_email(element)
-            
-            if name:
-                return {
-                    'Name': name.strip(),
-                    'City': city.strip() if city else '',
-                    'Country': country.strip() if country else '',
-                    'Website': website if website else '',
-                    'Email': email if email else ''
-                }
+            # Все поля извлекаются за один проход: текст блока считается один раз для всех правил
+            with self.metrics.stage('extract'):
+                return EXHIBITOR_RULES.extract(element)
             
         except Exception as e:
             logger.error(f"Ошибка при извлечении данных участника: {e}")
@@ -321,112 +512,105 @@ class AdvancedExhibitionScraper:
     
     def extract_company_name(self, element):
         """Извлечение названия компании"""
-        # Приоритетные селекторы для названия
-        name_selectors = [
-            'h1', 'h2', 'h3', 'h4',
-            '.company-name', '.exhibitor-name', '.name',
-            '.title', '.headline',
-            '[data-name]', '[data-company]',
-            'strong', 'b'
-        ]
-        
-        for selector in name_selectors:
-            found = element.select_one(selector)
-            if found and found.get_text(strip=True):
-                text = found.get_text(strip=True)
-                if len(text) > 2 and len(text) < 100:  # Фильтруем слишком короткие и длинные тексты
-                    return text
-        
-        # Если не нашли по селекторам, ищем первый значимый текст
-        text_elements = element.find_all(['p', 'span', 'div'], recursive=False)
-        for text_elem in text_elements:
-            text = text_elem.get_text(strip=True)
-            if text and len(text) > 3 and len(text) < 50:
-                return text
-        
-        return None
+        return EXHIBITOR_RULES.extract_field(element, 'Name')
     
     def extract_city(self, element):
         """Извлечение города"""
-        # Селекторы для города
-        city_selectors = [
-            '.city', '.location', '.place',
-            '[data-city]', '[data-location]',
-            '.address', '.location-info'
-        ]
-        
-        for selector in city_selectors:
-            found = element.select_one(selector)
-            if found and found.get_text(strip=True):
-                return found.get_text(strip=True)
-        
-        # Поиск по тексту
-        text = element.get_text()
-        # Простой паттерн для поиска города (заглавная буква + строчные)
-        city_pattern = r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b'
-        cities = re.findall(city_pattern, text)
-        
-        # Фильтруем известные города Германии
-        german_cities = ['Berlin', 'Hamburg', 'Munich', 'Cologne', 'Frankfurt', 'Stuttgart', 
-                        'Düsseldorf', 'Dortmund', 'Essen', 'Leipzig', 'Bremen', 'Dresden',
-                        'Hannover', 'Nuremberg', 'Duisburg', 'Bochum', 'Wuppertal', 'Bielefeld']
-        
-        for city in cities:
-            if city in german_cities:
-                return city
-        
-        return None
+        return EXHIBITOR_RULES.extract_field(element, 'City') or None
     
     def extract_country(self, element):
         """Извлечение страны"""
-        # Селекторы для страны
-        country_selectors = [
-            '.country', '.nation',
-            '[data-country]', '[data-nation]'
-        ]
-        
-        for selector in country_selectors:
-            found = element.select_one(selector)
-            if found and found.get_text(strip=True):
-                return found.get_text(strip=True)
-        
-        # Поиск по тексту
-        text = element.get_text()
-        countries = ['Germany', 'Deutschland', 'USA', 'United States', 'UK', 'United Kingdom',
-                    'France', 'Italy', 'Spain', 'Netherlands', 'Belgium', 'Switzerland', 'Austria']
-        
-        for country in countries:
-            if country.lower() in text.lower():
-                return country
-        
-        return 'Germany'  # По умолчанию для немецких выставок
+        return EXHIBITOR_RULES.extract_field(element, 'Country')
     
     def extract_website(self, element):
         """Извлечение веб-сайта"""
-        # Ищем ссылки
-        links = element.find_all('a', href=True)
-        for link in links:
-            href = link['href']
-            if href.startswith('http') and not any(domain in href for domain in ['messe-stuttgart.de', 'ihm.de']):
-                return href
-        
-        # Ищем в тексте
-        text = element.get_text()
-        url_pattern = r'https?://[^\s<>"]+'
-        urls = re.findall(url_pattern, text)
-        
-        for url in urls:
-            if not any(domain in url for domain in ['messe-stuttgart.de', 'ihm.de']):
-                return url
-        
-        return None
+        return EXHIBITOR_RULES.extract_field(element, 'Website') or None
     
     def extract_email(self, element):
         """Извлечение email"""
-        text = element.get_text()
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        return emails[0] if emails else None
+        return EXHIBITOR_RULES.extract_field(element, 'Email') or None
+    
+    def add_exhibitor(self, scope, exhibitor, content_hash=None):
+        """Запись участника; False, если он уже был сохранен до перезапуска"""
+        if not self.state.add_exhibitor(scope, exhibitor, content_hash):
+            return False
+        self.exhibitors_data.append(exhibitor)
+        if self.on_exhibitor:
+            self.on_exhibitor(scope, exhibitor)
+        return True
+    
+    def add_contacts(self, company_name, contacts):
+        """Запись найденных контактов компании"""
+        for contact in contacts:
+            record = {
+                'Company Name': company_name,
+                'Full Name': contact.get('name', ''),
+                'Position': contact.get('position', ''),
+                'Email': contact.get('email', ''),
+                'Source': contact.get('source', '')
+            }
+            if self.written_contacts is None or not self.written_contacts.take(record):
+                self.contacts_data.append(record)
+    
+    def companies_to_search(self):
+        """Компании, для которых нужен поиск контактов
+        
+        Поиски, выполненные до перезапуска, пропускаются; в инкрементальном режиме
+        контакты неизменившихся компаний берутся из снимка прошлого запуска.
+        """
+        for exhibitor, scope, change in self.state.exhibitor_changes():
+            company = self.company_to_search(exhibitor, scope, change)
+            if company:
+                yield company
+    
+    def company_to_search(self, exhibitor, scope, change):
+        """(компания, сайт) для поиска контактов или None, если искать не нужно"""
+        company_name = exhibitor['Name']
+        if self.state.get_contacts(company_name) is not None:
+            return None
+        if self.incremental and change == 'unchanged':
+            contacts = self.state.snapshot_contacts(scope, exhibitor)
+            if contacts is not None:
+                self.state.store_contacts(company_name, exhibitor.get('Website'), contacts)
+                self.add_contacts(company_name, contacts)
+                return None
+        return company_name, exhibitor.get('Website')
+    
+    def write_changes(self):
+        """Запись изменений относительно прошлого запуска
+        
+        В инкрементальном режиме к результатам добавляются участники выставок, не
+        обработанных в этом запуске, - получается объединенный снимок.
+        Возвращает список полностью обработанных выставок.
+        """
+        done_scopes = [scope for scope in FAIRS if self.state.is_done(scope)]
+        if self.incremental:
+            for exhibitor, contacts in self.state.carried_over(done_scopes):
+                if self.written_exhibitors is None or not self.written_exhibitors.take(exhibitor):
+                    self.exhibitors_data.append(exhibitor)
+                self.add_contacts(exhibitor['Name'], contacts)
+        for change in self.state.delta(done_scopes):
+            self.delta_data.append(change)
+        logger.info(f"Изменений относительно прошлого запуска: {len(self.delta_data)}")
+        return done_scopes
+    
+    def restore_from_state(self):
+        """Перенос результатов прерванного запуска в файлы вывода
+
+        Файлы открыты на дописывание: записи, которые прерванный запуск успел
+        сохранить, остаются на месте, дописываются только недостающие.
+        """
+        self.written_exhibitors = WrittenRecords(self.exhibitors_data)
+        self.written_contacts = WrittenRecords(self.contacts_data)
+        kept = len(self.exhibitors_data)
+        for exhibitor in self.state.exhibitors():
+            if not self.written_exhibitors.take(exhibitor):
+                self.exhibitors_data.append(exhibitor)
+            contacts = self.state.get_contacts(exhibitor['Name'])
+            if contacts:
+                self.add_contacts(exhibitor['Name'], contacts)
+        logger.info(f"Восстановлено {len(self.exhibitors_data)} участников и {len(self.contacts_data)} контактов "
+                    f"(из файлов прерванного запуска: {kept})")
     
     def search_contacts(self, company_name, website_url=None):
         """Поиск контактных лиц для компании"""
@@ -441,58 +625,114 @@ class AdvancedExhibitionScraper:
                 logger.warning("Нет данных для сохранения")
                 return
             
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                # Сохраняем данные участников
-                if self.exhibitors_data:
-                    df_exhibitors = pd.DataFrame(self.exhibitors_data)
-                    df_exhibitors.to_excel(writer, sheet_name='Exhibitors', index=False)
-                    logger.info(f"Сохранено {len(self.exhibitors_data)} участников")
-                else:
-                    # Создаем пустой лист с заголовками
-                    df_exhibitors = pd.DataFrame(columns=['Name', 'City', 'Country', 'Website', 'Email'])
-                    df_exhibitors.to_excel(writer, sheet_name='Exhibitors', index=False)
-                    logger.info("Создан пустой лист участников")
-                
-                # Сохраняем данные контактов
-                if self.contacts_data:
-                    df_contacts = pd.DataFrame(self.contacts_data)
-                    df_contacts.to_excel(writer, sheet_name='Contacts', index=False)
-                    logger.info(f"Сохранено {len(self.contacts_data)} контактов")
-                else:
-                    # Создаем пустой лист с заголовками
-                    df_contacts = pd.DataFrame(columns=['Company Name', 'Full Name', 'Position', 'Email', 'Source'])
-                    df_contacts.to_excel(writer, sheet_name='Contacts', index=False)
-                    logger.info("Создан пустой лист контактов")
-            
+            # Книга собирается построчно из файлов потока, данные целиком в память не загружаются
+            with self.metrics.stage('export', len(self.exhibitors_data) + len(self.contacts_data)):
+                write_excel(filename, [
+                    ('Exhibitors', self.exhibitors_data, EXHIBITOR_COLUMNS),
+                    ('Contacts', self.contacts_data, CONTACT_COLUMNS),
+                    ('Changes', self.delta_data, DELTA_COLUMNS),
+                ])
+            logger.info(f"Сохранено {len(self.exhibitors_data)} участников")
+            logger.info(f"Сохранено {len(self.contacts_data)} контактов")
             logger.info(f"Данные сохранены в файл: {filename}")
             
         except Exception as e:
             logger.error(f"Ошибка при сохранении файла: {e}")
     
+    def run_pipeline(self):
+        """Обход выставок и поиск контактов конвейером
+
+        Стадии: выставки (поиск каталога, загрузка и разбор страниц) -> поиск
+        контактов -> запись. Очереди между стадиями ограничены: если поиск
+        контактов не успевает, обход каталогов ждет, и память не растет.
+        Браузеры закрываются, как только обход каталогов закончен.
+        """
+        pipeline = Pipeline('advanced')
+        pipeline.stage('fairs', self.scrape_fair, workers=len(FAIRS), on_done=self.close_pools)
+        pipeline.stage('contacts', self.find_contacts, workers=self.contact_finder.max_workers)
+        pipeline.stage('export', self.store_found_contacts)
+        
+        # Компания может встретиться на обеих выставках - в очередь она попадает один раз
+        queued = set()
+        lock = threading.Lock()
+        
+        def queue_contacts(scope, exhibitor):
+            company = self.company_to_search(exhibitor, scope, self.state.exhibitor_change(scope, exhibitor))
+            if not company:
+                return
+            with lock:
+                if company[0] in queued:
+                    return
+                queued.add(company[0])
+            pipeline.put('contacts', company)
+        
+        self.on_exhibitor = queue_contacts
+        try:
+            pipeline.run([fair for fair in FAIRS if not self.state.is_done(fair)])
+        finally:
+            self.on_exhibitor = None
+    
+    def scrape_fair(self, fair):
+        """Парсинг одной выставки (стадия конвейера)"""
+        {'eltefa': self.scrape_eltefa_advanced, 'ihm': self.scrape_ihm_advanced}[fair]()
+    
+    def find_contacts(self, company):
+        """Поиск контактов компании (стадия конвейера)"""
+        company_name, website_url = company
+        logger.info(f"Поиск контактов для: {company_name}")
+        return [(company_name, website_url, self.contact_finder.find_contacts_for_company(company_name, website_url))]
+    
+    def store_found_contacts(self, result):
+        """Запись найденных контактов (стадия конвейера)"""
+        company_name, website_url, contacts = result
+        self.state.store_contacts(company_name, website_url, contacts)
+        self.add_contacts(company_name, contacts)
+    
+    def close_pools(self):
+        """Браузеры и процессы разбора больше не нужны - закрываем пулы"""
+        self.driver_pool.close()
+        self.parse_pool.close()
+    
     def run(self):
         """Запуск продвинутого парсинга"""
         logger.info("Начинаем продвинутый парсинг выставок...")
         
-        # Парсим ELTEFA
-        self.scrape_eltefa_advanced()
-        
-        # Парсим IHM
-        self.scrape_ihm_advanced()
+        # Прерванный запуск продолжается с места остановки
+        if self.state.begin_run():
+            self.restore_from_state()
         
-        # Поиск контактов для каждой компании
-        for exhibitor in self.exhibitors_data:
-            contacts = self.search_contacts(exhibitor['Name'], exhibitor.get('Website'))
-            for contact in contacts:
-                self.contacts_data.append({
-                    'Company Name': exhibitor['Name'],
-                    'Full Name': contact.get('name', ''),
-                    'Position': contact.get('position', ''),
-                    'Email': contact.get('email', ''),
-                    'Source': contact.get('source', '')
-                })
+        try:
+            if self.use_pipeline:
+                # Выставки обходятся параллельно, контакты ищутся по мере появления участников
+                self.run_pipeline()
+            else:
+                # Парсим ELTEFA
+                if not self.state.is_done('eltefa'):
+                    self.scrape_eltefa_advanced()
+                
+                # Парсим IHM
+                if not self.state.is_done('ihm'):
+                    self.scrape_ihm_advanced()
+        finally:
+            self.close_pools()
+        
+        # Поиск контактов параллельно, результаты приходят по мере готовности
+        # (уже выполненные поиски и неизменившиеся компании пропускаются;
+        # в режиме конвейера остаются только участники, записанные до перезапуска)
+        for company_name, website_url, contacts in self.contact_finder.find_contacts_for_companies(self.companies_to_search()):
+            self.state.store_contacts(company_name, website_url, contacts)
+            self.add_contacts(company_name, contacts)
+        
+        # Изменения и объединенный снимок
+        done_scopes = self.write_changes()
         
         # Сохраняем результаты
         self.save_to_excel()
+        self.state.commit_snapshot(done_scopes)
+        self.state.finish_run()
+        
+        # Счетчики и задержки по хостам и стадиям для мониторинга
+        self.metrics.write()
 
 if __name__ == "__main__":
     scraper = AdvancedExhibitionScraper()
@@ -0,0 +1,65 @@
+"""
+Асинхронный движок загрузки страниц с ограничениями по хостам
+"""
+
+import asyncio
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFetcher:
+    """Параллельная загрузка списка URL через синхронную функцию парсера"""
+
+    def __init__(self, fetch, max_workers=8, per_host=2, delay=0.5):
+        self.fetch = fetch            # Функция url -> content (например, get_page_content парсера)
+        self.max_workers = max_workers
+        self.per_host = per_host      # Одновременных запросов к одному хосту
+        self.delay = delay            # Минимальная пауза между запросами к одному хосту (вежливость)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+
+    def fetch_all(self, urls, fetch=None):
+        """Загрузка всех URL; возвращает список (url, content) в исходном порядке"""
+        urls = list(dict.fromkeys(urls))  # Убираем дубликаты, сохраняя порядок
+        if not urls:
+            return []
+        return asyncio.run(self.fetch_all_async(urls, fetch or self.fetch))
+
+    async def fetch_all_async(self, urls, fetch):
+        """Асинхронная загрузка с ограничением параллельности и паузами по хостам"""
+        semaphores = {}
+        host_locks = {}
+        last_request = {}
+
+        async def fetch_one(url):
+            host = urlparse(url).netloc.lower()
+            semaphore = semaphores.setdefault(host, asyncio.Semaphore(self.per_host))
+            lock = host_locks.setdefault(host, asyncio.Lock())
+
+            async with semaphore:
+                # Выдерживаем паузу между стартами запросов к одному хосту
+                async with lock:
+                    wait = last_request.get(host, 0) + self.delay - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    last_request[host] = time.monotonic()
+
+                loop = asyncio.get_running_loop()
+                try:
+                    content = await loop.run_in_executor(self.executor, fetch, url)
+                except Exception as e:
+                    logger.error(f"Ошибка при асинхронной загрузке {url}: {e}")
+                    content = None
+                return url, content
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(fetch_one(url) for url in urls))
+        logger.info(f"Загружено {len(results)} страниц за {time.monotonic() - started:.1f} с")
+        return results
+
+    def close(self):
+        """Остановка пула потоков"""
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Офлайн-бенчмарк парсинга: записанные и синтетические каталоги участников, сравнение с базовой линией
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+import logging
+from contextlib import contextmanager
+from urllib.parse import urljoin
+import requests
+from requests.adapters import BaseAdapter
+
+logger = logging.getLogger(__name__)
+
+# Записанные страницы реальных каталогов: <выставка>/NNN.html и manifest.json с адресами
+PAGES_DIR = 'benchmark_pages'
+
+# Результаты, с которыми сравнивается каждый запуск
+BASELINE_FILE = 'benchmark_baseline.json'
+
+# Допустимое ухудшение относительно базовой линии
+TOLERANCE = 0.15
+
+# Сравниваемые метрики; для пропускной способности больше - лучше, для остальных - меньше
+COMPARED_METRICS = ('pages_per_s', 'blocks_per_s', 'latency_ms_p50', 'latency_ms_p95', 'peak_memory_mb')
+HIGHER_IS_BETTER = ('pages_per_s', 'blocks_per_s')
+
+# Стартовые страницы для записи каталогов
+RECORD_START_URLS = {
+    'eltefa': 'https://www.messe-stuttgart.de/eltefa/',
+    'ihm': 'https://www.ihm.de/de/home',
+}
+
+# Ключевые слова ссылок на каталог участников
+DIRECTORY_KEYWORDS = ['aussteller', 'exhibitor', 'teilnehmer']
+
+# Адрес синтетического каталога (страницы отдаются из памяти)
+SYNTHETIC_HOST = 'http://benchmark.local'
+
+# Классы блоков синтетического каталога - из селекторов парсеров
+SYNTHETIC_BLOCK_CLASSES = ['exhibitor-item', 'aussteller-item', 'company-item', 'exhibitor-card']
+SYNTHETIC_CITIES = ['Berlin', 'Hamburg', 'Stuttgart', 'Leipzig', 'Dresden', 'Essen']
+SYNTHETIC_POSITIONS = ['CEO', 'Geschäftsführer', 'Sales Manager', 'HR Manager', 'Marketing', 'Entwickler']
+
+
+# --- данные ---
+
+def synthetic_directory(count, per_page=50, depth=1, seed=0):
+    """Синтетический каталог: {url: html} и адрес первой страницы
+
+    depth - уровень вложенности: блок участника и сам список оборачиваются
+    в depth контейнеров, как в тяжелых шаблонах сайтов выставок.
+    """
+    rng = random.Random(seed)
+    pages = {}
+    page_count = (count + per_page - 1) // per_page
+    for page in range(1, page_count + 1):
+        blocks = []
+        for index in range((page - 1) * per_page, min(count, page * per_page)):
+            name = f"Firma {index} {rng.choice(['GmbH', 'AG', 'KG', 'GmbH & Co. KG'])}"
+            city = rng.choice(SYNTHETIC_CITIES)
+            block = (
+                f'<div class="{rng.choice(SYNTHETIC_BLOCK_CLASSES)}" data-id="{index}">'
+                f'<h3 class="company-name">{name}</h3>'
+                f'<p><span class="city">{city}</span>, <span class="country">Deutschland</span></p>'
+                f'<p>Halle {rng.randint(1, 10)}, Stand {rng.randint(100, 999)}. '
+                f'Kontakt: info{index}@firma{index}.de</p>'
+                f'<a href="https://www.firma{index}.de">Website</a> <a href="/aussteller/{index}">Details</a>'
+                f'</div>'
+            )
+            blocks.append(nest(block, depth, 'item-wrapper'))
+        navigation = ''
+        if page < page_count:
+            navigation = f'<ul class="pagination"><li><a rel="next" href="/list?page={page + 1}">Weiter</a></li></ul>'
+        body = nest(''.join(blocks), depth, 'list-container')
+        pages[synthetic_url(page)] = (
+            f'<html><head><title>Aussteller</title></head><body><header><nav><a href="/">Home</a></nav></header>'
+            f'<main>{body}{navigation}</main><footer>Impressum</footer></body></html>'
+        )
+    return pages, synthetic_url(1)
+
+
+def synthetic_url(page):
+    return f"{SYNTHETIC_HOST}/list?page={page}"
+
+
+def synthetic_contact_pages(count, people=12, depth=1, seed=0):
+    """Синтетические страницы команды компаний: {url: html}"""
+    rng = random.Random(seed)
+    pages = {}
+    for company in range(count):
+        members = []
+        for person in range(people):
+            block = (
+                f'<div class="team-member">'
+                f'<h3>Person {company}-{person}</h3>'
+                f'<span class="position">{rng.choice(SYNTHETIC_POSITIONS)}</span>'
+                f'<p>E-Mail: person{person}@firma{company}.de, Tel. +49 711 {rng.randint(100000, 999999)}</p>'
+                f'</div>'
+            )
+            members.append(nest(block, depth, 'member-wrapper'))
+        pages[f"{SYNTHETIC_HOST}/firma{company}/team"] = (
+            f'<html><body><section class="team">{nest("".join(members), depth, "grid")}</section></body></html>'
+        )
+    return pages
+
+
+def nest(html, depth, css_class):
+    """HTML внутри depth вложенных контейнеров"""
+    for level in range(depth - 1):
+        html = f'<div class="{css_class}-{level}">{html}</div>'
+    return html
+
+
+def load_recorded(directory=PAGES_DIR):
+    """Записанные каталоги: {выставка: (pages {url: html}, первая страница)}"""
+    manifest_path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    recorded = {}
+    for fair, entries in manifest.items():
+        pages = {}
+        for entry in entries:
+            with open(os.path.join(directory, entry['file']), encoding='utf-8') as f:
+                pages[entry['url']] = f.read()
+        if entries:
+            recorded[fair] = (pages, entries[0]['url'])
+    return recorded
+
+
+class OfflineAdapter(BaseAdapter):
+    """Транспорт requests, отдающий страницы из памяти (404 для неизвестных адресов)"""
+
+    def __init__(self, pages):
+        super().__init__()
+        self.pages = pages
+
+    def send(self, request, **kwargs):
+        content = self.pages.get(request.url)
+        response = requests.Response()
+        response.status_code = 200 if content is not None else 404
+        response._content = (content or '').encode('utf-8')
+        response.encoding = 'utf-8'
+        response.headers['Content-Type'] = 'text/html; charset=utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+# --- измерения ---
+
+@contextmanager
+def workspace():
+    """Временный рабочий каталог: состояние обхода, кэш и файлы вывода бенчмарка не смешиваются с настоящими"""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='benchmark-') as directory:
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(previous)
+
+
+def summarize(pages, blocks, seconds, latencies=None):
+    """Метрики одного прогона"""
+    result = {
+        'pages': pages,
+        'blocks': blocks,
+        'seconds': round(seconds, 3),
+        'pages_per_s': round(pages / seconds, 2) if seconds else 0,
+        'blocks_per_s': round(blocks / seconds, 2) if seconds else 0,
+    }
+    if latencies:
+        latencies = sorted(latencies)
+        result['latency_ms_mean'] = round(statistics.fmean(latencies) * 1000, 3)
+        result['latency_ms_p50'] = round(latencies[len(latencies) // 2] * 1000, 3)
+        result['latency_ms_p95'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3)
+    return result
+
+
+def peak_memory(run):
+    """Пик памяти Python основного процесса за прогон, МБ (процессы пула разбора не учитываются)"""
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024 / 1024, 2)
+
+
+def bench_scrape(pages, start_url, fair='eltefa'):
+    """RequestsOnlyScraper.scrape_<fair>_exhibitors по каталогу из памяти"""
+    from requests_only_scraper import RequestsOnlyScraper
+
+    def run():
+        with workspace():
+            scraper = RequestsOnlyScraper(incremental=False, pipeline=False)
+            # Загрузка из памяти: измеряется разбор, извлечение и запись, а не сеть
+            fetched = []
+            scraper.fetcher.fetch = lambda url: fetched.append(url) or pages.get(url)
+            scraper.fetcher.delay = 0
+            scrape = getattr(scraper, f"scrape_{fair}_exhibitors")
+            try:
+                started = time.perf_counter()
+                blocks = scrape(start_url)
+                seconds = time.perf_counter() - started
+            finally:
+                scraper.parse_pool.close()
+                scraper.state.close()
+            return summarize(len(fetched), blocks, seconds)
+
+    return run
+
+
+def bench_extract(pages):
+    """AdvancedExhibitionScraper.extract_exhibitor_data по всем блокам каталога"""
+    from advanced_scraper import AdvancedExhibitionScraper, EXHIBITOR_SELECTORS
+    from html_parser import make_soup
+
+    def run():
+        with workspace():
+            scraper = AdvancedExhibitionScraper(max_drivers=1, incremental=False, pipeline=False)
+            latencies = []
+            try:
+                for content in pages.values():
+                    soup = make_soup(content)
+                    for _, blocks in EXHIBITOR_SELECTORS.select(soup):
+                        for block in blocks:
+                            started = time.perf_counter()
+                            scraper.extract_exhibitor_data(block)
+                            latencies.append(time.perf_counter() - started)
+            finally:
+                scraper.close_pools()
+                scraper.state.close()
+            return summarize(len(pages), len(latencies), sum(latencies), latencies)
+
+    return run
+
+
+def bench_contacts(pages):
+    """ContactFinder.parse_contact_page по страницам команды из памяти"""
+    from contact_finder import ContactFinder
+    from rate_limiter import RateLimiter
+
+    def run():
+        finder = ContactFinder()
+        adapter = OfflineAdapter(pages)
+        finder.session.mount('http://', adapter)
+        finder.session.mount('https://', adapter)
+        finder.rate_limits['Website'] = RateLimiter(1e9, burst=1e9)   # Лимиты сайтов офлайн не нужны
+        latencies = []
+        contacts = 0
+        for url in pages:
+            started = time.perf_counter()
+            contacts += len(finder.parse_contact_page(url, 'Benchmark'))
+            latencies.append(time.perf_counter() - started)
+        return summarize(len(pages), contacts, sum(latencies), latencies)
+
+    return run
+
+
+def measure(name, run, memory=True):
+    """Прогон с замером времени и отдельный прогон под tracemalloc для пика памяти"""
+    print(f"Бенчмарк: {name}", file=sys.stderr)
+    result = run()
+    if memory:
+        result['peak_memory_mb'] = peak_memory(run)
+    return result
+
+
+def run_benchmarks(sizes, depths, memory=True, contact_pages=200):
+    """Все бенчмарки: синтетические каталоги заданных размеров и вложенности и записанные страницы"""
+    results = {}
+    for depth in depths:
+        for size in sizes:
+            pages, start_url = synthetic_directory(size, depth=depth)
+            prefix = f"synthetic-{size}-d{depth}"
+            results[f"{prefix}/scrape_eltefa_exhibitors"] = measure(
+                f"{prefix} scrape_eltefa_exhibitors", bench_scrape(pages, start_url), memory)
+            results[f"{prefix}/extract_exhibitor_data"] = measure(
+                f"{prefix} extract_exhibitor_data", bench_extract(pages), memory)
+        contacts = synthetic_contact_pages(contact_pages, depth=depth)
+        results[f"synthetic-contacts-d{depth}/parse_contact_page"] = measure(
+            f"contacts d{depth} parse_contact_page", bench_contacts(contacts), memory)
+
+    for fair, (pages, start_url) in load_recorded().items():
+        results[f"recorded-{fair}/scrape_{fair}_exhibitors"] = measure(
+            f"recorded {fair} scrape_{fair}_exhibitors", bench_scrape(pages, start_url, fair), memory)
+        results[f"recorded-{fair}/extract_exhibitor_data"] = measure(
+            f"recorded {fair} extract_exhibitor_data", bench_extract(pages), memory)
+    return results
+
+
+# --- базовая линия ---
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Ухудшения относительно базовой линии: [(бенчмарк, метрика, было, стало, изменение)]"""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in COMPARED_METRICS:
+            if not base.get(metric) or metric not in metrics:
+                continue
+            change = (metrics[metric] - base[metric]) / base[metric]
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append((name, metric, base[metric], metrics[metric], change))
+    return regressions
+
+
+def load_baseline(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def print_results(results, baseline):
+    print(f"{'Бенчмарк':<58} {'стр/с':>9} {'блоков/с':>10} {'p50 мс':>8} {'p95 мс':>8} {'память МБ':>10} {'к базе':>8}")
+    for name, metrics in results.items():
+        base = baseline.get(name, {})
+        delta = ''
+        if base.get('blocks_per_s'):
+            delta = f"{(metrics['blocks_per_s'] - base['blocks_per_s']) / base['blocks_per_s']:+.0%}"
+        print(f"{name:<58} {metrics['pages_per_s']:>9} {metrics['blocks_per_s']:>10} "
+              f"{metrics.get('latency_ms_p50', '-'):>8} {metrics.get('latency_ms_p95', '-'):>8} "
+              f"{metrics.get('peak_memory_mb', '-'):>10} {delta:>8}")
+
+
+# --- запись реальных каталогов ---
+
+def record(max_pages=20, directory=PAGES_DIR):
+    """Запись страниц каталогов ELTEFA и IHM для офлайн-бенчмарка"""
+    from requests_only_scraper import RequestsOnlyScraper
+    from html_parser import find_links
+
+    directory = os.path.abspath(directory)
+    manifest = {}
+    with workspace():
+        scraper = RequestsOnlyScraper(incremental=False, pipeline=False)
+        scraper.paginator.max_pages = max_pages
+        try:
+            for fair, start_url in RECORD_START_URLS.items():
+                content = scraper.get_page_content(start_url)
+                if not content:
+                    logger.error(f"Не удалось загрузить {start_url}")
+                    continue
+                directory_url = next(
+                    (urljoin(start_url, href) for text, href in find_links(content)
+                     if any(keyword in f"{text} {href}".lower() for keyword in DIRECTORY_KEYWORDS)),
+                    None,
+                )
+                if not directory_url:
+                    logger.error(f"Каталог участников {fair} не найден на {start_url}")
+                    continue
+                os.makedirs(os.path.join(directory, fair), exist_ok=True)
+                entries = []
+                for url, page in scraper.paginator.crawl(directory_url):
+                    name = os.path.join(fair, f"{len(entries):03d}.html")
+                    with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+                        f.write(page)
+                    entries.append({'url': url, 'file': name})
+                manifest[fair] = entries
+                print(f"{fair}: записано страниц {len(entries)}")
+        finally:
+            scraper.parse_pool.close()
+            scraper.state.close()
+
+    with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк парсинга участников и контактов")
+    parser.add_argument('command', nargs='?', choices=['run', 'record'], default='run',
+                        help="run - бенчмарк, record - записать страницы реальных каталогов")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000],
+                        help="размеры синтетических каталогов (участников)")
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 4], help="уровни вложенности блоков")
+    parser.add_argument('--no-memory', action='store_true', help="без прогона для пика памяти")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="файл базовой линии")
+    parser.add_argument('--save-baseline', action='store_true', help="сохранить результаты как базовую линию")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="допустимое ухудшение (доля)")
+    parser.add_argument('--max-pages', type=int, default=20, help="record: страниц каталога на выставку")
+    args = parser.parse_args()
+
+    # Подробные журналы парсеров искажают замеры (их basicConfig после этого ничего не меняет)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'record':
+        record(args.max_pages)
+        return 0
+
+    baseline_path = os.path.abspath(args.baseline)
+    baseline = load_baseline(baseline_path)
+    results = run_benchmarks(args.sizes, args.depths, memory=not args.no_memory)
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        save_baseline(results, baseline_path)
+        print(f"Базовая линия сохранена: {baseline_path}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, before, after, change in regressions:
+        print(f"УХУДШЕНИЕ {name} {metric}: {before} -> {after} ({change:+.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Поиск блоков участников за один проход по дереву документа
+"""
+
+import re
+import logging
+from bs4.element import Tag, NavigableString, CData
+
+logger = logging.getLogger(__name__)
+
+# Типы строк, которые учитывает get_text() (без комментариев, скриптов и стилей)
+TEXT_TYPES = (NavigableString, CData)
+
+# Простые селекторы: тег, .класс, [атрибут] и [атрибут*="значение"]
+SIMPLE_SELECTOR = re.compile(
+    r'^(?P<tag>[a-zA-Z][\w-]*)?'
+    r'(?:\.(?P<cls>[\w-]+))?'
+    r'(?:\[(?P<attr>[\w-]+)(?:\*=["\'](?P<contains>[^"\']*)["\'])?\])?$'
+)
+
+
+def compile_selector(selector):
+    """Предикат для простого CSS-селектора или None, если селектор сложный"""
+    match = SIMPLE_SELECTOR.match(selector.strip())
+    if not match or not any(match.groupdict().values()):
+        return None
+
+    tag_name = match.group('tag')
+    cls = match.group('cls')
+    attr = match.group('attr')
+    contains = match.group('contains')
+
+    def predicate(tag):
+        if tag_name and tag.name != tag_name:
+            return False
+        if cls and cls not in tag.get('class', ()):
+            return False
+        if attr:
+            value = tag.get(attr)
+            if value is None:
+                return False
+            if contains is not None:
+                if isinstance(value, list):  # Многозначные атрибуты (class) сравниваются как строка
+                    value = ' '.join(value)
+                if contains not in value:
+                    return False
+        return True
+
+    return predicate
+
+
+class BlockSelector:
+    """Набор селекторов, проверяемых за один обход документа"""
+
+    def __init__(self, selectors):
+        self.selectors = list(selectors)
+        self.compiled = [(selector, compile_selector(selector)) for selector in self.selectors]
+        self.simple = [(selector, predicate) for selector, predicate in self.compiled if predicate]
+
+    def select(self, soup):
+        """Список (селектор, найденные блоки) в порядке селекторов"""
+        matched = {selector: [] for selector in self.selectors}
+
+        if self.simple:
+            for tag in soup.find_all(True):
+                for selector, predicate in self.simple:
+                    if predicate(tag):
+                        matched[selector].append(tag)
+
+        # Сложные селекторы отдаем soupsieve
+        for selector, predicate in self.compiled:
+            if predicate is None:
+                matched[selector] = soup.select(selector)
+
+        return [(selector, matched[selector]) for selector in self.selectors]
+
+
+def find_candidate_blocks(soup, block_tags=('div',), title_tags=('h1', 'h2', 'h3', 'h4', 'strong', 'b'),
+                          link_tags=('a',), link_requires_href=True, min_text=None, max_text=None,
+                          skip_words=()):
+    """Блоки с заголовком и ссылкой внутри, найденные за один обход дерева
+
+    Признаки "есть заголовок", "есть ссылка" и длина текста считаются снизу вверх:
+    каждый узел использует уже посчитанные значения своих детей, поэтому текст
+    вложенных блоков не извлекается заново для каждого предка.
+    """
+    title_tags = set(title_tags)
+    link_tags = set(link_tags)
+    block_tags = set(block_tags)
+
+    tags = soup.find_all(True)  # Порядок документа: предки идут раньше потомков
+    features = {}               # id(тег) -> (заголовок в поддереве, ссылка в поддереве, длина текста)
+    candidates = []
+
+    for tag in reversed(tags):
+        has_title = has_link = False
+        text_length = 0
+
+        for child in tag.contents:
+            if isinstance(child, Tag):
+                child_title, child_link, child_length = features[id(child)]
+                has_title = has_title or child_title
+                has_link = has_link or child_link
+                text_length += child_length
+            elif type(child) in TEXT_TYPES:
+                text_length += len(child.strip())
+
+        # Для самого тега: find() ищет только среди потомков
+        if tag.name in block_tags and has_title and has_link:
+            if (min_text is None or text_length > min_text) and (max_text is None or text_length < max_text):
+                if not skip_words or not _contains_skip_word(tag, skip_words):
+                    candidates.append(tag)
+
+        is_title = tag.name in title_tags
+        is_link = tag.name in link_tags and (not link_requires_href or tag.has_attr('href'))
+        features[id(tag)] = (has_title or is_title, has_link or is_link, text_length)
+
+    candidates.reverse()
+    return candidates
+
+
+def _contains_skip_word(tag, skip_words):
+    """Проверка текста блока на служебные слова (навигация, подвал и т.п.)"""
+    text = tag.get_text(strip=True).lower()
+    return any(skip_word in text for skip_word in skip_words)
@@ -0,0 +1,237 @@
+"""
+Извлечение участников внутри браузера: правила ExtractionRules выполняются на JavaScript
+"""
+
+import re
+import json
+import hashlib
+import logging
+from list_harvester import ListHarvester, page_navigation
+
+logger = logging.getLogger(__name__)
+
+# Записи, извлеченные в браузере, передаются дальше внутри небольшого HTML-документа
+RECORDS_MARKER = '<script type="application/json" id="exhibitor-records">'
+
+# Конструкции Python-регулярок, которых нет в JavaScript
+UNSUPPORTED_REGEX = re.compile(r'\(\?P|\(\?[aiLmsux]+\)|\\A|\\Z')
+
+# Интерпретатор правил. Повторяет ExtractionRules/FieldMatcher: тот же порядок селекторов,
+# get_text(strip=True) склеивает обрезанные текстовые узлы, fallbacks применяются по порядку.
+EXTRACTOR_FUNCTIONS = """
+const SKIP_TEXT = 'script, style, template';
+
+function textNodes(el) {
+    const values = [];
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    let node;
+    while ((node = walker.nextNode())) {
+        const parent = node.parentElement;
+        if (parent && parent.closest(SKIP_TEXT)) continue;
+        values.push(node.nodeValue);
+    }
+    return values;
+}
+
+function strippedText(el) {
+    return textNodes(el).map(value => value.trim()).filter(value => value).join('');
+}
+
+function fits(text, length) {
+    const size = Array.from(text).length;
+    return !length || (length[0] < size && size < length[1]);
+}
+
+function applyFallback(fallback, el, ctx) {
+    if (fallback.type === 'child_text') {
+        for (const child of el.children) {
+            if (!fallback.tags.includes(child.tagName.toLowerCase())) continue;
+            const text = strippedText(child);
+            if (text && fits(text, fallback.length)) return text;
+        }
+    } else if (fallback.type === 'links') {
+        const exclude = fallback.exclude || [];
+        for (const link of el.querySelectorAll('a[href]')) {
+            const href = link.getAttribute('href');
+            if (href.startsWith(fallback.prefix || '') && !exclude.some(domain => href.includes(domain))) return href;
+        }
+    } else if (fallback.type === 'regex') {
+        const exclude = fallback.exclude || [];
+        const regex = new RegExp(fallback.pattern, 'g');
+        for (const match of ctx.text().matchAll(regex)) {
+            const value = match[0];
+            if (fallback.allowed && !fallback.allowed.includes(value)) continue;
+            if (exclude.some(domain => value.includes(domain))) continue;
+            return value;
+        }
+    } else if (fallback.type === 'keywords') {
+        const text = ctx.text().toLowerCase();
+        for (const value of fallback.values) {
+            if (text.includes(value.toLowerCase())) return value;
+        }
+    }
+    return null;
+}
+
+function fieldValue(field, el, ctx) {
+    for (const selector of field.selectors) {
+        const found = ctx.first(selector);
+        if (!found) continue;
+        if (field.attribute) {
+            let value = found.getAttribute(field.attribute);
+            if (value) {
+                if (field.add_scheme && !value.startsWith('http')) value = 'https://' + value;
+                return value;
+            }
+            continue;
+        }
+        const text = strippedText(found);
+        if (text && fits(text, field.length)) return text;
+    }
+    for (const fallback of field.fallbacks) {
+        const value = applyFallback(fallback, el, ctx);
+        if (value) return value;
+    }
+    return field.default;
+}
+
+function extractBlock(el, spec) {
+    let rawText = null;
+    const matches = {};
+    const ctx = {
+        text: () => rawText === null ? (rawText = textNodes(el).join('')) : rawText,
+        first: selector => {
+            if (!(selector in matches)) {
+                try { matches[selector] = el.querySelector(selector); } catch (e) { matches[selector] = null; }
+            }
+            return matches[selector];
+        },
+    };
+
+    // Отпечаток для инкрементального режима - как crawl_state.block_hash
+    const words = textNodes(el).join(' ').split(/\\s+/).filter(word => word);
+    const links = Array.from(el.querySelectorAll('a[href]')).map(link => link.getAttribute('href'));
+    const fingerprint = words.join(' ') + '|' + links.join(' ');
+
+    let fields = {};
+    for (const field of spec) {
+        const value = fieldValue(field, el, ctx);
+        if (field.required && !value) { fields = null; break; }
+        fields[field.name] = typeof value === 'string' ? value.trim() : value;
+    }
+    return {fields: fields, fingerprint: fingerprint};
+}
+"""
+
+# Извлечение всех блоков страницы по селекторам блоков
+EXTRACT_SCRIPT = EXTRACTOR_FUNCTIONS + """
+const spec = arguments[0];
+const seen = new Set();
+const records = [];
+for (const selector of arguments[1]) {
+    let nodes;
+    try { nodes = document.querySelectorAll(selector); } catch (e) { continue; }
+    for (const el of nodes) {
+        if (seen.has(el)) continue;
+        seen.add(el);
+        records.push(extractBlock(el, spec));
+    }
+}
+return records;
+"""
+
+# Элемент списка при пошаговом сборе превращается сразу в запись
+HARVEST_ITEM_SCRIPT = EXTRACTOR_FUNCTIONS + """
+function serializeItem(el, spec) { return extractBlock(el, spec); }
+"""
+
+
+def js_regex(pattern):
+    """Источник регулярного выражения для JavaScript; ValueError, если перевести нельзя"""
+    if UNSUPPORTED_REGEX.search(pattern):
+        raise ValueError(f"Регулярное выражение не поддерживается в браузере: {pattern}")
+    return pattern
+
+
+def compile_rules(rules):
+    """ExtractionRules -> JSON-описание правил для интерпретатора в браузере"""
+    spec = []
+    for field in rules.fields:
+        fallbacks = []
+        for fallback in field.fallbacks:
+            item = dict(fallback)
+            if fallback['type'] == 'regex':
+                item['pattern'] = js_regex(fallback['pattern'].pattern)
+                item['allowed'] = sorted(fallback['allowed']) if fallback['allowed'] else None
+            elif fallback['type'] == 'keywords':
+                item['values'] = [value for value, _ in fallback['values']]
+            elif fallback['type'] == 'child_text':
+                item['tags'] = sorted(fallback['tags'])
+            fallbacks.append(item)
+        spec.append({
+            'name': field.name,
+            'selectors': field.selectors,
+            'attribute': field.attribute,
+            'add_scheme': field.add_scheme,
+            'length': field.length,
+            'fallbacks': fallbacks,
+            'default': field.default,
+            'required': field.required,
+        })
+    # Проверяем, что описание сериализуется (кортежи становятся списками)
+    return json.loads(json.dumps(spec))
+
+
+def fingerprint_hash(fingerprint):
+    """Хэш отпечатка блока - совпадает с crawl_state.block_hash для того же блока"""
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+
+
+def records_document(records, navigation=()):
+    """HTML-документ с записями (JSON) и элементами навигации для обхода каталога"""
+    data = json.dumps(records, ensure_ascii=False).replace('</', '<\\/')
+    return f"<html><body>{RECORDS_MARKER}{data}</script>{''.join(navigation)}</body></html>"
+
+
+def embedded_records(content):
+    """Записи из документа records_document или None, если их нет"""
+    start = content.find(RECORDS_MARKER) if content else -1
+    if start < 0:
+        return None
+    start += len(RECORDS_MARKER)
+    end = content.find('</script>', start)
+    try:
+        return json.loads(content[start:end])
+    except ValueError:
+        logger.warning("Поврежденные записи участников в отрисованной странице")
+        return None
+
+
+class BrowserExtractor:
+    """Извлечение записей участников одним вызовом execute_script
+
+    Вместо page_source, повторного разбора HTML и обхода блоков в Python
+    правила сайта передаются в браузер и выполняются там; обратно приходит
+    JSON с полями и отпечатком каждого блока.
+    """
+
+    def __init__(self, rules, block_selectors):
+        self.spec = compile_rules(rules)
+        self.block_selectors = list(block_selectors)
+
+    def extract(self, driver):
+        """Записи {'fields': {...} или None, 'fingerprint': ...} по всем блокам страницы"""
+        return driver.execute_script(EXTRACT_SCRIPT, self.spec, self.block_selectors)
+
+    def extract_page(self, driver, url=None):
+        """Документ с записями страницы или None, если блоков не найдено"""
+        records = self.extract(driver)
+        if not records:
+            return None
+        logger.info(f"В браузере извлечено блоков: {len(records)}{f' ({url})' if url else ''}")
+        return records_document(records, page_navigation(driver))
+
+    def harvester(self, selectors, **kwargs):
+        """ListHarvester, собирающий вместо HTML элементов сразу записи"""
+        return ListHarvester(selectors, item_script=HARVEST_ITEM_SCRIPT, item_argument=self.spec,
+                             build_page=records_document, **kwargs)
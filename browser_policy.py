@@ -0,0 +1,127 @@
+"""
+Политика загрузки ресурсов в браузере: блокировка изображений, шрифтов, медиа и трекеров
+"""
+
+import os
+import weakref
+import threading
+import logging
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Ресурсы по типам (шаблоны Network.setBlockedURLs, * - любая последовательность)
+IMAGE_PATTERNS = ['*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.avif*', '*.svg*', '*.ico*', '*.bmp*']
+MEDIA_PATTERNS = ['*.mp4*', '*.webm*', '*.ogg*', '*.mp3*', '*.wav*', '*.m3u8*']
+FONT_PATTERNS = ['*.woff*', '*.ttf*', '*.otf*', '*.eot*']
+
+# Аналитика, реклама и виджеты - на содержимое каталогов не влияют
+TRACKER_DOMAINS = [
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googleadservices.com',
+    'googlesyndication.com',
+    'doubleclick.net',
+    'connect.facebook.net',
+    'facebook.com/tr',
+    'hotjar.com',
+    'clarity.ms',
+    'bat.bing.com',
+    'etracker.com',
+    'etracker.de',
+    'criteo.com',
+    'criteo.net',
+    'adform.net',
+    'linkedin.com/px',
+    'snap.licdn.com',
+    'youtube.com/embed',
+    'maps.googleapis.com',
+    'fonts.googleapis.com',
+    'fonts.gstatic.com',
+]
+
+# Настройка Chrome для изображений: 2 - запрещено (действует на весь браузер с первой страницы)
+IMAGES_PREF = 'profile.managed_default_content_settings.images'
+
+
+class ResourcePolicy:
+    """Какие ресурсы браузер не загружает
+
+    Настройки Chrome (prefs) запрещают изображения еще до первой страницы,
+    а Network.setBlockedURLs через CDP отсекает запросы по шаблонам: медиа,
+    шрифты и домены аналитики и рекламы. Для отдельных сайтов можно разрешить
+    нужные шаблоны (allow: {'домен': ['*.svg*', ...]}) - например, если список
+    участников строится из изображений или кнопки нарисованы шрифтом иконок.
+    """
+
+    def __init__(self, block_images=True, block_media=True, block_fonts=True, block_trackers=True,
+                 allow=None, extra_blocked=None, enabled=True):
+        self.enabled = enabled
+        self.block_images = block_images
+        self.patterns = []
+        if block_images:
+            self.patterns += IMAGE_PATTERNS
+        if block_media:
+            self.patterns += MEDIA_PATTERNS
+        if block_fonts:
+            self.patterns += FONT_PATTERNS
+        if block_trackers:
+            self.patterns += [f"*{domain}*" for domain in TRACKER_DOMAINS]
+        self.patterns += list(extra_blocked or [])
+        self.allow = {domain.lower(): set(patterns) for domain, patterns in (allow or {}).items()}
+        self._applied = weakref.WeakKeyDictionary()   # Драйвер -> действующие шаблоны
+        self._lock = threading.Lock()
+
+    def configure(self, chrome_options):
+        """Настройки Chrome при запуске драйвера"""
+        if not self.enabled or not self.block_images:
+            return
+        prefs = {IMAGES_PREF: 2}
+        # Сайты, которым разрешены изображения, получают исключение из запрета
+        exceptions = {
+            f"[*.]{domain},*": {'setting': 1}
+            for domain, patterns in self.allow.items()
+            if patterns & set(IMAGE_PATTERNS)
+        }
+        if exceptions:
+            prefs['profile.content_settings.exceptions.images'] = exceptions
+        chrome_options.add_experimental_option('prefs', prefs)
+
+    def site_allowlist(self, url):
+        host = urlparse(url).netloc.lower().split(':')[0]
+        allowed = set()
+        for domain, patterns in self.allow.items():
+            if host == domain or host.endswith(f".{domain}"):
+                allowed |= patterns
+        return allowed
+
+    def blocked_patterns(self, url):
+        """Шаблоны блокировки для страницы с учетом разрешений сайта"""
+        allowed = self.site_allowlist(url)
+        return [pattern for pattern in self.patterns if pattern not in allowed]
+
+    def apply(self, driver, url):
+        """Блокировка запросов перед загрузкой страницы (CDP вызывается, только если шаблоны меняются)"""
+        if not self.enabled:
+            return
+        patterns = self.blocked_patterns(url)
+        with self._lock:
+            if self._applied.get(driver) == patterns:
+                return
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        except Exception as e:
+            logger.warning(f"Не удалось настроить блокировку ресурсов: {e}")
+            return
+        with self._lock:
+            self._applied[driver] = patterns
+        logger.debug(f"Блокировка ресурсов для {url}: шаблонов {len(patterns)}")
+
+
+def get_default_policy(allow=None):
+    """Политика ресурсов для браузеров парсеров
+
+    SCRAPER_BLOCK_RESOURCES=0 - загружать все ресурсы (для отладки отрисовки)
+    """
+    return ResourcePolicy(allow=allow, enabled=os.environ.get('SCRAPER_BLOCK_RESOURCES', '1') != '0')
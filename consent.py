@@ -0,0 +1,219 @@
+"""
+Согласие на cookies: способ принятия определяется один раз для домена, cookies сохраняются между запусками
+"""
+
+import os
+import re
+import json
+import time
+import threading
+import logging
+from urllib.parse import urljoin, urlparse, urlencode
+from html_parser import make_soup
+
+logger = logging.getLogger(__name__)
+
+# Кнопки принятия cookies
+ACCEPT_PATTERN = re.compile(r'accept|akzeptieren|einverstanden|zustimmen|zulassen|^ok$', re.I)
+
+# Элементы баннера согласия
+BANNER_SELECTORS = ['[id*="cookie"]', '[class*="cookie"]', '[id*="consent"]', '[class*="consent"]']
+
+# Поля, добавляемые к форме согласия
+FORM_FIELDS = {'accept': '1', 'cookies': '1', 'consent': '1'}
+
+# Параметры запроса, которыми некоторые сайты принимают согласие
+QUERY_PARAMS = {'cookies': '1', 'accept': '1'}
+
+# Способы принятия (в порядке проверки)
+NONE = 'none'      # Баннера нет или он не мешает - ничего делать не нужно
+FORM = 'form'      # POST формы баннера со скрытыми полями
+QUERY = 'query'    # GET страницы с параметрами согласия
+
+
+def consent_domain(url):
+    """Домен для хранения согласия (www. не учитывается)"""
+    host = urlparse(url).netloc.lower().split(':')[0]
+    return host[4:] if host.startswith('www.') else host
+
+
+class ConsentStore:
+    """Выученные способы согласия и cookies по доменам в JSON-файле"""
+
+    def __init__(self, path, max_age=7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age      # Через сколько секунд способ определяется заново
+        self.domains = self.load()
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать cookies согласия {self.path}: {e}")
+            return {}
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.domains, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, domain):
+        """Запись домена без просроченных cookies; None, если способ не известен или устарел"""
+        with self._lock:
+            entry = self.domains.get(domain)
+            if entry is None:
+                return None
+            now = time.time()
+            if now - entry['learned'] > self.max_age:
+                return None
+            entry['cookies'] = [c for c in entry['cookies'] if c.get('expires') is None or c['expires'] > now]
+            if entry['method'] != NONE and not entry['cookies']:
+                return None  # Cookies согласия истекли - принимаем заново
+            return entry
+
+    def put(self, domain, method, cookies):
+        with self._lock:
+            self.domains[domain] = {'method': method, 'learned': time.time(), 'cookies': cookies}
+            self.save()
+
+
+class ConsentResolver:
+    """Принятие cookies без лишних запросов
+
+    При первом обращении к домену по очереди пробуются способы согласия
+    (форма баннера, параметры запроса) и выбирается тот, после которого
+    баннер пропадает или сервер устанавливает cookies. Способ и полученные
+    cookies сохраняются на диск; в следующих запросах и запусках cookies
+    просто подставляются в сессию, а страница не разбирается повторно.
+    """
+
+    def __init__(self, path, max_age=7 * 24 * 3600):
+        self.store = ConsentStore(path, max_age)
+        self._injected = set()      # (id сессии, домен) - cookies уже подставлены
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def domain_lock(self, domain):
+        with self._locks_guard:
+            return self._locks.setdefault(domain, threading.Lock())
+
+    def prepare(self, session, url):
+        """Подстановка сохраненных cookies домена в сессию (один раз на сессию)"""
+        domain = consent_domain(url)
+        key = (id(session), domain)
+        if key in self._injected:
+            return
+        entry = self.store.get(domain)
+        if entry is None:
+            return
+        for cookie in entry['cookies']:
+            session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'],
+                                expires=cookie.get('expires'), secure=cookie.get('secure', False))
+        self._injected.add(key)
+
+    def get(self, session, url, **kwargs):
+        """GET страницы с учетом согласия; возвращает текст страницы"""
+        self.prepare(session, url)
+        response = session.get(url, **kwargs)
+        response.raise_for_status()
+        return self.resolve(session, url, response, **kwargs)
+
+    def resolve(self, session, url, response, **kwargs):
+        """Текст страницы после согласия; способ определяется только для нового домена"""
+        domain = consent_domain(url)
+        if self.store.get(domain) is not None:
+            return response.text
+
+        with self.domain_lock(domain):
+            if self.store.get(domain) is not None:
+                # Пока ждали, способ определил другой поток - подставляем его cookies
+                self.prepare(session, url)
+                return response.text
+            text, method = self.learn(session, url, response, **kwargs)
+            self.store.put(domain, method, self.export_cookies(session, domain))
+            self._injected.add((id(session), domain))
+            logger.info(f"Согласие на cookies для {domain}: {method}")
+            return text
+
+    def learn(self, session, url, response, **kwargs):
+        """Подбор способа согласия: (текст полной страницы, способ)"""
+        soup = make_soup(response.text)
+        buttons = soup.find_all(['button', 'a'], string=ACCEPT_PATTERN)
+        if not buttons and not has_banner(soup):
+            return response.text, NONE
+
+        for method, attempt in ((FORM, self.try_form), (QUERY, self.try_query)):
+            cookies_before = session.cookies.get_dict()
+            try:
+                accepted = attempt(session, url, soup, buttons, **kwargs)
+            except Exception as e:
+                logger.debug(f"Способ согласия {method} не сработал для {url}: {e}")
+                continue
+            if not accepted:
+                continue
+            final = session.get(url, **kwargs)
+            final.raise_for_status()
+            if session.cookies.get_dict() != cookies_before or not has_banner(make_soup(final.text)):
+                return final.text, method
+
+        # Ни один способ не помог: страница, скорее всего, доступна и с баннером
+        return response.text, NONE
+
+    def try_form(self, session, url, soup, buttons, **kwargs):
+        """POST формы, в которой находится кнопка согласия"""
+        forms = [button.find_parent('form') for button in buttons]
+        forms = [form for form in forms if form is not None]
+        if not forms:
+            return False
+        form = forms[0]
+        data = {field.get('name'): field.get('value', '') for field in form.find_all('input', type='hidden')
+                if field.get('name')}
+        data.update(FORM_FIELDS)
+        action = urljoin(url, form.get('action', ''))
+        session.post(action, data=data, **kwargs).raise_for_status()
+        return True
+
+    def try_query(self, session, url, soup, buttons, **kwargs):
+        """GET страницы с параметрами согласия"""
+        separator = '&' if urlparse(url).query else '?'
+        session.get(f"{url}{separator}{urlencode(QUERY_PARAMS)}", **kwargs).raise_for_status()
+        return True
+
+    def export_cookies(self, session, domain):
+        """Cookies сессии, относящиеся к домену"""
+        cookies = []
+        for cookie in session.cookies:
+            if cookie.domain.lstrip('.').endswith(domain) or domain.endswith(cookie.domain.lstrip('.')):
+                cookies.append({
+                    'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+                    'path': cookie.path, 'expires': cookie.expires, 'secure': bool(cookie.secure),
+                })
+        return cookies
+
+
+def has_banner(soup):
+    return any(soup.select_one(selector) is not None for selector in BANNER_SELECTORS)
+
+
+_default_resolver = None
+_default_resolver_lock = threading.Lock()
+
+
+def get_default_consent():
+    """Общий механизм согласия для всех парсеров
+
+    SCRAPER_CONSENT_FILE - файл с cookies согласия (по умолчанию .consent_cookies.json)
+    """
+    global _default_resolver
+    with _default_resolver_lock:
+        if _default_resolver is None:
+            _default_resolver = ConsentResolver(os.environ.get('SCRAPER_CONSENT_FILE', '.consent_cookies.json'))
+        return _default_resolver
@@ -11,14 +11,32 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from fake_useragent import UserAgent
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from rate_limiter import RateLimiter
+from http_cache import mount_cache
+from html_parser import make_soup, find_links
+from extraction_rules import ExtractionRules, CONTACT_RULES
+from metrics import get_default_metrics
 
 logger = logging.getLogger(__name__)
 
+# Правила извлечения контактных лиц (компилируются один раз)
+CONTACT_EXTRACTOR = ExtractionRules(CONTACT_RULES)
+
 class ContactFinder:
-    def __init__(self):
+    def __init__(self, max_workers=8):
         self.ua = UserAgent()
         self.session = requests.Session()
         self.session.headers.update({'User-Agent': self.ua.random})
+        mount_cache(self.session)  # Повторные запуски берут сайты компаний из дискового кэша
+        self.max_workers = max_workers
+        self.metrics = get_default_metrics()
+        # Ограничения частоты запросов по источникам (запросов в секунду)
+        self.rate_limits = {
+            'LinkedIn': RateLimiter(2, burst=3),
+            'Xing': RateLimiter(2, burst=3),
+            'Website': RateLimiter(4, burst=4),
+        }
         
     def setup_driver(self):
         """Настройка веб-драйвера"""
@@ -76,6 +94,7 @@ class ContactFinder:
         try:
             # Используем Google Custom Search API или парсинг результатов
             # Для демонстрации создаем заглушку
+            self.rate_limits[source].acquire()
             logger.info(f"Поиск в {source}: {search_query}")
             
             # Здесь будет реальная логика поиска
@@ -101,18 +120,16 @@ class ContactFinder:
                 return contacts
             
             # Получаем содержимое страницы
+            self.rate_limits['Website'].acquire()
             response = self.session.get(website_url, timeout=30)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
             # Ищем страницу контактов
-            contact_links = soup.find_all('a', href=True)
             contact_page_url = None
             
-            for link in contact_links:
-                if any(keyword in link.text.lower() for keyword in ['kontakt', 'contact', 'team', 'about']):
-                    contact_page_url = link['href']
+            for link_text, href in find_links(response.text):
+                if any(keyword in link_text.lower() for keyword in ['kontakt', 'contact', 'team', 'about']):
+                    contact_page_url = href
                     break
             
             if contact_page_url:
@@ -130,29 +147,25 @@ class ContactFinder:
         """Парсинг страницы контактов"""
         contacts = []
         try:
+            self.rate_limits['Website'].acquire()
             response = self.session.get(url, timeout=30)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = make_soup(response.text)
             
             # Ищем блоки с контактными лицами
             contact_blocks = soup.find_all(['div', 'section'], class_=re.compile(r'contact|team|person|staff'))
             
             for block in contact_blocks:
                 try:
-                    name = self.extract_contact_name(block)
-                    position = self.extract_contact_position(block)
-                    email = self.extract_contact_email(block)
+                    # Имя, должность и email извлекаются за один проход скомпилированными правилами
+                    contact = CONTACT_EXTRACTOR.extract(block)
                     
-                    if name and position:
+                    if contact:
                         # Проверяем, подходит ли должность
-                        if self.is_target_position(position):
-                            contacts.append({
-                                'name': name,
-                                'position': position,
-                                'email': email,
-                                'source': f"{company_name} Website"
-                            })
+                        if self.is_target_position(contact['position']):
+                            contact['source'] = f"{company_name} Website"
+                            contacts.append(contact)
                 
                 except Exception as e:
                     logger.error(f"Ошибка при парсинге контакта: {e}")
@@ -164,30 +177,15 @@ class ContactFinder:
     
     def extract_contact_name(self, element):
         """Извлечение имени контакта"""
-        # Ищем имя в заголовках или специальных элементах
-        name_selectors = ['h1', 'h2', 'h3', '.name', '.person-name', '[data-name]']
-        for selector in name_selectors:
-            found = element.select_one(selector)
-            if found and found.get_text(strip=True):
-                return found.get_text(strip=True)
-        return None
+        return CONTACT_EXTRACTOR.extract_field(element, 'name')
     
     def extract_contact_position(self, element):
         """Извлечение должности контакта"""
-        # Ищем должность
-        position_selectors = ['.position', '.title', '.job-title', '[data-position]']
-        for selector in position_selectors:
-            found = element.select_one(selector)
-            if found and found.get_text(strip=True):
-                return found.get_text(strip=True)
-        return None
+        return CONTACT_EXTRACTOR.extract_field(element, 'position')
     
     def extract_contact_email(self, element):
         """Извлечение email контакта"""
-        text = element.get_text()
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        return emails[0] if emails else None
+        return CONTACT_EXTRACTOR.extract_field(element, 'email')
     
     def is_target_position(self, position):
         """Проверка, является ли должность целевой"""
@@ -202,6 +200,7 @@ class ContactFinder:
     
     def find_contacts_for_company(self, company_name, website_url=None):
         """Основной метод поиска контактов для компании"""
+        started = time.monotonic()
         all_contacts = []
         
         # Поиск через LinkedIn
@@ -217,14 +216,79 @@ class ContactFinder:
             website_contacts = self.search_company_website(company_name, website_url)
             all_contacts.extend(website_contacts)
         
-        # Удаляем дубликаты
+        contacts = self.remove_duplicates(all_contacts)
+        self.record_company(started, contacts)
+        return contacts
+    
+    def record_company(self, started, contacts):
+        """Учет поиска для одной компании в метриках стадии contacts"""
+        self.metrics.observe('scraper_stage_seconds', time.monotonic() - started, stage='contacts')
+        self.metrics.inc('scraper_stage_items', stage='contacts')
+        self.metrics.inc('scraper_records', len(contacts), stage='contacts')
+    
+    def find_contacts_for_companies(self, companies):
+        """Параллельный поиск контактов для списка компаний
+        
+        companies - итерируемый набор пар (название, сайт).
+        Возвращает генератор (название, сайт, контакты) по мере завершения каждой компании.
+        """
+        companies = iter(companies)
+        in_flight = {}  # future -> компания
+        pending = {}    # компания -> [оставшиеся источники, найденные контакты, время начала]
+        max_companies = self.max_workers * 2  # Не держим в работе больше компаний, чем нужно для загрузки потоков
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='contacts') as executor:
+            while True:
+                # Добавляем новые компании, пока есть место
+                while len(pending) < max_companies:
+                    company = next(companies, None)
+                    if company is None:
+                        break
+                    company_name, website_url = company
+                    if company in pending:  # Дубликат уже в работе
+                        continue
+                    logger.info(f"Поиск контактов для: {company_name}")
+                    
+                    tasks = [
+                        executor.submit(self.search_linkedin_contacts, company_name),
+                        executor.submit(self.search_xing_contacts, company_name),
+                    ]
+                    if website_url:
+                        tasks.append(executor.submit(self.search_company_website, company_name, website_url))
+                    
+                    pending[company] = [len(tasks), [], time.monotonic()]
+                    for task in tasks:
+                        in_flight[task] = company
+                
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for task in done:
+                    company = in_flight.pop(task)
+                    state = pending[company]
+                    try:
+                        state[1].extend(task.result())
+                    except Exception as e:
+                        logger.error(f"Ошибка при поиске контактов для {company[0]}: {e}")
+                        self.metrics.inc('scraper_stage_errors', stage='contacts')
+                    
+                    state[0] -= 1
+                    if state[0] == 0:
+                        del pending[company]
+                        contacts = self.remove_duplicates(state[1])
+                        self.record_company(state[2], contacts)
+                        yield company[0], company[1], contacts
+    
+    def remove_duplicates(self, contacts):
+        """Удаление дубликатов контактов по имени и должности"""
         unique_contacts = []
         seen_combinations = set()
         
-        for contact in all_contacts:
+        for contact in contacts:
             combination = (contact['name'], contact['position'])
             if combination not in seen_combinations:
                 unique_contacts.append(contact)
                 seen_combinations.add(combination)
         
-        return unique_contacts 
\ No newline at end of file
+        return unique_contacts
@@ -0,0 +1,336 @@
+"""
+Состояние обхода в SQLite: посещенные страницы, найденные участники, поиски контактов
+и снимок участников предыдущих запусков для инкрементального режима
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from urllib.parse import urlparse, urlencode, parse_qsl, urlunparse
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    status TEXT NOT NULL,          -- queued / done
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS exhibitors (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS snapshot (
+    key TEXT PRIMARY KEY,          -- область|название
+    scope TEXT NOT NULL,
+    content_hash TEXT,
+    fingerprint TEXT,
+    data TEXT NOT NULL,
+    contacts TEXT,                 -- результат последнего поиска контактов (JSON) или NULL
+    last_seen REAL,
+    changed_at REAL
+);
+CREATE INDEX IF NOT EXISTS snapshot_hash ON snapshot (scope, content_hash);
+CREATE TABLE IF NOT EXISTS contacts (
+    company TEXT PRIMARY KEY,
+    website TEXT,
+    data TEXT NOT NULL,
+    searched_at REAL
+);
+CREATE INDEX IF NOT EXISTS pages_scope ON pages (scope, status);
+"""
+
+# Колонки, добавленные в таблицу участников для инкрементального режима
+EXHIBITOR_EXTRA_COLUMNS = {
+    'name': 'TEXT',
+    'snapshot_key': 'TEXT',
+    'content_hash': 'TEXT',
+    'fingerprint': 'TEXT',
+    'change': 'TEXT',              # new / changed / unchanged относительно снимка
+}
+
+# Размер порции при чтении участников, чтобы не загружать таблицу целиком
+READ_CHUNK = 500
+
+
+def block_hash(block):
+    """Хэш текста и ссылок блока участника (пробелы нормализуются)"""
+    text = ' '.join(block.get_text(' ').split())
+    links = ' '.join(link['href'] for link in block.find_all('a', href=True))
+    return hashlib.sha1(f"{text}|{links}".encode('utf-8')).hexdigest()
+
+
+def normalize_url(url):
+    """Ключ страницы: без якоря, с отсортированными параметрами и без завершающего /"""
+    parts = urlparse(url.split('#', 1)[0])
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    path = parts.path.rstrip('/') or '/'
+    return urlunparse((parts.scheme.lower(), parts.netloc.lower(), path, '', query, ''))
+
+
+class CrawlState:
+    """Долговременное состояние обхода для возобновления прерванного запуска
+
+    Запуск отмечается в meta как running/finished. Если предыдущий запуск не
+    дошел до finish_run(), следующий продолжает его: уже обработанные страницы,
+    участники и поиски контактов не повторяются.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.migrate()
+
+        # Результаты завершенного запуска не должны мешать новому (в том числе вызовам парсеров без run())
+        if self.get_meta('status') == 'finished':
+            self.reset()
+
+    def migrate(self):
+        """Добавление новых колонок в базу, созданную предыдущей версией"""
+        existing = {row[1] for row in self.connection.execute('PRAGMA table_info(exhibitors)')}
+        for column, column_type in EXHIBITOR_EXTRA_COLUMNS.items():
+            if column not in existing:
+                self.connection.execute(f'ALTER TABLE exhibitors ADD COLUMN "{column}" {column_type}')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS exhibitors_snapshot_key ON exhibitors (snapshot_key)')
+
+    def execute(self, sql, params=()):
+        with self._lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    # --- запуск ---
+
+    def interrupted(self):
+        """Предыдущий запуск не завершился"""
+        return self.get_meta('status') == 'running'
+
+    def begin_run(self):
+        """Начало запуска; True, если продолжаем прерванный"""
+        resumed = self.interrupted()
+        if resumed:
+            logger.info(f"Продолжаем прерванный запуск из {self.path}")
+        else:
+            self.reset()
+            self.set_meta('run_id', time.time())
+        self.set_meta('status', 'running')
+        self.set_meta('started_at', time.time())
+        return resumed
+
+    def finish_run(self):
+        """Запуск завершен - следующий начнется заново"""
+        self.set_meta('status', 'finished')
+        self.set_meta('finished_at', time.time())
+
+    def reset(self):
+        """Очистка состояния предыдущего завершенного запуска (снимок участников сохраняется)"""
+        with self._lock:
+            with self.connection:
+                self.connection.execute('BEGIN')
+                for table in ('meta', 'pages', 'exhibitors', 'contacts'):
+                    self.connection.execute(f'DELETE FROM {table}')
+
+    # --- произвольные значения (найденные ссылки каталогов, завершенные выставки) ---
+
+    def get_meta(self, key, default=None):
+        rows = self.execute('SELECT value FROM meta WHERE key = ?', (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set_meta(self, key, value):
+        self.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                     (key, json.dumps(value, ensure_ascii=False)))
+
+    def is_done(self, scope):
+        return bool(self.get_meta(f'{scope}:done'))
+
+    def mark_done(self, scope):
+        self.set_meta(f'{scope}:done', True)
+
+    # --- страницы ---
+
+    def known_pages(self, scope):
+        """Все страницы области обхода: {нормализованный url: (url, status)}"""
+        rows = self.execute('SELECT url, status FROM pages WHERE scope = ?', (scope,))
+        return {normalize_url(url): (url, status) for url, status in rows}
+
+    def add_pages(self, scope, urls):
+        """Постановка страниц в очередь (уже известные не меняются)"""
+        now = time.time()
+        with self._lock:
+            with self.connection:
+                self.connection.execute('BEGIN')
+                self.connection.executemany(
+                    'INSERT OR IGNORE INTO pages (url, scope, status, updated_at) VALUES (?, ?, ?, ?)',
+                    [(url, scope, 'queued', now) for url in urls],
+                )
+
+    def mark_page_done(self, url):
+        self.execute('UPDATE pages SET status = ?, updated_at = ? WHERE url = ?', ('done', time.time(), url))
+
+    # --- участники ---
+
+    def exhibitor_key(self, scope, record):
+        return f"{scope}|{record.get('Name', '')}|{record.get('Website', '')}".lower()
+
+    def snapshot_key(self, scope, record):
+        return f"{scope}|{record.get('Name', '')}".lower()
+
+    def fingerprint(self, record, content_hash):
+        """Отпечаток участника: название, сайт и хэш текста блока"""
+        source = f"{record.get('Name', '')}|{record.get('Website', '')}|{content_hash or ''}"
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+    def add_exhibitor(self, scope, record, content_hash=None):
+        """Сохранение участника; False, если он уже был записан в этом запуске
+
+        Заодно участник сравнивается со снимком предыдущего запуска (new/changed/unchanged).
+        """
+        key = self.exhibitor_key(scope, record)
+        snapshot_key = self.snapshot_key(scope, record)
+        fingerprint = self.fingerprint(record, content_hash)
+        with self._lock:
+            row = self.connection.execute('SELECT fingerprint FROM snapshot WHERE key = ?', (snapshot_key,)).fetchone()
+            if row is None:
+                change = 'new'
+            elif row[0] == fingerprint:
+                change = 'unchanged'
+            else:
+                change = 'changed'
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO exhibitors (key, scope, data, updated_at, name, snapshot_key, '
+                'content_hash, fingerprint, change) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, scope, json.dumps(record, ensure_ascii=False), time.time(), record.get('Name'),
+                 snapshot_key, content_hash, fingerprint, change),
+            )
+            return cursor.rowcount > 0
+
+    def iterate(self, sql, params=()):
+        """Построчное чтение большой выборки порциями по rowid"""
+        last = 0
+        while True:
+            rows = self.execute(f'{sql} AND rowid > ? ORDER BY rowid LIMIT {READ_CHUNK}', (*params, last))
+            if not rows:
+                return
+            for row in rows:
+                yield row[1:]
+            last = rows[-1][0]
+
+    def exhibitors(self):
+        """Участники в порядке добавления (rowid растет с каждой вставкой)"""
+        for (data,) in self.iterate('SELECT rowid, data FROM exhibitors WHERE 1'):
+            yield json.loads(data)
+
+    def exhibitor_changes(self):
+        """Участники запуска с областью и статусом изменения"""
+        for data, scope, change in self.iterate('SELECT rowid, data, scope, change FROM exhibitors WHERE 1'):
+            yield json.loads(data), scope, change
+
+    def exhibitor_change(self, scope, record):
+        """Статус изменения участника этого запуска (new / changed / unchanged) или None"""
+        rows = self.execute('SELECT change FROM exhibitors WHERE key = ?', (self.exhibitor_key(scope, record),))
+        return rows[0][0] if rows else None
+
+    # --- снимок предыдущих запусков ---
+
+    def snapshot_hashes(self):
+        """Хэши блоков участников из снимка по выставкам: {scope: set(хэшей)}"""
+        hashes = {}
+        for scope, content_hash in self.execute('SELECT scope, content_hash FROM snapshot WHERE content_hash IS NOT NULL'):
+            hashes.setdefault(scope, set()).add(content_hash)
+        return hashes
+
+    def unchanged_exhibitor(self, scope, content_hash):
+        """Запись участника из снимка с тем же текстом блока или None"""
+        rows = self.execute('SELECT data FROM snapshot WHERE scope = ? AND content_hash = ? LIMIT 1',
+                            (scope, content_hash))
+        return json.loads(rows[0][0]) if rows else None
+
+    def snapshot_contacts(self, scope, record):
+        """Контакты участника из снимка или None, если поиск для него не выполнялся"""
+        rows = self.execute('SELECT contacts FROM snapshot WHERE key = ?', (self.snapshot_key(scope, record),))
+        return json.loads(rows[0][0]) if rows and rows[0][0] is not None else None
+
+    def delta(self, done_scopes):
+        """Изменения относительно снимка: новые, измененные и исчезнувшие участники
+
+        Исчезнувшими считаются только участники выставок, полностью обработанных в этом запуске.
+        """
+        for data, change in self.iterate(
+                "SELECT rowid, data, change FROM exhibitors WHERE change IN ('new', 'changed')"):
+            yield dict({'Change': change}, **json.loads(data))
+        for (data,) in self.iterate(*self.removed_query('SELECT rowid, data', done_scopes)):
+            yield dict({'Change': 'removed'}, **json.loads(data))
+
+    def carried_over(self, done_scopes):
+        """Участники и контакты из снимка для выставок, не обработанных в этом запуске
+
+        Участники, уже записанные в этом запуске (выставка прервана на середине), не повторяются.
+        """
+        placeholders = ','.join('?' * len(done_scopes)) or "''"
+        for data, contacts in self.iterate(
+                f'SELECT rowid, data, contacts FROM snapshot WHERE scope NOT IN ({placeholders}) '
+                'AND key NOT IN (SELECT snapshot_key FROM exhibitors WHERE snapshot_key IS NOT NULL)',
+                tuple(done_scopes)):
+            yield json.loads(data), json.loads(contacts) if contacts else []
+
+    def removed_query(self, columns, done_scopes):
+        placeholders = ','.join('?' * len(done_scopes)) or "''"
+        sql = (f'{columns} FROM snapshot WHERE scope IN ({placeholders}) '
+               'AND key NOT IN (SELECT snapshot_key FROM exhibitors WHERE snapshot_key IS NOT NULL)')
+        return sql, tuple(done_scopes)
+
+    def commit_snapshot(self, done_scopes):
+        """Перенос участников запуска и их контактов в снимок для следующего запуска"""
+        now = time.time()
+        sql, params = self.removed_query('SELECT key', done_scopes)
+        with self._lock:
+            with self.connection:
+                self.connection.execute('BEGIN')
+                removed = self.connection.execute(f'DELETE FROM snapshot WHERE key IN ({sql})', params).rowcount
+                self.connection.execute(
+                    'INSERT INTO snapshot (key, scope, content_hash, fingerprint, data, contacts, last_seen, changed_at) '
+                    'SELECT e.snapshot_key, e.scope, e.content_hash, e.fingerprint, e.data, c.data, ?, ? '
+                    'FROM exhibitors e LEFT JOIN contacts c ON c.company = e.name '
+                    'WHERE e.snapshot_key IS NOT NULL ORDER BY e.rowid '
+                    'ON CONFLICT(key) DO UPDATE SET content_hash = excluded.content_hash, '
+                    'data = excluded.data, contacts = COALESCE(excluded.contacts, snapshot.contacts), '
+                    'last_seen = excluded.last_seen, '
+                    'changed_at = CASE WHEN snapshot.fingerprint = excluded.fingerprint '
+                    'THEN snapshot.changed_at ELSE excluded.changed_at END, '
+                    'fingerprint = excluded.fingerprint',
+                    (now, now),
+                )
+        logger.info(f"Снимок участников обновлен, удалено исчезнувших: {removed}")
+
+    # --- контакты ---
+
+    def get_contacts(self, company):
+        """Результат уже выполненного поиска контактов или None"""
+        rows = self.execute('SELECT data FROM contacts WHERE company = ?', (company,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def store_contacts(self, company, website, contacts):
+        self.execute(
+            'INSERT OR REPLACE INTO contacts (company, website, data, searched_at) VALUES (?, ?, ?, ?)',
+            (company, website, json.dumps(contacts, ensure_ascii=False), time.time()),
+        )
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
@@ -7,6 +7,9 @@ import requests
 from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
 import logging
+from http_cache import mount_cache
+from html_parser import make_soup
+from block_detector import find_candidate_blocks
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -26,10 +29,12 @@ def analyze_page(url):
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        # Через кэш: повторная отладка тех же страниц не ходит в сеть
+        session = mount_cache(requests.Session())
+        response = session.get(url, headers=headers, timeout=30)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = make_soup(response.text)
         
         print(f"\n{'='*80}")
         print(f"АНАЛИЗ СТРАНИЦЫ: {url}")
@@ -81,19 +86,12 @@ def analyze_page(url):
         
         # 4. Ищем блоки с заголовками и ссылками
         print("\n4. БЛОКИ С ЗАГОЛОВКАМИ И ССЫЛКАМИ:")
-        all_divs = soup.find_all('div')
-        candidate_blocks = []
-        
-        for div in all_divs:
-            has_title = div.find(['h1', 'h2', 'h3', 'h4', 'strong', 'b'])
-            has_link = div.find('a', href=True)
-            has_text = div.get_text(strip=True)
-            
-            if (has_title and has_link and 
-                len(has_text) > 10 and len(has_text) < 500 and
-                not any(skip_word in has_text.lower() for skip_word in 
-                       ['exhibition management', 'navigation', 'menu', 'footer', 'header', 'cookie'])):
-                candidate_blocks.append(div)
+        candidate_blocks = find_candidate_blocks(
+            soup,
+            min_text=10,
+            max_text=500,
+            skip_words=['exhibition management', 'navigation', 'menu', 'footer', 'header', 'cookie'],
+        )
         
         print(f"  Найдено {len(candidate_blocks)} потенциальных блоков")
         
@@ -0,0 +1,175 @@
+"""
+Пул долгоживущих веб-драйверов Chrome
+"""
+
+import atexit
+import queue
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Элемент очереди свободных драйверов: место в пуле освободилось, можно запустить новый браузер
+WAKE_UP = None
+
+
+class PooledDriver:
+    """Драйвер из пула со статистикой использования"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.time()
+
+
+class DriverPool:
+    """Ограниченный пул веб-драйверов с арендой, проверкой и пересозданием"""
+
+    def __init__(self, factory, size=2, max_pages=50, max_memory_mb=512, lease_timeout=300):
+        self.factory = factory                # Функция создания нового драйвера (setup_driver)
+        self.size = size                      # Максимальное количество браузеров
+        self.max_pages = max_pages            # Пересоздаем драйвер после N страниц
+        self.max_memory_mb = max_memory_mb    # Пересоздаем драйвер при превышении памяти
+        self.lease_timeout = lease_timeout
+        self._idle = queue.LifoQueue()        # LIFO: чаще используем уже "прогретые" браузеры
+        self._all = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+    @contextmanager
+    def lease(self):
+        """Аренда драйвера на время загрузки одной страницы"""
+        pooled = self._acquire()
+        try:
+            yield pooled.driver
+        finally:
+            self._release(pooled)
+
+    def _acquire(self):
+        """Получение здорового драйвера из пула или создание нового"""
+        deadline = time.time() + self.lease_timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("Пул драйверов закрыт")
+
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                pooled = self._create_if_allowed()
+                if pooled is None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError("Не удалось получить драйвер из пула")
+                    try:
+                        pooled = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        continue
+
+            if pooled is WAKE_UP:
+                continue  # Драйвер пересоздан - пробуем занять освободившееся место
+
+            if self.is_healthy(pooled):
+                return pooled
+
+            logger.warning("Драйвер не прошел проверку, пересоздаем")
+            self._discard(pooled)
+
+    def _create_if_allowed(self):
+        """Создание нового драйвера, если не превышен размер пула"""
+        with self._lock:
+            if len(self._all) >= self.size:
+                return None
+            pooled = PooledDriver(None)
+            self._all.add(pooled)  # Резервируем место до запуска браузера
+
+        try:
+            pooled.driver = self.factory()
+        except Exception:
+            with self._lock:
+                self._all.discard(pooled)
+            self._idle.put(WAKE_UP)
+            raise
+
+        logger.info(f"Запущен новый браузер ({len(self._all)}/{self.size})")
+        return pooled
+
+    def _release(self, pooled):
+        """Возврат драйвера в пул или его пересоздание"""
+        pooled.pages += 1
+
+        if self._closed or not self.is_healthy(pooled):
+            self._discard(pooled)
+            return
+
+        if pooled.pages >= self.max_pages:
+            logger.info(f"Драйвер обработал {pooled.pages} страниц, пересоздаем")
+            self._discard(pooled)
+            return
+
+        memory_mb = self.get_memory_usage(pooled)
+        if memory_mb > self.max_memory_mb:
+            logger.info(f"Драйвер использует {memory_mb:.0f} МБ памяти, пересоздаем")
+            self._discard(pooled)
+            return
+
+        try:
+            # Освобождаем память страницы перед следующей арендой
+            pooled.driver.get("about:blank")
+        except Exception:
+            self._discard(pooled)
+            return
+
+        self._idle.put(pooled)
+
+    def is_healthy(self, pooled):
+        """Проверка, что браузер отвечает"""
+        try:
+            return pooled.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def get_memory_usage(self, pooled):
+        """Объем JS-памяти текущей страницы в МБ"""
+        try:
+            used = pooled.driver.execute_script(
+                "return window.performance && performance.memory ? performance.memory.usedJSHeapSize : 0"
+            )
+            return (used or 0) / (1024 * 1024)
+        except Exception:
+            return 0
+
+    def _discard(self, pooled):
+        """Закрытие драйвера и освобождение места в пуле"""
+        with self._lock:
+            self._all.discard(pooled)
+        # Ожидающий поток проснется и запустит новый браузер, не дожидаясь lease_timeout
+        self._idle.put(WAKE_UP)
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        """Закрытие всех браузеров пула"""
+        self._closed = True
+        with self._lock:
+            drivers = list(self._all)
+            self._all.clear()
+
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+        for pooled in drivers:
+            try:
+                pooled.driver.quit()
+            except Exception:
+                pass
+
+        if drivers:
+            logger.info(f"Закрыто браузеров: {len(drivers)}")
@@ -1,7 +1,8 @@
 import requests
-import pandas as pd
 import time
 import re
+import os
+import threading
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -9,21 +10,73 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
 from webdriver_manager.chrome import ChromeDriverManager
 from fake_useragent import UserAgent
 import logging
 from contact_finder import ContactFinder
+from driver_pool import DriverPool
+from browser_policy import get_default_policy
+from http_cache import get_default_cache
+from consent import get_default_consent
+from export_sinks import open_stream, write_excel, WrittenRecords, OUTPUT_DIR, EXHIBITOR_COLUMNS, CONTACT_COLUMNS, DELTA_COLUMNS
+from crawl_state import CrawlState, block_hash
+from http_session import SessionPool
+from host_scheduler import get_default_scheduler
+from hybrid_fetcher import HybridFetcher
+from html_parser import make_soup, find_links
+from extraction_rules import ExtractionRules, BASIC_RULES, select_text, find_email
+from page_readiness import PageReadiness, EXHIBITOR_READY_SELECTORS, EXHIBITOR_LINK_SELECTORS
+from metrics import get_default_metrics, host_of
+from pipeline import Pipeline
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Правила извлечения полей участника (компилируются один раз)
+EXHIBITOR_RULES = ExtractionRules(BASIC_RULES)
+
+# Выставки (области состояния обхода)
+FAIRS = ('eltefa', 'ihm')
+
+# Классы блоков участников и ключевые слова ссылок на каталог
+EXHIBITOR_BLOCK_CLASS = re.compile(r'exhibitor|aussteller|company')
+EXHIBITOR_LINK_KEYWORDS = ['aussteller', 'exhibitor', 'teilnehmer']
+
 class ExhibitionScraper:
-    def __init__(self):
+    def __init__(self, max_drivers=2, incremental=None, pipeline=None):
         self.ua = UserAgent()
-        self.exhibitors_data = []
-        self.contacts_data = []
+        # Состояние обхода для продолжения прерванного запуска и снимок прошлых запусков
+        self.state = CrawlState(os.path.join(OUTPUT_DIR, 'exhibition_state.db'))
+        # Записи сразу пишутся на диск (JSONL и CSV) - при сбое найденные данные сохраняются;
+        # после сбоя файлы дописываются, а не создаются заново (см. restore_from_state)
+        mode = 'a' if self.state.interrupted() else 'w'
+        self.exhibitors_data = open_stream('exhibition_exhibitors', EXHIBITOR_COLUMNS, mode)
+        self.contacts_data = open_stream('exhibition_contacts', CONTACT_COLUMNS, mode)
+        self.delta_data = open_stream('exhibition_delta', DELTA_COLUMNS)  # Изменения относительно прошлого запуска
+        self.written_exhibitors = None  # Записи, оставшиеся в файлах от прерванного запуска
+        self.written_contacts = None
+        # Инкрементальный режим: неизменившиеся участники не извлекаются и не ищутся повторно
+        self.incremental = os.environ.get('SCRAPER_INCREMENTAL') == '1' if incremental is None else incremental
+        # Конвейер: контакты ищутся, пока каталоги еще обходятся (SCRAPER_PIPELINE=0 - последовательно)
+        self.use_pipeline = os.environ.get('SCRAPER_PIPELINE', '1') != '0' if pipeline is None else pipeline
+        self.on_exhibitor = None    # Вызывается для каждого нового участника (scope, запись)
         self.contact_finder = ContactFinder()
+        self.resource_policy = get_default_policy()
+        self.driver_pool = DriverPool(self.setup_driver, size=max_drivers)
+        self.readiness = PageReadiness()
+        self.cache = get_default_cache()
+        self.scheduler = get_default_scheduler()
+        self.sessions = SessionPool(cache=self.cache, scheduler=self.scheduler)
+        self.consent = get_default_consent()
+        self.metrics = get_default_metrics()
+        # Сначала обычный HTTP-запрос, браузер - только если в ответе нет нужных данных
+        self.hybrid = HybridFetcher(
+            self.get_page_content,
+            lambda url, **kwargs: self.get_page_content(url, use_selenium=True, **kwargs),
+            path=os.path.join(OUTPUT_DIR, 'exhibition_fetch_strategy.json'),
+        )
         
     def setup_driver(self):
         """Настройка веб-драйвера"""
@@ -34,12 +87,12 @@ class ExhibitionScraper:
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--disable-extensions")
         chrome_options.add_argument("--disable-plugins")
-        chrome_options.add_argument("--disable-images")
-        chrome_options.add_argument("--disable-javascript")
         chrome_options.add_argument("--disable-web-security")
         chrome_options.add_argument("--allow-running-insecure-content")
         chrome_options.add_argument("--disable-features=VizDisplayCompositor")
         chrome_options.add_argument(f"--user-agent={self.ua.random}")
+        # Изображения, медиа, шрифты и трекеры не загружаются; JavaScript нужен для каталогов
+        self.resource_policy.configure(chrome_options)
         
         try:
             # Попытка использовать webdriver-manager
@@ -56,43 +109,85 @@ class ExhibitionScraper:
         
         return driver
     
-    def get_page_content(self, url, use_selenium=False):
+    def get_page_content(self, url, use_selenium=False, ready_selectors=None):
         """Получение содержимого страницы"""
+        started = time.monotonic()
+        content = None
         try:
             if use_selenium:
-                driver = self.setup_driver()
-                driver.get(url)
-                time.sleep(5)  # Ждем загрузки JavaScript
-                content = driver.page_source
-                driver.quit()
+                # Отрисованная страница могла остаться в кэше от предыдущего запуска
+                content = self.cache.load_rendered(url)
+                if content is not None:
+                    return content
+                if self.cache.offline:
+                    logger.warning(f"Офлайн-режим: страницы нет в кэше {url}")
+                    return None
+                
+                # Повторы при ошибках браузера через общий планировщик; слот хоста берет render_page
+                content = self.scheduler.run(
+                    url, lambda: self.render_page(url, ready_selectors), retry_on=(WebDriverException,)
+                )
+                self.metrics.inc('scraper_bytes', len(content.encode('utf-8')), host=host_of(url), source='browser')
+                self.cache.store_rendered(url, content)
                 return content
             else:
                 headers = {'User-Agent': self.ua.random}
-                response = requests.get(url, headers=headers, timeout=30)
-                response.raise_for_status()
-                return response.text
+                # Cookies согласия, полученные для домена раньше, подставляются без разбора баннера
+                content = self.consent.get(self.sessions.get_session(url), url, headers=headers, timeout=30)
+                return content
         except Exception as e:
             logger.error(f"Ошибка при получении страницы {url}: {e}")
+            content = None
             return None
+        finally:
+            self.metrics.page(url, 'selenium' if use_selenium else 'http', started, content)
+    
+    def render_page(self, url, ready_selectors=None):
+        """Загрузка страницы в браузере из пула"""
+        # Берем уже запущенный браузер из пула вместо запуска нового
+        with self.driver_pool.lease() as driver:
+            self.resource_policy.apply(driver, url)
+            # Слот хоста берется уже с браузером и только на загрузку и ожидание готовности
+            with self.scheduler.slot(url, kind='browser'):
+                driver.get(url)
+                # Ждем загрузки JavaScript по условиям, а не фиксированное время
+                self.readiness.wait(driver, url, ready_selectors)
+            return driver.page_source
+    
+    def has_exhibitor_blocks(self, content):
+        """Есть ли на странице хотя бы один блок участника с названием"""
+        blocks = make_soup(content).find_all(['div', 'article'], class_=EXHIBITOR_BLOCK_CLASS)
+        return any(EXHIBITOR_RULES.extract_field(block, 'Name') for block in blocks)
+    
+    def has_exhibitor_links(self, content):
+        """Есть ли на странице ссылка на список участников"""
+        return any(
+            any(keyword in link_text.lower() for keyword in EXHIBITOR_LINK_KEYWORDS)
+            for link_text, _ in find_links(content)
+        )
     
     def scrape_eltefa(self):
         """Парсинг выставки ELTEFA"""
         logger.info("Начинаем парсинг ELTEFA...")
+        
+        # Каталог, найденный в прерванном запуске, обрабатываем без повторного поиска ссылки
+        directory = self.state.get_meta('eltefa:directory')
+        if directory:
+            self.scrape_eltefa_exhibitors(directory)
+            return
+        
         url = "https://www.messe-stuttgart.de/eltefa/?hl=de-DE"
         
         # Получаем основную страницу
-        content = self.get_page_content(url, use_selenium=True)
+        content = self.hybrid.fetch(url, self.has_exhibitor_links, ready_selectors=EXHIBITOR_LINK_SELECTORS)
         if not content:
             return
         
-        soup = BeautifulSoup(content, 'html.parser')
-        
         # Ищем ссылку на список участников
         exhibitors_link = None
-        links = soup.find_all('a', href=True)
-        for link in links:
-            if any(keyword in link.text.lower() for keyword in ['aussteller', 'exhibitor', 'teilnehmer']):
-                exhibitors_link = link['href']
+        for link_text, href in find_links(content):
+            if any(keyword in link_text.lower() for keyword in EXHIBITOR_LINK_KEYWORDS):
+                exhibitors_link = href
                 break
         
         if exhibitors_link:
@@ -100,108 +195,106 @@ class ExhibitionScraper:
                 exhibitors_link = f"https://www.messe-stuttgart.de{exhibitors_link}"
             
             # Парсим страницу участников
+            self.state.set_meta('eltefa:directory', exhibitors_link)
             self.scrape_eltefa_exhibitors(exhibitors_link)
         else:
             logger.warning("Ссылка на участников не найдена")
     
     def scrape_eltefa_exhibitors(self, url):
         """Парсинг участников ELTEFA"""
-        content = self.get_page_content(url, use_selenium=True)
+        content = self.hybrid.fetch(url, self.has_exhibitor_blocks, ready_selectors=EXHIBITOR_READY_SELECTORS)
         if not content:
             return
         
-        soup = BeautifulSoup(content, 'html.parser')
+        soup = make_soup(content)
         
         # Ищем блоки с участниками
-        exhibitor_blocks = soup.find_all(['div', 'article'], class_=re.compile(r'exhibitor|aussteller|company'))
+        exhibitor_blocks = soup.find_all(['div', 'article'], class_=EXHIBITOR_BLOCK_CLASS)
         
         for block in exhibitor_blocks:
             try:
-                name = self.extract_text(block, ['h1', 'h2', 'h3', '.company-name', '.exhibitor-name'])
-                city = self.extract_text(block, ['.city', '.location', '[data-city]'])
-                country = self.extract_text(block, ['.country', '[data-country]'])
-                website = self.extract_link(block, 'a[href*="http"]')
-                email = self.extract_email(block)
-                
-                if name:
-                    self.exhibitors_data.append({
-                        'Name': name.strip(),
-                        'City': city.strip() if city else '',
-                        'Country': country.strip() if country else '',
-                        'Website': website if website else '',
-                        'Email': email if email else ''
-                    })
-                    logger.info(f"Добавлен участник: {name}")
+                # В инкрементальном режиме блок с тем же текстом берется из снимка без извлечения
+                content_hash = block_hash(block)
+                exhibitor = self.state.unchanged_exhibitor('eltefa', content_hash) if self.incremental else None
+                if exhibitor is None:
+                    # Все поля блока извлекаются за один проход скомпилированными правилами
+                    with self.metrics.stage('extract'):
+                        exhibitor = EXHIBITOR_RULES.extract(block)
+                # Участники, записанные до перезапуска, повторно не добавляются
+                if exhibitor and self.add_exhibitor('eltefa', exhibitor, content_hash):
+                    logger.info(f"Добавлен участник: {exhibitor['Name']}")
                     
             except Exception as e:
                 logger.error(f"Ошибка при парсинге участника: {e}")
+        
+        # Выставка обработана полностью - при продолжении запуска не повторяется
+        self.state.mark_done('eltefa')
     
     def scrape_ihm(self):
         """Парсинг выставки IHM"""
         logger.info("Начинаем парсинг IHM...")
+        
+        # Каталог, найденный в прерванном запуске, обрабатываем без повторного поиска ссылки
+        directory = self.state.get_meta('ihm:directory')
+        if directory:
+            self.scrape_ihm_exhibitors(directory)
+            return
+        
         url = "https://www.ihm.de/en/home?hl=de-DE"
         
-        content = self.get_page_content(url, use_selenium=True)
+        content = self.hybrid.fetch(url, self.has_exhibitor_links, ready_selectors=EXHIBITOR_LINK_SELECTORS)
         if not content:
             return
         
-        soup = BeautifulSoup(content, 'html.parser')
-        
         # Ищем ссылку на список участников
         exhibitors_link = None
-        links = soup.find_all('a', href=True)
-        for link in links:
-            if any(keyword in link.text.lower() for keyword in ['aussteller', 'exhibitor', 'teilnehmer']):
-                exhibitors_link = link['href']
+        for link_text, href in find_links(content):
+            if any(keyword in link_text.lower() for keyword in EXHIBITOR_LINK_KEYWORDS):
+                exhibitors_link = href
                 break
         
         if exhibitors_link:
             if not exhibitors_link.startswith('http'):
                 exhibitors_link = f"https://www.ihm.de{exhibitors_link}"
             
+            self.state.set_meta('ihm:directory', exhibitors_link)
             self.scrape_ihm_exhibitors(exhibitors_link)
         else:
             logger.warning("Ссылка на участников не найдена")
     
     def scrape_ihm_exhibitors(self, url):
         """Парсинг участников IHM"""
-        content = self.get_page_content(url, use_selenium=True)
+        content = self.hybrid.fetch(url, self.has_exhibitor_blocks, ready_selectors=EXHIBITOR_READY_SELECTORS)
         if not content:
             return
         
-        soup = BeautifulSoup(content, 'html.parser')
+        soup = make_soup(content)
         
         # Ищем блоки с участниками
-        exhibitor_blocks = soup.find_all(['div', 'article'], class_=re.compile(r'exhibitor|aussteller|company'))
+        exhibitor_blocks = soup.find_all(['div', 'article'], class_=EXHIBITOR_BLOCK_CLASS)
         
         for block in exhibitor_blocks:
             try:
-                name = self.extract_text(block, ['h1', 'h2', 'h3', '.company-name', '.exhibitor-name'])
-                city = self.extract_text(block, ['.city', '.location', '[data-city]'])
-                country = self.extract_text(block, ['.country', '[data-country]'])
-                website = self.extract_link(block, 'a[href*="http"]')
-                email = self.extract_email(block)
-                
-                if name:
-                    self.exhibitors_data.append({
-                        'Name': name.strip(),
-                        'City': city.strip() if city else '',
-                        'Country': country.strip() if country else '',
-                        'Website': website if website else '',
-                        'Email': email if email else ''
-                    })
-                    logger.info(f"Добавлен участник: {name}")
+                # В инкрементальном режиме блок с тем же текстом берется из снимка без извлечения
+                content_hash = block_hash(block)
+                exhibitor = self.state.unchanged_exhibitor('ihm', content_hash) if self.incremental else None
+                if exhibitor is None:
+                    # Все поля блока извлекаются за один проход скомпилированными правилами
+                    with self.metrics.stage('extract'):
+                        exhibitor = EXHIBITOR_RULES.extract(block)
+                # Участники, записанные до перезапуска, повторно не добавляются
+                if exhibitor and self.add_exhibitor('ihm', exhibitor, content_hash):
+                    logger.info(f"Добавлен участник: {exhibitor['Name']}")
                     
             except Exception as e:
                 logger.error(f"Ошибка при парсинге участника: {e}")
+        
+        # Выставка обработана полностью - при продолжении запуска не повторяется
+        self.state.mark_done('ihm')
     
     def extract_text(self, element, selectors):
         """Извлечение текста по селекторам"""
-        for selector in selectors:
-            found = element.select_one(selector)
-            if found and found.get_text(strip=True):
-                return found.get_text(strip=True)
-        return None
+        return select_text(element, selectors)
     
     def extract_link(self, element, selector):
         """Извлечение ссылки"""
@@ -215,10 +308,89 @@ class ExhibitionScraper:
     
     def extract_email(self, element):
         """Извлечение email"""
-        text = element.get_text()
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        return emails[0] if emails else None
+        return find_email(element.get_text())
+    
+    def add_exhibitor(self, scope, exhibitor, content_hash=None):
+        """Запись участника; False, если он уже был сохранен до перезапуска"""
+        if not self.state.add_exhibitor(scope, exhibitor, content_hash):
+            return False
+        self.exhibitors_data.append(exhibitor)
+        if self.on_exhibitor:
+            self.on_exhibitor(scope, exhibitor)
+        return True
+    
+    def add_contacts(self, company_name, contacts):
+        """Запись найденных контактов компании"""
+        for contact in contacts:
+            record = {
+                'Company Name': company_name,
+                'Full Name': contact.get('name', ''),
+                'Position': contact.get('position', ''),
+                'Email': contact.get('email', ''),
+                'Source': contact.get('source', '')
+            }
+            if self.written_contacts is None or not self.written_contacts.take(record):
+                self.contacts_data.append(record)
+    
+    def companies_to_search(self):
+        """Компании, для которых нужен поиск контактов
+        
+        Поиски, выполненные до перезапуска, пропускаются; в инкрементальном режиме
+        контакты неизменившихся компаний берутся из снимка прошлого запуска.
+        """
+        for exhibitor, scope, change in self.state.exhibitor_changes():
+            company = self.company_to_search(exhibitor, scope, change)
+            if company:
+                yield company
+    
+    def company_to_search(self, exhibitor, scope, change):
+        """(компания, сайт) для поиска контактов или None, если искать не нужно"""
+        company_name = exhibitor['Name']
+        if self.state.get_contacts(company_name) is not None:
+            return None
+        if self.incremental and change == 'unchanged':
+            contacts = self.state.snapshot_contacts(scope, exhibitor)
+            if contacts is not None:
+                self.state.store_contacts(company_name, exhibitor.get('Website'), contacts)
+                self.add_contacts(company_name, contacts)
+                return None
+        return company_name, exhibitor.get('Website')
+    
+    def write_changes(self):
+        """Запись изменений относительно прошлого запуска
+        
+        В инкрементальном режиме к результатам добавляются участники выставок, не
+        обработанных в этом запуске, - получается объединенный снимок.
+        Возвращает список полностью обработанных выставок.
+        """
+        done_scopes = [scope for scope in FAIRS if self.state.is_done(scope)]
+        if self.incremental:
+            for exhibitor, contacts in self.state.carried_over(done_scopes):
+                if self.written_exhibitors is None or not self.written_exhibitors.take(exhibitor):
+                    self.exhibitors_data.append(exhibitor)
+                self.add_contacts(exhibitor['Name'], contacts)
+        for change in self.state.delta(done_scopes):
+            self.delta_data.append(change)
+        logger.info(f"Изменений относительно прошлого запуска: {len(self.delta_data)}")
+        return done_scopes
+    
+    def restore_from_state(self):
+        """Перенос результатов прерванного запуска в файлы вывода
+
+        Файлы открыты на дописывание: записи, которые прерванный запуск успел
+        сохранить, остаются на месте, дописываются только недостающие.
+        """
+        self.written_exhibitors = WrittenRecords(self.exhibitors_data)
+        self.written_contacts = WrittenRecords(self.contacts_data)
+        kept = len(self.exhibitors_data)
+        for exhibitor in self.state.exhibitors():
+            if not self.written_exhibitors.take(exhibitor):
+                self.exhibitors_data.append(exhibitor)
+            contacts = self.state.get_contacts(exhibitor['Name'])
+            if contacts:
+                self.add_contacts(exhibitor['Name'], contacts)
+        logger.info(f"Восстановлено {len(self.exhibitors_data)} участников и {len(self.contacts_data)} контактов "
+                    f"(из файлов прерванного запуска: {kept})")
     
     def search_contacts(self, company_name, website_url=None):
         """Поиск контактных лиц для компании"""
@@ -233,58 +405,110 @@ class ExhibitionScraper:
                 logger.warning("Нет данных для сохранения")
                 return
             
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                # Сохраняем данные участников
-                if self.exhibitors_data:
-                    df_exhibitors = pd.DataFrame(self.exhibitors_data)
-                    df_exhibitors.to_excel(writer, sheet_name='Exhibitors', index=False)
-                    logger.info(f"Сохранено {len(self.exhibitors_data)} участников")
-                else:
-                    # Создаем пустой лист с заголовками
-                    df_exhibitors = pd.DataFrame(columns=['Name', 'City', 'Country', 'Website', 'Email'])
-                    df_exhibitors.to_excel(writer, sheet_name='Exhibitors', index=False)
-                    logger.info("Создан пустой лист участников")
-                
-                # Сохраняем данные контактов
-                if self.contacts_data:
-                    df_contacts = pd.DataFrame(self.contacts_data)
-                    df_contacts.to_excel(writer, sheet_name='Contacts', index=False)
-                    logger.info(f"Сохранено {len(self.contacts_data)} контактов")
-                else:
-                    # Создаем пустой лист с заголовками
-                    df_contacts = pd.DataFrame(columns=['Company Name', 'Full Name', 'Position', 'Email', 'Source'])
-                    df_contacts.to_excel(writer, sheet_name='Contacts', index=False)
-                    logger.info("Создан пустой лист контактов")
-            
+            # Книга собирается построчно из файлов потока, данные целиком в память не загружаются
+            with self.metrics.stage('export', len(self.exhibitors_data) + len(self.contacts_data)):
+                write_excel(filename, [
+                    ('Exhibitors', self.exhibitors_data, EXHIBITOR_COLUMNS),
+                    ('Contacts', self.contacts_data, CONTACT_COLUMNS),
+                    ('Changes', self.delta_data, DELTA_COLUMNS),
+                ])
+            logger.info(f"Сохранено {len(self.exhibitors_data)} участников")
+            logger.info(f"Сохранено {len(self.contacts_data)} контактов")
             logger.info(f"Данные сохранены в файл: {filename}")
             
         except Exception as e:
             logger.error(f"Ошибка при сохранении файла: {e}")
     
+    def run_pipeline(self):
+        """Обход выставок и поиск контактов конвейером
+
+        Стадии: выставки (поиск каталога, загрузка и разбор страницы) -> поиск
+        контактов -> запись. Очереди между стадиями ограничены: если поиск
+        контактов не успевает, обход каталогов ждет, и память не растет.
+        Браузеры закрываются, как только обход каталогов закончен.
+        """
+        pipeline = Pipeline('exhibition')
+        pipeline.stage('fairs', self.scrape_fair, workers=len(FAIRS), on_done=self.driver_pool.close)
+        pipeline.stage('contacts', self.find_contacts, workers=self.contact_finder.max_workers)
+        pipeline.stage('export', self.store_found_contacts)
+        
+        # Компания может встретиться на обеих выставках - в очередь она попадает один раз
+        queued = set()
+        lock = threading.Lock()
+        
+        def queue_contacts(scope, exhibitor):
+            company = self.company_to_search(exhibitor, scope, self.state.exhibitor_change(scope, exhibitor))
+            if not company:
+                return
+            with lock:
+                if company[0] in queued:
+                    return
+                queued.add(company[0])
+            pipeline.put('contacts', company)
+        
+        self.on_exhibitor = queue_contacts
+        try:
+            pipeline.run([fair for fair in FAIRS if not self.state.is_done(fair)])
+        finally:
+            self.on_exhibitor = None
+    
+    def scrape_fair(self, fair):
+        """Парсинг одной выставки (стадия конвейера)"""
+        {'eltefa': self.scrape_eltefa, 'ihm': self.scrape_ihm}[fair]()
+    
+    def find_contacts(self, company):
+        """Поиск контактов компании (стадия конвейера)"""
+        company_name, website_url = company
+        logger.info(f"Поиск контактов для: {company_name}")
+        return [(company_name, website_url, self.contact_finder.find_contacts_for_company(company_name, website_url))]
+    
+    def store_found_contacts(self, result):
+        """Запись найденных контактов (стадия конвейера)"""
+        company_name, website_url, contacts = result
+        self.state.store_contacts(company_name, website_url, contacts)
+        self.add_contacts(company_name, contacts)
+    
     def run(self):
         """Запуск парсинга"""
         logger.info("Начинаем парсинг выставок...")
         
-        # Парсим ELTEFA
-        self.scrape_eltefa()
+        # Прерванный запуск продолжается с места остановки
+        if self.state.begin_run():
+            self.restore_from_state()
+        
+        try:
+            if self.use_pipeline:
+                # Выставки обходятся параллельно, контакты ищутся по мере появления участников
+                self.run_pipeline()
+            else:
+                # Парсим ELTEFA
+                if not self.state.is_done('eltefa'):
+                    self.scrape_eltefa()
+                
+                # Парсим IHM
+                if not self.state.is_done('ihm'):
+                    self.scrape_ihm()
+        finally:
+            # Браузеры больше не нужны - закрываем пул
+            self.driver_pool.close()
         
-        # Парсим IHM
-        self.scrape_ihm()
+        # Поиск контактов параллельно, результаты приходят по мере готовности
+        # (уже выполненные поиски и неизменившиеся компании пропускаются;
+        # в режиме конвейера остаются только участники, записанные до перезапуска)
+        for company_name, website_url, contacts in self.contact_finder.find_contacts_for_companies(self.companies_to_search()):
+            self.state.store_contacts(company_name, website_url, contacts)
+            self.add_contacts(company_name, contacts)
         
-        # Поиск контактов для каждой компании
-        for exhibitor in self.exhibitors_data:
-            contacts = self.search_contacts(exhibitor['Name'], exhibitor.get('Website'))
-            for contact in contacts:
-                self.contacts_data.append({
-                    'Company Name': exhibitor['Name'],
-                    'Full Name': contact.get('name', ''),
-                    'Position': contact.get('position', ''),
-                    'Email': contact.get('email', ''),
-                    'Source': contact.get('source', '')
-                })
+        # Изменения и объединенный снимок
+        done_scopes = self.write_changes()
         
         # Сохраняем результаты
         self.save_to_excel()
+        self.state.commit_snapshot(done_scopes)
+        self.state.finish_run()
+        
+        # Счетчики и задержки по хостам и стадиям для мониторинга
+        self.metrics.write()
 
 if __name__ == "__main__":
     scraper = ExhibitionScraper()
@@ -0,0 +1,209 @@
+"""
+Потоковая запись результатов: JSONL/CSV по мере поступления и Excel из потока
+"""
+
+import os
+import csv
+import json
+import threading
+import logging
+from itertools import islice
+from collections import Counter
+from openpyxl import Workbook
+
+logger = logging.getLogger(__name__)
+
+# Каталог для потоковых файлов результатов
+OUTPUT_DIR = 'output'
+
+EXHIBITOR_COLUMNS = ['Name', 'City', 'Country', 'Website', 'Email']
+CONTACT_COLUMNS = ['Company Name', 'Full Name', 'Position', 'Email', 'Source']
+DELTA_COLUMNS = ['Change'] + EXHIBITOR_COLUMNS
+
+
+class JsonlSink:
+    """Построчная запись записей в JSONL с немедленным сбросом на диск"""
+
+    def __init__(self, path, mode='w'):
+        self.path = path
+        self.file = open(path, mode, encoding='utf-8')
+        if mode == 'a' and self.file.tell() > 0 and not ends_with_newline(path):
+            self.file.write('\n')  # Строка, оборванная при сбое, не склеивается со следующей записью
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+class CsvSink:
+    """Построчная запись записей в CSV (колонки фиксируются при создании)"""
+
+    def __init__(self, path, columns, mode='w'):
+        self.path = path
+        write_header = mode == 'w' or not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, mode, encoding='utf-8-sig', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=columns, extrasaction='ignore')
+        if write_header:
+            self.writer.writeheader()
+            self.file.flush()
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class RecordStream:
+    """Список записей, хранящийся на диске
+
+    Поддерживает то, что парсеры делают со списками данных (append, len, bool,
+    итерация, срезы), но в памяти держит только счетчик и набор колонок.
+    Каждая запись сразу дописывается в JSONL (и CSV, если указан), поэтому
+    при падении уже найденные данные остаются на диске.
+    """
+
+    def __init__(self, path, columns=None, csv_path=None, mode='w'):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.columns = list(columns or [])
+        self.count = 0
+        self._lock = threading.Lock()
+
+        if mode == 'a' and os.path.exists(path):
+            # Дописываем к существующему файлу - восстанавливаем счетчик и колонки
+            for record in self.read():
+                self.count += 1
+                self.add_columns(record)
+
+        self.sinks = [JsonlSink(path, mode)]
+        if csv_path:
+            self.sinks.append(CsvSink(csv_path, self.columns, mode))
+
+    def add_columns(self, record):
+        for key in record:
+            if key not in self.columns:
+                self.columns.append(key)
+
+    def append(self, record):
+        """Запись сразу уходит на диск"""
+        with self._lock:
+            for sink in self.sinks:
+                sink.write(record)
+            self.add_columns(record)
+            self.count += 1
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def read(self, limit=None):
+        """Чтение записей с диска (только полностью записанные строки)"""
+        if not os.path.exists(self.path):
+            return
+        read = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for index, line in enumerate(f):
+                if limit is not None and read >= limit:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Пропущена поврежденная строка {index + 1} в {self.path}")
+                    continue
+                read += 1
+                yield record
+
+    def __iter__(self):
+        # Читаем только записи, существовавшие на момент начала итерации
+        return self.read(limit=self.count)
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            return list(islice(iter(self), start, stop, step))
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('RecordStream index out of range')
+        return next(islice(iter(self), index, None))
+
+    def close(self):
+        with self._lock:
+            for sink in self.sinks:
+                sink.close()
+            self.sinks = []
+
+
+class WrittenRecords:
+    """Записи, уже лежащие в файле потока
+
+    При продолжении прерванного запуска файлы открываются на дописывание, а
+    результаты восстанавливаются из состояния обхода; take() отсеивает записи,
+    которые уже есть на диске (каждая учитывается один раз).
+    """
+
+    def __init__(self, records):
+        self.counts = Counter(self.key(record) for record in records)
+
+    @staticmethod
+    def key(record):
+        return json.dumps(record, ensure_ascii=False, sort_keys=True)
+
+    def take(self, record):
+        """True, если запись уже есть в файле"""
+        key = self.key(record)
+        if self.counts.get(key):
+            self.counts[key] -= 1
+            return True
+        return False
+
+
+def write_excel(filename, sheets):
+    """Excel-файл из потоков записей в режиме write-only openpyxl
+
+    sheets - список (имя листа, записи, колонки). Строки пишутся по одной,
+    книга целиком в памяти не строится.
+    """
+    workbook = Workbook(write_only=True)
+    for sheet_name, records, columns in sheets:
+        sheet = workbook.create_sheet(title=sheet_name)
+        columns = list(getattr(records, 'columns', None) or columns)
+        sheet.append(columns)
+        rows = 0
+        for record in records:
+            sheet.append([record.get(column, '') for column in columns])
+            rows += 1
+        logger.info(f"Лист {sheet_name}: записано строк {rows}")
+    workbook.save(filename)
+
+
+def open_stream(name, columns, mode='w'):
+    """Поток записей в OUTPUT_DIR: name.jsonl и копия name.csv для просмотра"""
+    return RecordStream(
+        os.path.join(OUTPUT_DIR, f"{name}.jsonl"),
+        columns=columns,
+        csv_path=os.path.join(OUTPUT_DIR, f"{name}.csv"),
+        mode=mode,
+    )
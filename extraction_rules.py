@@ -0,0 +1,282 @@
+"""
+Декларативные правила извлечения полей, компилируемые один раз
+"""
+
+import re
+import logging
+import soupsieve
+from block_detector import compile_selector
+
+logger = logging.getLogger(__name__)
+
+# Общие шаблоны
+EMAIL_PATTERN = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+URL_PATTERN = r'https?://[^\s<>"]+'
+CITY_PATTERN = r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b'
+
+# Домены выставок - ссылки на них не считаются сайтом компании
+FAIR_DOMAINS = ['messe-stuttgart.de', 'ihm.de']
+
+GERMAN_CITIES = ['Berlin', 'Hamburg', 'Munich', 'Cologne', 'Frankfurt', 'Stuttgart',
+                 'Düsseldorf', 'Dortmund', 'Essen', 'Leipzig', 'Bremen', 'Dresden',
+                 'Hannover', 'Nuremberg', 'Duisburg', 'Bochum', 'Wuppertal', 'Bielefeld']
+
+COUNTRIES = ['Germany', 'Deutschland', 'USA', 'United States', 'UK', 'United Kingdom',
+             'France', 'Italy', 'Spain', 'Netherlands', 'Belgium', 'Switzerland', 'Austria']
+
+# Формат правила поля:
+#   selectors  - CSS-селекторы по приоритету; берется первый элемент каждого селектора
+#   attribute  - брать значение атрибута вместо текста
+#   add_scheme - дописывать https:// к значению без схемы
+#   length     - (min, max): допустимая длина текста, границы не включаются
+#   fallbacks  - запасные способы по порядку:
+#       {'type': 'child_text', 'tags': [...], 'length': (min, max)} - текст прямых потомков
+#       {'type': 'links', 'prefix': 'http', 'exclude': [...]}       - href ссылок блока
+#       {'type': 'regex', 'pattern': ..., 'allowed': [...], 'exclude': [...]} - поиск в тексте блока
+#       {'type': 'keywords', 'values': [...]}                        - первое слово, встреченное в тексте
+#   default    - значение, если ничего не найдено
+#   required   - без этого поля блок пропускается (остальные поля не извлекаются)
+
+# ExhibitionScraper (ELTEFA и IHM)
+BASIC_RULES = {
+    'Name': {'selectors': ['h1', 'h2', 'h3', '.company-name', '.exhibitor-name'], 'required': True},
+    'City': {'selectors': ['.city', '.location', '[data-city]'], 'default': ''},
+    'Country': {'selectors': ['.country', '[data-country]'], 'default': ''},
+    'Website': {'selectors': ['a[href*="http"]'], 'attribute': 'href', 'add_scheme': True, 'default': ''},
+    'Email': {'fallbacks': [{'type': 'regex', 'pattern': EMAIL_PATTERN}], 'default': ''},
+}
+
+# RequestsOnlyScraper (ELTEFA и IHM)
+REQUESTS_ONLY_RULES = {
+    'Name': {'selectors': ['h1', 'h2', 'h3', 'h4', '.company-name', '.exhibitor-name', 'strong', 'b'], 'required': True},
+    'City': {'selectors': ['.city', '.location', '[data-city]'], 'default': ''},
+    'Country': {'selectors': ['.country', '[data-country]'], 'default': 'Germany'},
+    'Website': {'selectors': ['a[href*="http"]'], 'attribute': 'href', 'add_scheme': True, 'default': ''},
+    'Email': {'fallbacks': [{'type': 'regex', 'pattern': EMAIL_PATTERN}], 'default': ''},
+}
+
+# AdvancedExhibitionScraper (ELTEFA и IHM)
+ADVANCED_RULES = {
+    'Name': {
+        'selectors': ['h1', 'h2', 'h3', 'h4', '.company-name', '.exhibitor-name', '.name',
+                      '.title', '.headline', '[data-name]', '[data-company]', 'strong', 'b'],
+        'length': (2, 100),
+        'fallbacks': [{'type': 'child_text', 'tags': ['p', 'span', 'div'], 'length': (3, 50)}],
+        'required': True,
+    },
+    'City': {
+        'selectors': ['.city', '.location', '.place', '[data-city]', '[data-location]', '.address', '.location-info'],
+        'fallbacks': [{'type': 'regex', 'pattern': CITY_PATTERN, 'allowed': GERMAN_CITIES}],
+        'default': '',
+    },
+    'Country': {
+        'selectors': ['.country', '.nation', '[data-country]', '[data-nation]'],
+        'fallbacks': [{'type': 'keywords', 'values': COUNTRIES}],
+        'default': 'Germany',  # По умолчанию для немецких выставок
+    },
+    'Website': {
+        'fallbacks': [
+            {'type': 'links', 'prefix': 'http', 'exclude': FAIR_DOMAINS},
+            {'type': 'regex', 'pattern': URL_PATTERN, 'exclude': FAIR_DOMAINS},
+        ],
+        'default': '',
+    },
+    'Email': {'fallbacks': [{'type': 'regex', 'pattern': EMAIL_PATTERN}], 'default': ''},
+}
+
+# ContactFinder - блоки с контактными лицами на сайтах компаний
+CONTACT_RULES = {
+    'name': {'selectors': ['h1', 'h2', 'h3', '.name', '.person-name', '[data-name]'], 'required': True},
+    'position': {'selectors': ['.position', '.title', '.job-title', '[data-position]'], 'required': True},
+    'email': {'fallbacks': [{'type': 'regex', 'pattern': EMAIL_PATTERN}]},
+}
+
+
+class FieldMatcher:
+    """Скомпилированное правило одного поля"""
+
+    def __init__(self, name, rule):
+        self.name = name
+        self.selectors = list(rule.get('selectors', []))
+        self.attribute = rule.get('attribute')
+        self.add_scheme = rule.get('add_scheme', False)
+        self.length = rule.get('length')
+        self.fallbacks = [self.compile_fallback(fallback) for fallback in rule.get('fallbacks', [])]
+        self.default = rule.get('default')
+        self.required = rule.get('required', False)
+
+    def compile_fallback(self, fallback):
+        """Подготовка запасного способа: регулярные выражения и множества значений"""
+        compiled = dict(fallback)
+        if fallback['type'] == 'regex':
+            compiled['pattern'] = re.compile(fallback['pattern'])
+            compiled['allowed'] = set(fallback['allowed']) if fallback.get('allowed') else None
+        elif fallback['type'] == 'keywords':
+            compiled['values'] = [(value, value.lower()) for value in fallback['values']]
+        elif fallback['type'] == 'child_text':
+            compiled['tags'] = set(fallback['tags'])
+        return compiled
+
+    def fits_length(self, text, length):
+        return length is None or length[0] < len(text) < length[1]
+
+    def extract(self, element, block_text, first_match):
+        """Значение поля
+
+        block_text - функция, возвращающая текст блока (считается один раз);
+        first_match - функция, возвращающая первый элемент блока по селектору.
+        """
+        for selector in self.selectors:
+            found = first_match(selector)
+            if not found:
+                continue
+            if self.attribute:
+                value = found.get(self.attribute)
+                if value:
+                    if self.add_scheme and not value.startswith('http'):
+                        value = f"https://{value}"
+                    return value
+                continue
+            text = found.get_text(strip=True)
+            if text and self.fits_length(text, self.length):
+                return text
+
+        for fallback in self.fallbacks:
+            value = self.apply_fallback(fallback, element, block_text)
+            if value:
+                return value
+
+        return self.default
+
+    def apply_fallback(self, fallback, element, block_text):
+        kind = fallback['type']
+
+        if kind == 'child_text':
+            for child in element.find_all(True, recursive=False):
+                if child.name in fallback['tags']:
+                    text = child.get_text(strip=True)
+                    if text and self.fits_length(text, fallback.get('length')):
+                        return text
+
+        elif kind == 'links':
+            exclude = fallback.get('exclude', ())
+            for link in element.find_all('a', href=True):
+                href = link['href']
+                if href.startswith(fallback.get('prefix', '')) and not any(domain in href for domain in exclude):
+                    return href
+
+        elif kind == 'regex':
+            exclude = fallback.get('exclude', ())
+            allowed = fallback['allowed']
+            for match in fallback['pattern'].finditer(block_text()):
+                value = match.group(0)
+                if allowed is not None and value not in allowed:
+                    continue
+                if any(domain in value for domain in exclude):
+                    continue
+                return value
+
+        elif kind == 'keywords':
+            text = block_text().lower()
+            for value, value_lower in fallback['values']:
+                if value_lower in text:
+                    return value
+
+        return None
+
+
+class ExtractionRules:
+    """Набор правил для сайта, применяемый к блоку за один проход"""
+
+    def __init__(self, rules):
+        self.fields = [FieldMatcher(name, rule) for name, rule in rules.items()]
+        self.by_name = {field.name: field for field in self.fields}
+
+        # Все селекторы всех полей проверяются за один обход потомков блока
+        selectors = list(dict.fromkeys(selector for field in self.fields for selector in field.selectors))
+        self.simple = []
+        self.complex = {}
+        for selector in selectors:
+            predicate = compile_selector(selector)
+            if predicate:
+                self.simple.append((selector, predicate))
+            else:
+                self.complex[selector] = soupsieve.compile(selector)
+
+    def match_selectors(self, element):
+        """Первый подходящий потомок блока для каждого простого селектора"""
+        matches = {}
+        remaining = list(self.simple)
+        for tag in element.find_all(True):
+            for item in remaining:
+                if item[1](tag):
+                    matches[item[0]] = tag
+            if len(matches) == len(self.simple):
+                break
+            if matches:
+                remaining = [item for item in remaining if item[0] not in matches]
+        return matches
+
+    def prepare(self, element):
+        """Ленивые функции доступа к тексту блока и совпадениям селекторов"""
+        text_cache = []
+        match_cache = []
+
+        def block_text():
+            # Полный текст блока нужен нескольким правилам - извлекаем его один раз
+            if not text_cache:
+                text_cache.append(element.get_text())
+            return text_cache[0]
+
+        def first_match(selector):
+            compiled = self.complex.get(selector)
+            if compiled is not None:
+                return compiled.select_one(element)
+            if not match_cache:
+                match_cache.append(self.match_selectors(element))
+            return match_cache[0].get(selector)
+
+        return block_text, first_match
+
+    def extract(self, element):
+        """Словарь значений полей или None, если обязательное поле не найдено"""
+        block_text, first_match = self.prepare(element)
+
+        record = {}
+        for field in self.fields:
+            value = field.extract(element, block_text, first_match)
+            if field.required and not value:
+                return None
+            record[field.name] = value.strip() if isinstance(value, str) else value
+        return record
+
+    def extract_field(self, element, name):
+        """Значение одного поля"""
+        block_text, first_match = self.prepare(element)
+        return self.by_name[name].extract(element, block_text, first_match)
+
+
+_selector_cache = {}
+
+
+def select_text(element, selectors):
+    """Текст первого непустого элемента по списку селекторов (селекторы компилируются один раз)"""
+    for selector in selectors:
+        compiled = _selector_cache.get(selector)
+        if compiled is None:
+            compiled = _selector_cache.setdefault(selector, soupsieve.compile(selector))
+        found = compiled.select_one(element)
+        if found:
+            text = found.get_text(strip=True)
+            if text:
+                return text
+    return None
+
+
+_email_regex = re.compile(EMAIL_PATTERN)
+
+
+def find_email(text):
+    """Первый email в тексте"""
+    match = _email_regex.search(text)
+    return match.group(0) if match else None
@@ -0,0 +1,268 @@
+"""
+Планировщик запросов по хостам: token bucket, адаптивная параллельность и повторы с паузой
+"""
+
+import os
+import time
+import random
+import threading
+import logging
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import get_default_metrics, host_of
+
+logger = logging.getLogger(__name__)
+
+# Ответы, после которых запрос стоит повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Ответы, означающие "слишком часто" - снижаем темп хоста
+THROTTLE_STATUSES = {429, 503}
+
+# Сетевые ошибки, после которых запрос стоит повторить
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+# Таймаут установки соединения: недоступный хост не должен занимать поток на весь таймаут чтения
+CONNECT_TIMEOUT = 10
+
+
+class HostState:
+    """Текущие лимиты и статистика одного хоста"""
+
+    def __init__(self, rate, burst, concurrency):
+        self.rate = rate                # Текущая частота запросов в секунду
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.limit = float(concurrency)  # Допустимое число одновременных запросов (AIMD)
+        self.active = 0
+        self.blocked_until = 0.0        # Пауза после ошибки или Retry-After
+        self.failures = 0               # Ошибок подряд - для экспоненциальной паузы
+        self.latency = {}               # Скользящее среднее времени ответа по виду загрузки (http / browser)
+        self.error_rate = 0.0           # Скользящая доля ошибок
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class HostScheduler:
+    """Общий для всех загрузок планировщик запросов к хостам
+
+    Для каждого хоста держит token bucket и предел одновременных запросов.
+    Предел растет на единицу за "окно" успешных быстрых ответов и делится пополам
+    при ошибках и 429/503 (AIMD); частота при этом тоже снижается и затем
+    постепенно восстанавливается. После ошибки хост ставится на паузу с
+    экспоненциальным ростом и случайным разбросом, Retry-After сервера соблюдается.
+
+    Загрузка в браузере (driver.get и ожидание готовности) заметно дольше
+    HTTP-запроса, поэтому ее время усредняется отдельно и сравнивается со своим
+    порогом browser_target_latency: медленный браузер не снижает параллельность
+    HTTP-запросов к тому же хосту.
+    """
+
+    def __init__(self, rate=2.0, burst=2, concurrency=2, max_concurrency=8, max_retries=3,
+                 backoff_base=1.0, backoff_max=60.0, target_latency=3.0, browser_target_latency=15.0,
+                 metrics=None):
+        self.rate = rate                        # Базовая частота запросов к одному хосту
+        self.burst = burst
+        self.concurrency = concurrency          # Начальный предел одновременных запросов
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.target_latency = target_latency    # Медленнее - хост перегружен, снижаем параллельность
+        self.browser_target_latency = browser_target_latency
+        self.hosts = {}
+        self.metrics = metrics or get_default_metrics()
+        self._condition = threading.Condition()
+
+    def host_state(self, host):
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(self.rate, self.burst, self.concurrency)
+        return state
+
+    def acquire(self, url):
+        """Ожидание разрешения на запрос к хосту; возвращает время начала"""
+        host = urlparse(url).netloc.lower()
+        with self._condition:
+            while True:
+                state = self.host_state(host)
+                now = time.monotonic()
+                state.refill(now)
+
+                if state.blocked_until > now:
+                    wait = state.blocked_until - now
+                elif state.active >= max(1, int(state.limit)):
+                    wait = 1.0  # Освобождение слота разбудит раньше
+                elif state.tokens < 1:
+                    wait = (1 - state.tokens) / state.rate
+                else:
+                    state.tokens -= 1
+                    state.active += 1
+                    return now
+
+                self._condition.wait(timeout=wait)
+
+    def release(self, url, started, ok, throttled=False, retry_after=None, kind='http'):
+        """Учет результата запроса и подстройка лимитов хоста (kind - http или browser)"""
+        host = urlparse(url).netloc.lower()
+        target = self.browser_target_latency if kind == 'browser' else self.target_latency
+        with self._condition:
+            state = self.host_state(host)
+            now = time.monotonic()
+            latency = now - started
+            state.active = max(0, state.active - 1)
+            average = state.latency.get(kind)
+            average = state.latency[kind] = latency if average is None else average * 0.8 + latency * 0.2
+            state.error_rate = state.error_rate * 0.8 + (0.0 if ok else 0.2)
+
+            if ok:
+                state.failures = 0
+                if average <= target and state.error_rate < 0.1:
+                    # Аддитивный рост: +1 к пределу примерно за limit успешных ответов
+                    state.limit = min(self.max_concurrency, state.limit + 1 / state.limit)
+                    state.rate = min(self.rate, state.rate * 1.1)
+                elif average > target * 2:
+                    state.limit = max(1.0, state.limit * 0.9)
+            else:
+                state.failures += 1
+                # Мультипликативное снижение при ошибках
+                state.limit = max(1.0, state.limit / 2)
+                if throttled:
+                    state.rate = max(self.rate / 16, state.rate / 2)
+                    state.tokens = 0
+                pause = retry_after if retry_after is not None else self.backoff(state.failures)
+                state.blocked_until = max(state.blocked_until, now + pause)
+                logger.info(f"Хост {host}: пауза {pause:.1f} с, параллельность {state.limit:.1f}, "
+                            f"частота {state.rate:.2f}/с")
+
+            self._condition.notify_all()
+        self.metrics.observe('scraper_request_seconds', latency, host=host, kind=kind)
+
+    def backoff(self, attempt):
+        """Экспоненциальная пауза со случайным разбросом"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.5)
+
+    @contextmanager
+    def slot(self, url, kind='http'):
+        """Запрос к хосту в рамках лимитов; результат отмечается в outcome"""
+        started = self.acquire(url)
+        outcome = {'ok': True, 'throttled': False, 'retry_after': None}
+        try:
+            yield outcome
+        except Exception:
+            outcome['ok'] = False
+            raise
+        finally:
+            self.release(url, started, outcome['ok'], outcome['throttled'], outcome['retry_after'], kind)
+
+    def send(self, url, send):
+        """HTTP-запрос с повторами: send() -> Response"""
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                with self.slot(url) as outcome:
+                    response = send()
+                    self.metrics.inc('scraper_requests', host=host_of(url), status=response.status_code)
+                    if response.status_code in RETRY_STATUSES:
+                        outcome['ok'] = False
+                        outcome['throttled'] = response.status_code in THROTTLE_STATUSES
+                        outcome['retry_after'] = parse_retry_after(response.headers.get('Retry-After'), self.backoff_max)
+            except RETRY_EXCEPTIONS as e:
+                if last:
+                    raise
+                self.metrics.inc('scraper_retries', host=host_of(url), reason=e.__class__.__name__)
+                logger.warning(f"Ошибка запроса {url} ({e.__class__.__name__}), повтор {attempt + 1}/{self.max_retries}")
+                continue
+
+            if response.status_code not in RETRY_STATUSES or last:
+                return response
+            self.metrics.inc('scraper_retries', host=host_of(url), reason=response.status_code)
+            logger.warning(f"Ответ {response.status_code} для {url}, повтор {attempt + 1}/{self.max_retries}")
+            response.close()
+
+    def run(self, url, load, retry_on=(Exception,)):
+        """Произвольная загрузка (например, через браузер) с повторами
+
+        Слот хоста load() берет сам через slot(url, kind='browser') и только на
+        обращение к хосту: ожидание браузера из пула и работа со страницей после
+        загрузки не должны занимать слот и попадать во время ответа хоста.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return load()
+            except retry_on as e:
+                if attempt == self.max_retries:
+                    raise
+                self.metrics.inc('scraper_retries', host=host_of(url), reason=e.__class__.__name__)
+                logger.warning(f"Ошибка загрузки {url} ({e.__class__.__name__}), повтор {attempt + 1}/{self.max_retries}")
+
+    def stats(self):
+        """Текущие лимиты по хостам (для логов и отладки)"""
+        with self._condition:
+            return {
+                host: {'rate': round(state.rate, 2), 'limit': round(state.limit, 1),
+                       'latency': {kind: round(value, 2) for kind, value in state.latency.items()},
+                       'error_rate': round(state.error_rate, 2)}
+                for host, state in self.hosts.items()
+            }
+
+
+def parse_retry_after(value, maximum):
+    """Retry-After в секундах (число или HTTP-дата); None, если заголовка нет"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(maximum, max(0.0, seconds))
+
+
+class ScheduledAdapter(HTTPAdapter):
+    """Транспортный адаптер requests, отправляющий запросы через HostScheduler"""
+
+    def __init__(self, scheduler=None, **kwargs):
+        self.scheduler = scheduler or get_default_scheduler()
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        timeout = kwargs.get('timeout')
+        if isinstance(timeout, (int, float)):
+            kwargs['timeout'] = (min(CONNECT_TIMEOUT, timeout), timeout)
+        response = self.scheduler.send(request.url, lambda: super(ScheduledAdapter, self).send(request, **kwargs))
+        if not kwargs.get('stream'):
+            # Тело все равно читается requests сразу после адаптера
+            self.scheduler.metrics.inc('scraper_bytes', len(response.content), host=host_of(request.url), source='network')
+        return response
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_default_scheduler():
+    """Общий планировщик для всех парсеров; настраивается переменными окружения
+
+    SCRAPER_HOST_RATE - запросов в секунду к одному хосту
+    SCRAPER_HOST_CONCURRENCY - максимум одновременных запросов к одному хосту
+    SCRAPER_MAX_RETRIES - количество повторов
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = HostScheduler(
+                rate=float(os.environ.get('SCRAPER_HOST_RATE', 2.0)),
+                max_concurrency=int(os.environ.get('SCRAPER_HOST_CONCURRENCY', 8)),
+                max_retries=int(os.environ.get('SCRAPER_MAX_RETRIES', 3)),
+            )
+        return _default_scheduler
@@ -0,0 +1,76 @@
+"""
+Разбор HTML: lxml по умолчанию и кэш разобранных документов
+"""
+
+import threading
+import logging
+from collections import OrderedDict
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    PARSER = 'lxml'
+except ImportError:  # lxml не установлен - используем встроенный парсер
+    lxml = None
+    PARSER = 'html.parser'
+
+logger = logging.getLogger(__name__)
+
+
+class ParsedCache:
+    """Небольшой LRU-кэш разобранных документов по тексту ответа"""
+
+    def __init__(self, max_items=16):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_parse(self, kind, content, parse):
+        key = (kind, content)
+        with self._lock:
+            document = self._items.get(key)
+            if document is not None:
+                self._items.move_to_end(key)
+                return document
+
+        document = parse(content)
+
+        with self._lock:
+            self._items[key] = document
+            if len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return document
+
+
+_cache = ParsedCache()
+
+
+def make_soup(content):
+    """BeautifulSoup-документ; один и тот же ответ разбирается только один раз"""
+    return _cache.get_or_parse('soup', content, lambda text: BeautifulSoup(text, PARSER))
+
+
+def make_tree(content):
+    """Дерево lxml для быстрых XPath-запросов (None, если lxml недоступен)"""
+    if lxml is None:
+        return None
+    return _cache.get_or_parse('tree', content, lambda text: lxml.html.fromstring(text))
+
+
+def find_links(content, use_xpath=True):
+    """Все ссылки страницы в виде списка (текст, href)
+
+    Быстрый путь через XPath не строит дерево BeautifulSoup вообще.
+    """
+    if use_xpath and lxml is not None:
+        try:
+            tree = make_tree(content)
+            return [
+                (' '.join(link.text_content().split()), link.get('href'))
+                for link in tree.xpath('//a[@href]')
+            ]
+        except Exception as e:
+            logger.debug(f"XPath-разбор не удался, используем BeautifulSoup: {e}")
+
+    soup = make_soup(content)
+    return [(link.get_text(strip=True), link['href']) for link in soup.find_all('a', href=True)]
@@ -0,0 +1,287 @@
+"""
+Дисковый кэш HTTP-ответов с повторной проверкой (ETag / Last-Modified)
+"""
+
+import io
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+import requests
+from host_scheduler import ScheduledAdapter
+from metrics import get_default_metrics, host_of
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+# Заголовки, которые не переносим в кэш: тело уже распаковано requests
+SKIP_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection', 'set-cookie'}
+
+
+class HttpCache:
+    """Кэш ответов на диске: TTL, ревалидация, LRU-вытеснение и офлайн-режим"""
+
+    def __init__(self, cache_dir='.http_cache', ttl=6 * 3600, max_size_mb=500, offline=False,
+                 vary_headers=('Accept-Language',)):
+        self.cache_dir = cache_dir
+        self.ttl = ttl                        # Время, в течение которого ответ считается свежим (секунды)
+        self.max_size = max_size_mb * 1024 * 1024
+        self.offline = offline                # Только воспроизведение из кэша, без сети
+        self.vary_headers = vary_headers      # Заголовки запроса, влияющие на ключ
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.metrics = get_default_metrics()
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, method, url, headers=None):
+        """Ключ кэша: метод, URL и значимые заголовки"""
+        headers = headers or {}
+        parts = [method.upper(), url]
+        for name in self.vary_headers:
+            parts.append(f"{name}={headers.get(name, '')}")
+        # Учитываем только имена cookies: согласие меняет страницу, а id сессии - нет
+        cookie_header = headers.get('Cookie', '')
+        cookie_names = sorted(item.split('=', 1)[0].strip() for item in cookie_header.split(';') if item.strip())
+        parts.append(f"cookies={','.join(cookie_names)}")
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        """Пути к метаданным и телу ответа"""
+        directory = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(directory, f"{key}.json"), os.path.join(directory, f"{key}.body")
+
+    def load(self, key):
+        """Загрузка записи из кэша (метаданные, тело) или None"""
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+
+        # Время доступа используется для LRU-вытеснения
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        return meta, body
+
+    def is_fresh(self, meta):
+        """Проверка, не истек ли TTL записи"""
+        return time.time() - meta.get('stored_at', 0) < meta.get('ttl', self.ttl)
+
+    def store(self, key, url, status, headers, body, ttl=None):
+        """Сохранение ответа в кэш"""
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+
+        meta = {
+            'url': url,
+            'status': status,
+            'headers': {name: value for name, value in headers.items() if name.lower() not in SKIP_HEADERS},
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'stored_at': time.time(),
+            'ttl': self.ttl if ttl is None else ttl,
+        }
+
+        old_size = self._file_size(body_path)
+        # Пишем во временные файлы и атомарно подменяем, чтобы не оставить битую запись
+        self._write_atomic(body_path, body)
+        self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+        with self._lock:
+            if self._size is not None:
+                self._size += len(body) - old_size
+        self.evict()
+
+    def refresh(self, key, meta):
+        """Продление свежести записи после ответа 304 Not Modified"""
+        meta_path, _ = self._paths(key)
+        meta['stored_at'] = time.time()
+        self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def count(self, url, result, kind='http', body=None):
+        """Учет обращения к кэшу: hit / miss / revalidated"""
+        with self._lock:
+            if result == 'hit':
+                self.hits += 1
+            elif result == 'miss':
+                self.misses += 1
+            else:
+                self.revalidated += 1
+        host = host_of(url)
+        self.metrics.inc('scraper_cache', host=host, result=result, kind=kind)
+        if body is not None:
+            self.metrics.inc('scraper_bytes', len(body), host=host, source='cache')
+
+    def load_rendered(self, url):
+        """HTML страницы, отрисованной в браузере, если он еще свежий"""
+        entry = self.load(self.make_key('RENDER', url))
+        if entry and (self.offline or self.is_fresh(entry[0])):
+            self.count(url, 'hit', 'rendered', entry[1])
+            return entry[1].decode('utf-8')
+        self.count(url, 'miss', 'rendered')
+        return None
+
+    def store_rendered(self, url, html):
+        """Сохранение HTML страницы, отрисованной в браузере"""
+        self.store(self.make_key('RENDER', url), url, 200, {}, html.encode('utf-8'))
+
+    def evict(self):
+        """Удаление давно не использованных записей при превышении размера"""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            if self._size <= self.max_size:
+                return
+
+            entries = sorted(self._scan(), key=lambda entry: entry[2])  # Старые по времени доступа - первыми
+            target = self.max_size * 0.9
+            removed = 0
+            for body_path, size, _ in entries:
+                if self._size <= target:
+                    break
+                for path in (body_path, body_path[:-len('.body')] + '.json'):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                self._size -= size
+                removed += 1
+            logger.info(f"Из кэша удалено записей: {removed}")
+
+    def _scan(self):
+        """Все тела ответов в кэше: (путь, размер, время доступа)"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.body'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _file_size(self, path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class CachingAdapter(ScheduledAdapter):
+    """Транспортный адаптер requests, отвечающий из дискового кэша
+
+    Запросы, которые все-таки уходят в сеть, проходят через HostScheduler.
+    """
+
+    def __init__(self, cache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if request.method not in ('GET', 'HEAD') or kwargs.get('stream'):
+            if self.cache.offline:
+                raise requests.exceptions.ConnectionError(f"Офлайн-режим: запрос {request.method} {request.url} невозможен")
+            return super().send(request, **kwargs)
+
+        key = self.cache.make_key(request.method, request.url, request.headers)
+        entry = self.cache.load(key)
+
+        if entry:
+            meta, body = entry
+            if self.cache.offline or self.cache.is_fresh(meta):
+                self.cache.count(request.url, 'hit', body=body)
+                return self.build_cached_response(request, meta, body)
+        elif self.cache.offline:
+            self.cache.count(request.url, 'miss')
+            raise requests.exceptions.ConnectionError(f"Офлайн-режим: нет в кэше {request.url}")
+
+        if not entry:
+            self.cache.count(request.url, 'miss')
+
+        # Условный запрос: сервер ответит 304, если страница не изменилась
+        if entry:
+            if meta.get('etag'):
+                request.headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request.headers['If-Modified-Since'] = meta['last_modified']
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.count(request.url, 'revalidated', body=body)
+            self.cache.refresh(key, meta)
+            return self.build_cached_response(request, meta, body)
+
+        if entry:
+            self.cache.count(request.url, 'miss')  # Устаревшая запись: сервер прислал страницу целиком
+
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        if response.status_code == 200 and 'no-store' not in cache_control:
+            self.cache.store(key, request.url, response.status_code, response.headers, response.content)
+
+        return response
+
+    def build_cached_response(self, request, meta, body):
+        """Создание объекта Response из записи кэша"""
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response._content_consumed = True   # Тело уже в памяти: iter_content() отдает его частями
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
+
+
+def mount_cache(session, cache=None, **adapter_kwargs):
+    """Подключение кэша к существующей сессии requests"""
+    adapter = CachingAdapter(cache or get_default_cache(), **adapter_kwargs)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Общий кэш для всех парсеров; настраивается переменными окружения
+
+    SCRAPER_CACHE_DIR - каталог кэша (по умолчанию .http_cache)
+    SCRAPER_CACHE_TTL - время свежести в секундах
+    SCRAPER_CACHE_MAX_MB - максимальный размер кэша
+    SCRAPER_OFFLINE=1 - только воспроизведение из кэша
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache(
+                cache_dir=os.environ.get('SCRAPER_CACHE_DIR', '.http_cache'),
+                ttl=int(os.environ.get('SCRAPER_CACHE_TTL', 6 * 3600)),
+                max_size_mb=int(os.environ.get('SCRAPER_CACHE_MAX_MB', 500)),
+                offline=os.environ.get('SCRAPER_OFFLINE') == '1',
+            )
+        return _default_cache
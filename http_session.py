@@ -0,0 +1,63 @@
+"""
+Общие HTTP-сессии с пулом keep-alive соединений по хостам
+"""
+
+import threading
+import logging
+from urllib.parse import urlparse
+import requests
+from http_cache import CachingAdapter
+from host_scheduler import ScheduledAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPool:
+    """Одна долгоживущая сессия requests на каждый хост"""
+
+    def __init__(self, headers=None, pool_connections=4, pool_maxsize=10, cache=None, scheduler=None):
+        self.headers = headers or {}
+        self.cache = cache                        # HttpCache; None - без кэширования
+        self.scheduler = scheduler                # HostScheduler; None - общий планировщик
+        self.pool_connections = pool_connections  # Количество пулов соединений (хостов) в адаптере
+        self.pool_maxsize = pool_maxsize          # Максимум keep-alive соединений к одному хосту
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get_session(self, url):
+        """Сессия для хоста из URL (создается при первом обращении)"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self.create_session()
+                self._sessions[host] = session
+                logger.debug(f"Создана HTTP-сессия для {host}")
+            return session
+
+    def create_session(self):
+        """Создание сессии с настроенным адаптером соединений"""
+        session = requests.Session()
+        session.headers.update(self.headers)
+
+        adapter_kwargs = {
+            'pool_connections': self.pool_connections,
+            'pool_maxsize': self.pool_maxsize,
+            'max_retries': 0,  # Повторы выполняет планировщик с учетом состояния хоста
+            'scheduler': self.scheduler,
+        }
+        if self.cache is not None:
+            adapter = CachingAdapter(self.cache, **adapter_kwargs)
+        else:
+            adapter = ScheduledAdapter(**adapter_kwargs)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def close(self):
+        """Закрытие всех сессий и их соединений"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
@@ -0,0 +1,125 @@
+"""
+Загрузка страниц сначала обычным HTTP-запросом, браузер - только когда без него не обойтись
+"""
+
+import os
+import re
+import json
+import threading
+import logging
+from urllib.parse import urlparse, parse_qsl
+
+logger = logging.getLogger(__name__)
+
+STATIC = 'static'
+BROWSER = 'browser'
+
+# Числа и идентификаторы в пути не влияют на способ загрузки страницы
+NUMBER_PATTERN = re.compile(r'\d+')
+ID_SEGMENT_PATTERN = re.compile(r'^[0-9a-f]{8,}$|^[0-9a-f-]{32,36}$', re.I)
+
+
+def url_pattern(url):
+    """Шаблон URL: хост, путь с обобщенными числами и имена параметров без значений"""
+    parts = urlparse(url)
+    segments = []
+    for segment in parts.path.rstrip('/').split('/'):
+        if ID_SEGMENT_PATTERN.match(segment):
+            segments.append('{id}')
+        else:
+            segments.append(NUMBER_PATTERN.sub('{n}', segment))
+    query = '&'.join(sorted({name for name, _ in parse_qsl(parts.query, keep_blank_values=True)}))
+    pattern = f"{parts.netloc.lower()}{'/'.join(segments) or '/'}"
+    return f"{pattern}?{query}" if query else pattern
+
+
+class HybridFetcher:
+    """Статическая загрузка с автоматическим переходом на браузер
+
+    Страница сначала запрашивается через requests и проверяется функцией validate
+    (например, "есть блоки участников"). Если проверка не прошла, страница
+    отрисовывается в браузере. Решение запоминается для шаблона URL, поэтому
+    следующие страницы того же вида сразу идут нужным путем. Для шаблонов,
+    требующих браузер, статическая загрузка изредка пробуется снова.
+    """
+
+    def __init__(self, fetch_static, fetch_rendered, path=None, reprobe_every=25):
+        self.fetch_static = fetch_static        # url -> content (requests)
+        self.fetch_rendered = fetch_rendered    # url, **kwargs -> content (браузер)
+        self.path = path                        # JSON-файл с решениями; None - только в памяти
+        self.reprobe_every = reprobe_every      # Раз в N браузерных загрузок снова пробуем requests
+        self.decisions = self.load()
+        self.static_count = 0
+        self.browser_count = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать решения о загрузке {self.path}: {e}")
+            return {}
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.decisions, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def decide(self, pattern, mode):
+        """Запоминание способа загрузки для шаблона"""
+        with self._lock:
+            entry = self.decisions.get(pattern)
+            if entry is not None and entry['mode'] == mode:
+                return
+            self.decisions[pattern] = {'mode': mode, 'since_probe': 0}
+            self.save()
+        logger.info(f"Шаблон {pattern}: загрузка через {mode}")
+
+    def should_try_static(self, pattern):
+        """Пробовать ли requests: для неизвестных и статических шаблонов - всегда"""
+        with self._lock:
+            entry = self.decisions.get(pattern)
+            if entry is None or entry['mode'] == STATIC:
+                return True
+            entry['since_probe'] += 1
+            if entry['since_probe'] < self.reprobe_every:
+                return False
+            entry['since_probe'] = 0
+            return True
+
+    def fetch(self, url, validate, **render_kwargs):
+        """Содержимое страницы: requests, если страница прошла проверку, иначе браузер
+
+        render_kwargs передаются в fetch_rendered (например, ready_selectors).
+        """
+        pattern = url_pattern(url)
+
+        if self.should_try_static(pattern):
+            content = self.fetch_static(url)
+            if content and validate(content):
+                with self._lock:
+                    self.static_count += 1
+                self.decide(pattern, STATIC)
+                return content
+            logger.info(f"Статическая версия {url} не прошла проверку, используем браузер")
+
+        content = self.fetch_rendered(url, **render_kwargs)
+        with self._lock:
+            self.browser_count += 1
+        if content and validate(content):
+            self.decide(pattern, BROWSER)
+        return content
+
+    def stats(self):
+        """Сколько страниц загружено каждым способом"""
+        with self._lock:
+            return {STATIC: self.static_count, BROWSER: self.browser_count}
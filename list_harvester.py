@@ -0,0 +1,155 @@
+"""
+Пошаговый сбор элементов длинных и виртуализированных списков без сериализации всей страницы
+"""
+
+import time
+import logging
+from page_readiness import PageReadiness
+
+logger = logging.getLogger(__name__)
+
+# Элементы навигации, нужные обходу каталога (PaginationCrawler ищет в них следующую страницу)
+NAVIGATION_SELECTORS = [
+    'a[rel="next"]',
+    'link[rel="next"]',
+    '[class*="pagination"]',
+    '[class*="pager"]',
+    '[class*="paging"]',
+    '[class*="page-numbers"]',
+    'a[class*="next"]',
+    '[data-next]',
+    '[data-next-url]',
+    '[data-next-page]',
+    '[data-load-more]',
+]
+
+# Элемент списка по умолчанию передается как HTML; третий аргумент скрипта - параметр serializeItem
+DEFAULT_ITEM_SCRIPT = """
+function serializeItem(el, itemArgument) { return el.outerHTML; }
+"""
+
+# Один вызов за шаг: новые элементы списка, прокрутка и признак конца списка.
+# Уже отданные ключи хранятся в window, чтобы не передавать их обратно на каждом шаге.
+HARVEST_SCRIPT = """
+const selector = arguments[0];
+const scrollRatio = arguments[1];
+const seen = window.__harvestSeen || (window.__harvestSeen = new Set());
+
+function itemKey(el) {
+    const id = el.getAttribute('data-id') || el.getAttribute('data-exhibitor') || el.getAttribute('id');
+    if (id) return 'id:' + id;
+    const link = el.querySelector('a[href]');
+    const text = (el.textContent || '').replace(/\\s+/g, ' ').trim().slice(0, 200);
+    return (link ? link.getAttribute('href') : '') + '|' + text;
+}
+
+const items = [];
+let last = null;
+for (const el of document.querySelectorAll(selector)) {
+    // Вложенные совпадения входят в HTML внешнего элемента
+    if (el.parentElement && el.parentElement.closest(selector)) continue;
+    last = el;
+    const key = itemKey(el);
+    if (seen.has(key)) continue;
+    seen.add(key);
+    items.push(serializeItem(el, arguments[2]));
+}
+
+// Прокручиваем ближайший прокручиваемый контейнер списка, иначе окно
+let container = last ? last.parentElement : null;
+while (container && container !== document.body) {
+    const style = getComputedStyle(container);
+    if (/(auto|scroll)/.test(style.overflowY) && container.scrollHeight > container.clientHeight) break;
+    container = container.parentElement;
+}
+let atEnd;
+if (container && container !== document.body) {
+    container.scrollTop += container.clientHeight * scrollRatio;
+    atEnd = container.scrollTop + container.clientHeight >= container.scrollHeight - 2;
+} else {
+    window.scrollBy(0, window.innerHeight * scrollRatio);
+    const root = document.scrollingElement || document.documentElement;
+    atEnd = window.innerHeight + window.scrollY >= root.scrollHeight - 2;
+}
+return [items, atEnd];
+"""
+
+# Элементы навигации - один раз после сбора списка
+NAVIGATION_SCRIPT = """
+const nodes = Array.from(document.querySelectorAll(arguments[0]));
+const loadMore = /mehr (laden|anzeigen)|weitere (laden|anzeigen)|load more|show more/i;
+for (const el of document.querySelectorAll('a, button')) {
+    if (loadMore.test((el.textContent || '').trim())) nodes.push(el);
+}
+return nodes.filter(el => !(el.parentElement && nodes.some(other => other !== el && other.contains(el))))
+    .map(el => el.outerHTML);
+"""
+
+
+class ListHarvester:
+    """Сбор элементов списка при пошаговой прокрутке
+
+    На каждом шаге один execute_script возвращает только новые элементы
+    (с дедупликацией по ключу: data-id/id, ссылка и текст) и прокручивает
+    список дальше, поэтому в виртуализированных списках собираются и
+    элементы, которые потом удаляются из DOM. Сбор заканчивается, когда
+    несколько шагов подряд в конце списка не появляется новых элементов;
+    перед каждым таким шагом ждем, пока DOM (в том числе число элементов
+    списка) и сетевые загрузки не затихнут на settle_period секунд, чтобы
+    медленная подгрузка следующей порции не принималась за конец списка.
+    Вся страница не сериализуется: результат - HTML найденных элементов
+    (или то, что возвращает serializeItem из item_script).
+    """
+
+    def __init__(self, selectors, max_steps=300, idle_steps=3, step_delay=0.3, scroll_ratio=0.9,
+                 item_script=None, item_argument=None, build_page=None, settle_period=1.0, settle_timeout=10):
+        self.selector = ', '.join(selectors)
+        self.script = (item_script or DEFAULT_ITEM_SCRIPT) + HARVEST_SCRIPT
+        self.item_argument = item_argument
+        self.build_page = build_page or html_page    # (элементы, навигация) -> документ
+        self.max_steps = max_steps
+        self.idle_steps = idle_steps        # Шагов без новых элементов в конце списка до остановки
+        self.step_delay = step_delay        # Пауза на подгрузку после прокрутки
+        self.scroll_ratio = scroll_ratio    # Доля высоты окна за один шаг
+        self.settle_timeout = settle_timeout    # Максимум ожидания подгрузки в конце списка
+        self.readiness = PageReadiness(quiet_period=settle_period)
+
+    def harvest(self, driver, url=None):
+        """HTML элементов списка в порядке появления"""
+        driver.execute_script("window.__harvestSeen = new Set(); window.scrollTo(0, 0);")
+        items = []
+        idle = 0
+        for step in range(self.max_steps):
+            new_items, at_end = driver.execute_script(self.script, self.selector, self.scroll_ratio, self.item_argument)
+            items.extend(new_items)
+            if new_items or not at_end:
+                idle = 0
+                time.sleep(self.step_delay)
+                continue
+            if idle >= self.idle_steps:
+                break
+            # Конец списка: ждем, пока подгрузка следующей порции закончится и DOM затихнет
+            self.readiness.wait(driver, url, None, self.settle_timeout)
+            idle += 1
+        else:
+            logger.warning(f"Сбор списка остановлен по лимиту {self.max_steps} шагов, "
+                           f"список может быть неполным{f' ({url})' if url else ''}")
+        logger.info(f"Собрано элементов списка: {len(items)} за {step + 1} шагов{f' ({url})' if url else ''}")
+        return items
+
+    def harvest_page(self, driver, url=None):
+        """Документ из собранных элементов и навигации или None, если элементов нет"""
+        items = self.harvest(driver, url)
+        if not items:
+            return None
+        return self.build_page(items, page_navigation(driver))
+
+
+def html_page(items, navigation):
+    """Документ из HTML элементов списка и навигации"""
+    return f"<html><body>{''.join(items)}{''.join(navigation)}</body></html>"
+
+
+def page_navigation(driver):
+    """HTML элементов навигации каталога (следующая страница, "показать еще")"""
+    return driver.execute_script(NAVIGATION_SCRIPT, ', '.join(NAVIGATION_SELECTORS))
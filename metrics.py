@@ -0,0 +1,279 @@
+"""
+Метрики обхода: счетчики и гистограммы задержек по хостам и стадиям, выгрузка в текстовом формате Prometheus или JSON
+"""
+
+import os
+import json
+import time
+import bisect
+import threading
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм задержек, с
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Файл по умолчанию (расширение .json - JSON, иначе текстовый формат Prometheus 0.0.4)
+METRICS_FILE = os.path.join('output', 'metrics.prom')
+
+# Описания метрик для # HELP
+DESCRIPTIONS = {
+    'scraper_pages': "Загруженные страницы по хостам и способу загрузки (http / selenium)",
+    'scraper_page_errors': "Страницы, которые не удалось загрузить",
+    'scraper_fetch_seconds': "Время получения страницы в get_page_content",
+    'scraper_bytes': "Полученные байты по хостам и источнику (network / cache / browser)",
+    'scraper_requests': "HTTP-ответы по хостам и кодам",
+    'scraper_request_seconds': "Время одного обращения к хосту по виду загрузки http / browser (каждая попытка отдельно)",
+    'scraper_retries': "Повторы запросов по хостам и причинам",
+    'scraper_cache': "Обращения к кэшу по хостам: hit / miss / revalidated",
+    'scraper_stage_seconds': "Время одного вызова стадии (разбор, извлечение, контакты, запись)",
+    'scraper_stage_items': "Обработанные элементы по стадиям",
+    'scraper_stage_errors': "Ошибки по стадиям",
+    'scraper_records': "Найденные записи (блоки участников, контакты) по стадиям",
+    'scraper_pipeline_busy_seconds': "Время работы стадий конвейера",
+    'scraper_pipeline_blocked_seconds': "Время ожидания очереди следующей стадии конвейера",
+    'scraper_pipeline_processed': "Элементы, обработанные стадиями конвейера",
+    'scraper_uptime_seconds': "Время с начала сбора метрик",
+    'scraper_pages_per_second': "Средняя скорость загрузки страниц за время загрузки по способу загрузки",
+    'scraper_selenium_share': "Доля страниц, загруженных браузером",
+}
+
+
+def host_of(url):
+    """Хост из URL для метки host"""
+    netloc = url.split('://', 1)[-1].split('/', 1)[0]
+    return netloc.lower()
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # Последняя ячейка - +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Пары (граница, число наблюдений не больше границы), включая +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + [float('inf')], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q):
+        """Оценка квантиля по границам (верхняя граница ячейки)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound if bound != float('inf') else self.buckets[-1]
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Реестр метрик процесса
+
+    Метрика определяется именем и метками (host, mode, stage...). Счетчики
+    только растут, гистограммы хранят число наблюдений по границам
+    LATENCY_BUCKETS. Запись потокобезопасна. write() сохраняет снимок в
+    текстовом формате Prometheus 0.0.4 (для textfile-коллектора node_exporter)
+    или в JSON; файл заменяется атомарно.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started = time.monotonic()
+        self.counters = {}      # (имя, метки) -> значение
+        self.gauges = {}
+        self.histograms = {}
+        self.fetch_started = None   # Начало первой и конец последней загрузки страницы (для страниц/с)
+        self.fetch_finished = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """Увеличение счетчика"""
+        key = self.key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Значение измерителя (gauge)"""
+        with self._lock:
+            self.gauges[self.key(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        """Наблюдение в гистограмму"""
+        key = self.key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def stage(self, stage, items=1):
+        """Учет вызова стадии: время, число элементов и ошибки"""
+        started = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.inc('scraper_stage_errors', stage=stage)
+            raise
+        finally:
+            self.observe('scraper_stage_seconds', time.monotonic() - started, stage=stage)
+            self.inc('scraper_stage_items', items, stage=stage)
+
+    def page(self, url, mode, started, content):
+        """Учет загрузки страницы в get_page_content (content = None - ошибка)"""
+        host = host_of(url)
+        finished = time.monotonic()
+        with self._lock:
+            if self.fetch_started is None or started < self.fetch_started:
+                self.fetch_started = started
+            if self.fetch_finished is None or finished > self.fetch_finished:
+                self.fetch_finished = finished
+        self.observe('scraper_fetch_seconds', finished - started, host=host, mode=mode)
+        if content is None:
+            self.inc('scraper_page_errors', host=host, mode=mode)
+        else:
+            self.inc('scraper_pages', host=host, mode=mode)
+
+    def derived(self):
+        """Производные значения: время работы, страницы/с и доля браузера
+
+        Скорость считается за время от начала первой до конца последней загрузки
+        страницы: поиск контактов и запись результатов в него не входят.
+        """
+        uptime = time.monotonic() - self.started
+        pages = {}
+        with self._lock:
+            fetching = self.fetch_finished - self.fetch_started if self.fetch_started is not None else 0.0
+            for (name, labels), value in self.counters.items():
+                if name == 'scraper_pages':
+                    mode = dict(labels).get('mode', '')
+                    pages[mode] = pages.get(mode, 0) + value
+        gauges = {self.key('scraper_uptime_seconds', {}): round(uptime, 3)}
+        for mode, count in pages.items():
+            gauges[self.key('scraper_pages_per_second', {'mode': mode})] = round(count / fetching, 3) if fetching else 0.0
+        total = sum(pages.values())
+        gauges[self.key('scraper_selenium_share', {})] = round(pages.get('selenium', 0) / total, 4) if total else 0.0
+        return gauges
+
+    def snapshot(self):
+        """Снимок всех метрик в виде словаря (формат JSON-выгрузки)"""
+        gauges = self.derived()
+        with self._lock:
+            gauges.update(self.gauges)
+            counters = dict(self.counters)
+            histograms = {key: (histogram.cumulative(), histogram.sum, histogram.count,
+                                histogram.quantile(0.5), histogram.quantile(0.95))
+                          for key, histogram in self.histograms.items()}
+
+        def entries(items, convert):
+            result = {}
+            for (name, labels), value in sorted(items.items()):
+                result.setdefault(name, []).append({'labels': dict(labels), **convert(value)})
+            return result
+
+        return {
+            'timestamp': time.time(),
+            'counters': entries(counters, lambda value: {'value': value}),
+            'gauges': entries(gauges, lambda value: {'value': value}),
+            'histograms': entries(histograms, lambda value: {
+                'buckets': {('+Inf' if bound == float('inf') else str(bound)): count for bound, count in value[0]},
+                'sum': round(value[1], 6),
+                'count': value[2],
+                'p50': value[3],
+                'p95': value[4],
+            }),
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        """Текстовый формат Prometheus 0.0.4 (его разбирает textfile-коллектор node_exporter)"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def header(name, kind, description):
+            # В формате 0.0.4 имя в HELP и TYPE совпадает с именем значений (у счетчиков - с суффиксом _total)
+            if description:
+                lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, samples in snapshot['counters'].items():
+            header(f"{name}_total", 'counter', DESCRIPTIONS.get(name))
+            for sample in samples:
+                lines.append(f"{name}_total{format_labels(sample['labels'])} {sample['value']}")
+        for name, samples in snapshot['gauges'].items():
+            header(name, 'gauge', DESCRIPTIONS.get(name))
+            for sample in samples:
+                lines.append(f"{name}{format_labels(sample['labels'])} {sample['value']}")
+        for name, samples in snapshot['histograms'].items():
+            header(name, 'histogram', DESCRIPTIONS.get(name))
+            for sample in samples:
+                for bound, count in sample['buckets'].items():
+                    lines.append(f"{name}_bucket{format_labels({**sample['labels'], 'le': bound})} {count}")
+                lines.append(f"{name}_count{format_labels(sample['labels'])} {sample['count']}")
+                lines.append(f"{name}_sum{format_labels(sample['labels'])} {sample['sum']}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path=None):
+        """Сохранение метрик; путь - SCRAPER_METRICS_FILE или METRICS_FILE ('0' - не сохранять)"""
+        path = path or os.environ.get('SCRAPER_METRICS_FILE') or METRICS_FILE
+        if path == '0':
+            return None
+        try:
+            text = self.to_json() if path.endswith('.json') else self.to_prometheus()
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Атомарная замена: коллектор не увидит наполовину записанный файл
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp_path, path)
+            logger.info(f"Метрики сохранены в файл: {path}")
+            return path
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении метрик: {e}")
+            return None
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_default_metrics():
+    """Общий реестр метрик для всех парсеров
+
+    SCRAPER_METRICS_FILE - файл выгрузки (.json - JSON, иначе текстовый формат Prometheus; по умолчанию output/metrics.prom)
+    """
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
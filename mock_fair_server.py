@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Локальный сервер-имитация сайтов выставок и компаний для сквозных и нагрузочных прогонов
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import logging
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Выставки: путь главной страницы и каталога участников
+FAIRS = {
+    'eltefa': {'home': ['/eltefa/'], 'directory': '/eltefa/aussteller/'},
+    'ihm': {'home': ['/de/home', '/en/home'], 'directory': '/ihm/aussteller/'},
+}
+
+CITIES = ['Berlin', 'Hamburg', 'Stuttgart', 'Leipzig', 'Dresden', 'Essen', 'Bremen', 'Hannover']
+COUNTRIES = ['Germany', 'Deutschland', 'Austria', 'Switzerland', 'Italy']
+LEGAL_FORMS = ['GmbH', 'AG', 'KG', 'GmbH & Co. KG', 'e.K.']
+POSITIONS = ['CEO', 'Geschäftsführer', 'Managing Director', 'Sales Manager', 'Vertriebsleiter',
+             'HR Manager', 'Marketing', 'Entwickler', 'Buchhaltung']
+FIRST_NAMES = ['Anna', 'Jonas', 'Lea', 'Felix', 'Marie', 'Paul', 'Laura', 'Lukas', 'Sophie', 'Max']
+LAST_NAMES = ['Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker']
+
+# Cookie согласия
+CONSENT_COOKIE = 'mock_consent'
+
+# Скрипт, который строит список участников из JSON-API после загрузки страницы
+LIST_SCRIPT = """
+<script>
+fetch('%(api)s?page=%(page)d&size=%(size)d', {headers: {'Accept': 'application/json'}})
+  .then(response => response.json())
+  .then(data => {
+    const list = document.getElementById('exhibitor-list');
+    for (const item of data.items) {
+      const block = document.createElement('div');
+      block.className = 'exhibitor-item';
+      block.setAttribute('data-id', item.id);
+      block.innerHTML = '<h3 class="company-name"></h3><p><span class="city"></span>, <span class="country"></span></p>' +
+        '<a class="website"></a> <a class="email"></a>';
+      block.querySelector('.company-name').textContent = item.name;
+      block.querySelector('.city').textContent = item.city;
+      block.querySelector('.country').textContent = item.country;
+      block.querySelector('.website').href = item.website;
+      block.querySelector('.website').textContent = 'Website';
+      block.querySelector('.email').href = 'mailto:' + item.email;
+      block.querySelector('.email').textContent = item.email;
+      list.appendChild(block);
+    }
+    document.getElementById('pagination').innerHTML = data.next ?
+      '<a rel="next" class="next" href="' + data.next + '">Weiter</a>' : '';
+  });
+</script>
+"""
+
+
+class MockFair:
+    """Данные и поведение имитации: участники, страницы компаний, задержки и ошибки"""
+
+    def __init__(self, exhibitors=1000, per_page=50, js_fairs=('ihm',), consent='overlay',
+                 latency=0.0, error_rate=0.0, team_size=8, seed=0):
+        self.exhibitors = exhibitors
+        self.per_page = per_page
+        self.js_fairs = set(js_fairs)     # Выставки, где список строится JavaScript из JSON-API
+        self.consent = consent            # off / overlay (баннер поверх списка) / wall (без согласия - только баннер)
+        self.latency = latency            # Средняя задержка ответа, с (разброс ±50%)
+        self.error_rate = error_rate      # Доля ответов 429/5xx
+        self.team_size = team_size
+        self.seed = seed
+        self.company_site = None          # Адрес сайтов компаний (задается при запуске)
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    # --- данные ---
+
+    def company(self, fair, index):
+        """Участник выставки (одни и те же данные при каждом запросе)"""
+        rng = random.Random(f"{self.seed}:{fair}:{index}")
+        company_id = f"{fair}-{index}"
+        return {
+            'id': company_id,
+            'name': f"{rng.choice(LAST_NAMES)} {fair.upper()} {index} {rng.choice(LEGAL_FORMS)}",
+            'city': rng.choice(CITIES),
+            'country': rng.choice(COUNTRIES),
+            'website': f"{self.company_site}/firma/{company_id}/",
+            'email': f"info@{company_id}.example",
+        }
+
+    def team(self, company_id):
+        rng = random.Random(f"{self.seed}:team:{company_id}")
+        return [{
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'position': rng.choice(POSITIONS),
+            'email': f"person{person}@{company_id}.example",
+        } for person in range(self.team_size)]
+
+    def page_count(self):
+        return max(1, (self.exhibitors + self.per_page - 1) // self.per_page)
+
+    def page_items(self, fair, page, size=None):
+        size = size or self.per_page
+        start = (page - 1) * size
+        return [self.company(fair, index) for index in range(start, min(self.exhibitors, start + size))]
+
+    # --- статистика ---
+
+    def count(self, route, status):
+        with self._lock:
+            key = f"{route} {status}"
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    # --- страницы ---
+
+    def home_page(self, fair):
+        directory = FAIRS[fair]['directory']
+        return (f'<html><head><title>{fair.upper()}</title></head><body>'
+                f'<nav><a href="/">Start</a> <a href="/tickets">Tickets</a> '
+                f'<a href="{directory}">Ausstellerverzeichnis</a> <a href="/presse">Presse</a></nav>'
+                f'<main><h1>{fair.upper()} - Fachmesse</h1><p>Willkommen auf der Messe.</p></main></body></html>')
+
+    def directory_page(self, fair, page):
+        directory = FAIRS[fair]['directory']
+        if fair in self.js_fairs:
+            # Список появляется только после выполнения JavaScript
+            script = LIST_SCRIPT % {'api': f"/api/{fair}/exhibitors", 'page': page, 'size': self.per_page}
+            body = f'<div id="exhibitor-list" class="exhibitor-list"></div><div id="pagination"></div>{script}'
+        else:
+            blocks = ''.join(
+                f'<div class="exhibitor-item" data-id="{item["id"]}">'
+                f'<h3 class="company-name">{item["name"]}</h3>'
+                f'<p><span class="city">{item["city"]}</span>, <span class="country">{item["country"]}</span></p>'
+                f'<a href="{item["website"]}">Website</a> <a href="mailto:{item["email"]}">{item["email"]}</a> '
+                f'<a href="{directory}{item["id"]}">Details</a></div>'
+                for item in self.page_items(fair, page)
+            )
+            pages = self.page_count()
+            numbers = ''.join(f'<li><a href="{directory}?page={number}">{number}</a></li>'
+                              for number in range(max(1, page - 2), min(pages, page + 2) + 1))
+            next_link = f'<a rel="next" class="next" href="{directory}?page={page + 1}">Weiter</a>' if page < pages else ''
+            body = f'<div class="exhibitor-list">{blocks}</div><ul class="pagination">{numbers}</ul>{next_link}'
+        return f'<html><head><title>Aussteller</title></head><body><h1>Aussteller</h1>{body}</body></html>'
+
+    def api_page(self, fair, page, size):
+        size = min(size or self.per_page, 200)
+        total = self.exhibitors
+        next_page = page + 1 if page * size < total else None
+        return {
+            'total': total,
+            'page': page,
+            'size': size,
+            'items': self.page_items(fair, page, size),
+            'next': f"{FAIRS[fair]['directory']}?page={next_page}" if next_page else None,
+        }
+
+    def company_home(self, company_id):
+        # Относительные ссылки: ContactFinder дописывает их к адресу сайта
+        return (f'<html><body><nav><a href="./">Home</a> <a href="produkte">Produkte</a> '
+                f'<a href="team">Team</a> <a href="impressum">Impressum</a></nav>'
+                f'<main><h1>{company_id}</h1><p>Qualität seit 1990.</p></main></body></html>')
+
+    def company_team(self, company_id):
+        members = ''.join(
+            f'<div class="team-member"><h3>{person["name"]}</h3><span class="position">{person["position"]}</span>'
+            f'<p>E-Mail: {person["email"]}</p></div>'
+            for person in self.team(company_id)
+        )
+        return f'<html><body><h1>Unser Team</h1><section class="members">{members}</section></body></html>'
+
+    def company_impressum(self, company_id):
+        manager = next((person for person in self.team(company_id) if person['position'] == 'Geschäftsführer'),
+                       self.team(company_id)[0])
+        return (f'<html><body><h1>Impressum</h1><p>{company_id}<br>Hauptstraße 1<br>70173 Stuttgart</p>'
+                f'<p>Geschäftsführer: {manager["name"]}</p><p>E-Mail: info@{company_id}.example</p></body></html>')
+
+    def consent_banner(self, path):
+        return (f'<div id="cookie-consent" class="cookie-banner"><p>Wir verwenden Cookies.</p>'
+                f'<form action="/consent" method="post"><input type="hidden" name="return" value="{path}">'
+                f'<button type="submit">Alle akzeptieren</button></form></div>')
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Маршруты имитации; данные и настройки - в server.fair"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def fair(self):
+        return self.server.fair
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def handle_request(self, method):
+        parts = urlparse(self.path)
+        query = parse_qs(parts.query)
+        path = parts.path
+        fair = self.fair
+
+        if path == '/__stats':
+            return self.send(200, json.dumps(fair.stats, ensure_ascii=False), 'application/json', route='stats')
+
+        if fair.latency:
+            time.sleep(random.uniform(0.5, 1.5) * fair.latency)
+
+        # Ошибки перегрузки и сервера
+        if fair.error_rate and random.random() < fair.error_rate:
+            if random.random() < 0.5:
+                return self.send(429, 'Too Many Requests', headers={'Retry-After': '1'}, route='error')
+            return self.send(random.choice([500, 502, 503]), 'Server Error', route='error')
+
+        if method == 'POST':
+            if path == '/consent':
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                return self.send(200, '<html><body>OK</body></html>', route='consent',
+                                 headers={'Set-Cookie': f"{CONSENT_COOKIE}=yes; Path=/; Max-Age=86400"})
+            return self.send(405, 'Method Not Allowed', route='other')
+
+        for name, config in FAIRS.items():
+            if path in config['home']:
+                return self.send_page(fair.home_page(name), 'home', path)
+            if path == config['directory']:
+                page = int(query.get('page', ['1'])[0])
+                return self.send_page(fair.directory_page(name, page), 'directory', path)
+            if path == f"/api/{name}/exhibitors":
+                page = int(query.get('page', ['1'])[0])
+                size = int(query.get('size', ['0'])[0])
+                return self.send(200, json.dumps(fair.api_page(name, page, size), ensure_ascii=False),
+                                 'application/json', route='api')
+
+        if path.startswith('/firma/'):
+            segments = path.strip('/').split('/')
+            company_id = segments[1] if len(segments) > 1 else ''
+            section = segments[2] if len(segments) > 2 else ''
+            if section == 'team':
+                return self.send(200, fair.company_team(company_id), route='company-team')
+            if section == 'impressum':
+                return self.send(200, fair.company_impressum(company_id), route='company-impressum')
+            return self.send(200, fair.company_home(company_id), route='company')
+
+        return self.send(404, '<html><body>Nicht gefunden</body></html>', route='not-found')
+
+    def send_page(self, html, route, path):
+        """Страница выставки с баннером согласия, если оно еще не дано"""
+        fair = self.fair
+        consented = f"{CONSENT_COOKIE}=yes" in (self.headers.get('Cookie') or '')
+        if fair.consent != 'off' and not consented:
+            banner = fair.consent_banner(path)
+            if fair.consent == 'wall':
+                html = f'<html><body>{banner}</body></html>'
+                route = 'consent-wall'
+            else:
+                html = html.replace('<body>', f'<body>{banner}', 1)
+        return self.send(200, html, route=route)
+
+    def send(self, status, body, content_type='text/html; charset=utf-8', headers=None, route='other'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Cache-Control', 'no-store')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.fair.count(route, status)
+
+
+def start_server(fair, host='127.0.0.1', port=0):
+    """Запуск сервера в фоновом потоке; возвращает (server, базовый адрес)"""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.fair = fair
+    base = f"http://{host}:{server.server_address[1]}"
+    # Сайты компаний - на другом имени хоста, чтобы ограничения по хостам считались отдельно
+    fair.company_site = f"http://localhost:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name='mock-fair', daemon=True).start()
+    return server, base
+
+
+def run_scrapers(base, targets, fair):
+    """Прогон парсеров против имитации в отдельном рабочем каталоге"""
+    os.environ['SCRAPER_ELTEFA_SITE'] = base
+    os.environ['SCRAPER_IHM_SITE'] = base
+    workdir = tempfile.mkdtemp(prefix='mock-fair-')
+    os.chdir(workdir)   # Кэш, cookies согласия, состояние обхода и результаты - только для этого прогона
+    print(f"Рабочий каталог: {workdir}")
+
+    timings = {}
+    if 'requests' in targets:
+        from requests_only_scraper import RequestsOnlyScraper
+        started = time.monotonic()
+        scraper = RequestsOnlyScraper()
+        scraper.run()
+        timings['requests'] = (time.monotonic() - started, len(scraper.exhibitors_data), len(scraper.contacts_data))
+
+    if 'advanced' in targets:
+        from advanced_scraper import AdvancedExhibitionScraper
+        started = time.monotonic()
+        scraper = AdvancedExhibitionScraper()
+        scraper.run()
+        timings['advanced'] = (time.monotonic() - started, len(scraper.exhibitors_data), len(scraper.contacts_data))
+
+    if 'contacts' in targets:
+        from contact_finder import ContactFinder
+        companies = [(item['name'], item['website'])
+                     for name in FAIRS for item in (fair.company(name, index) for index in range(fair.exhibitors))]
+        started = time.monotonic()
+        found = sum(len(contacts) for _, _, contacts in ContactFinder().find_contacts_for_companies(companies))
+        timings['contacts'] = (time.monotonic() - started, len(companies), found)
+
+    # Метрики всех прогонов (парсеры сохраняют их и сами, поиск контактов - нет)
+    from metrics import get_default_metrics
+    get_default_metrics().write()
+
+    print()
+    print(f"{'Прогон':<10} {'секунд':>8} {'участников':>11} {'контактов':>10}")
+    for name, (seconds, exhibitors, contacts) in timings.items():
+        print(f"{name:<10} {seconds:>8.1f} {exhibitors:>11} {contacts:>10}")
+    print()
+    print("Ответы сервера:")
+    for key, value in sorted(fair.stats.items()):
+        print(f"  {key}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Имитация сайтов выставок и компаний для нагрузочных прогонов")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800, help="порт (0 - любой свободный)")
+    parser.add_argument('--exhibitors', type=int, default=1000, help="участников на каждой выставке")
+    parser.add_argument('--per-page', type=int, default=50, help="участников на странице каталога")
+    parser.add_argument('--js-fairs', nargs='*', default=['ihm'], choices=list(FAIRS),
+                        help="выставки, где список строится JavaScript из JSON-API")
+    parser.add_argument('--consent', choices=['off', 'overlay', 'wall'], default='overlay',
+                        help="баннер cookies: нет, поверх содержимого или вместо него")
+    parser.add_argument('--latency', type=float, default=0.05, help="средняя задержка ответа, с")
+    parser.add_argument('--error-rate', type=float, default=0.02, help="доля ответов 429/5xx")
+    parser.add_argument('--team-size', type=int, default=8, help="сотрудников на странице команды")
+    parser.add_argument('--run', nargs='+', choices=['requests', 'advanced', 'contacts', 'all'],
+                        help="запустить парсеры против сервера и завершиться")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    fair = MockFair(exhibitors=args.exhibitors, per_page=args.per_page, js_fairs=args.js_fairs,
+                    consent=args.consent, latency=args.latency, error_rate=args.error_rate,
+                    team_size=args.team_size)
+    server, base = start_server(fair, args.host, args.port if not args.run else 0)
+    print(f"Имитация выставок: {base}/eltefa/, {base}/de/home; сайты компаний: {fair.company_site}/firma/...")
+
+    try:
+        if args.run:
+            targets = {'requests', 'advanced', 'contacts'} if 'all' in args.run else set(args.run)
+            run_scrapers(base, targets, fair)
+        else:
+            print(f"SCRAPER_ELTEFA_SITE={base} SCRAPER_IHM_SITE={base} python requests_only_scraper.py")
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Ожидание готовности страницы в Selenium по условиям вместо фиксированных пауз
+"""
+
+import time
+import logging
+from urllib.parse import urlparse
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+logger = logging.getLogger(__name__)
+
+# Селекторы, по которым видно, что список участников уже отрисован
+EXHIBITOR_READY_SELECTORS = [
+    '.exhibitor-item',
+    '.aussteller-item',
+    '.company-item',
+    '.exhibitor-card',
+    '.aussteller-card',
+    '.exhibitor-list-item',
+    '.aussteller-list-item',
+    '[data-exhibitor]',
+    '[data-aussteller]',
+]
+
+# Селекторы ссылок на список участников на главных страницах выставок
+EXHIBITOR_LINK_SELECTORS = [
+    'a[href*="aussteller"]',
+    'a[href*="exhibitor"]',
+    'a[href*="teilnehmer"]',
+]
+
+# Максимальное время ожидания по сайтам (секунды)
+SITE_TIMEOUTS = {
+    'www.messe-stuttgart.de': 20,
+    'www.ihm.de': 20,
+}
+
+# Один вызов JS возвращает все признаки активности страницы
+SNAPSHOT_SCRIPT = """
+return [
+    document.readyState,
+    document.getElementsByTagName('*').length,
+    window.performance && performance.getEntriesByType
+        ? performance.getEntriesByType('resource').length : 0
+];
+"""
+
+
+class PageReadyCondition:
+    """Условие для WebDriverWait: селекторы найдены или DOM и сеть затихли"""
+
+    def __init__(self, selectors=None, quiet_period=0.5):
+        self.selector = ', '.join(selectors) if selectors else None
+        self.quiet_period = quiet_period
+        self.last_snapshot = None
+        self.quiet_since = None
+
+    def __call__(self, driver):
+        # 1. Нужные элементы уже на странице - дальше не ждем
+        if self.selector and EC.presence_of_all_elements_located((By.CSS_SELECTOR, self.selector))(driver):
+            return True
+
+        # 2. DOM перестал меняться и новые ресурсы не загружаются
+        ready_state, node_count, resource_count = driver.execute_script(SNAPSHOT_SCRIPT)
+        if ready_state != 'complete':
+            self.last_snapshot = None
+            return False
+
+        snapshot = (node_count, resource_count)
+        now = time.monotonic()
+        if snapshot != self.last_snapshot:
+            self.last_snapshot = snapshot
+            self.quiet_since = now
+            return False
+
+        return now - self.quiet_since >= self.quiet_period
+
+
+class PageReadiness:
+    """Ожидание загрузки динамического контента с таймаутом по сайту"""
+
+    def __init__(self, default_timeout=15, quiet_period=0.5, poll_frequency=0.1, site_timeouts=None):
+        self.default_timeout = default_timeout
+        self.quiet_period = quiet_period
+        self.poll_frequency = poll_frequency
+        self.site_timeouts = dict(SITE_TIMEOUTS)
+        if site_timeouts:
+            self.site_timeouts.update(site_timeouts)
+
+    def get_timeout(self, url):
+        """Максимальное время ожидания для сайта"""
+        host = urlparse(url).netloc if url else ''
+        return self.site_timeouts.get(host, self.default_timeout)
+
+    def wait(self, driver, url=None, selectors=None, timeout=None):
+        """Ожидание готовности страницы; возвращает True, если условие выполнено"""
+        if timeout is None:
+            timeout = self.get_timeout(url)
+
+        condition = PageReadyCondition(selectors, self.quiet_period)
+        started = time.monotonic()
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=self.poll_frequency).until(condition)
+            logger.debug(f"Страница готова за {time.monotonic() - started:.2f} с: {url}")
+            return True
+        except TimeoutException:
+            logger.warning(f"Страница не стабилизировалась за {timeout} с: {url}")
+            return False
+
+    def scroll_and_wait(self, driver, url=None, timeout=None):
+        """Прокрутка вниз для подгрузки контента и ожидание его появления"""
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        # Селекторы к этому моменту уже найдены, поэтому ждем только затихания DOM
+        ready = self.wait(driver, url, None, timeout)
+        driver.execute_script("window.scrollTo(0, 0);")
+        return ready
@@ -0,0 +1,214 @@
+"""
+Обход постраничных списков участников (ссылки "дальше", номера страниц, "загрузить еще")
+"""
+
+import re
+import logging
+from collections import deque
+from urllib.parse import urljoin, urlparse, urlencode, parse_qsl, urlunparse
+from html_parser import make_soup
+from crawl_state import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# Тексты ссылок на следующую страницу
+NEXT_TEXTS = {'next', 'next page', 'weiter', 'vor', 'nächste', 'nächste seite', '›', '»', '>', '>>'}
+
+# Тексты кнопок подгрузки (бесконечная прокрутка)
+LOAD_MORE_PATTERN = re.compile(r'mehr (laden|anzeigen)|weitere (laden|anzeigen)|load more|show more', re.I)
+
+# Классы контейнеров и ссылок пагинации
+PAGINATION_CLASS_PATTERN = re.compile(r'pagination|pager|paging|page-numbers', re.I)
+NEXT_CLASS_PATTERN = re.compile(r'\bnext\b|pagination-next|pager-next', re.I)
+
+# Атрибуты с адресом следующей порции списка
+NEXT_URL_ATTRIBUTES = ('data-next', 'data-next-url', 'data-next-page', 'data-load-more')
+
+# Параметры запроса, задающие смещение в API подгрузки
+OFFSET_ATTRIBUTES = {
+    'data-offset': 'offset',
+    'data-start': 'start',
+    'data-page': 'page',
+}
+
+
+class PaginationCrawler:
+    """Обход всех страниц каталога участников с ограниченной параллельностью
+
+    Страницы загружаются порциями через AsyncFetcher и отдаются потребителю
+    сразу после загрузки порции, поэтому в памяти одновременно находится не
+    больше window документов, независимо от размера каталога.
+    """
+
+    def __init__(self, fetcher, max_pages=1000, window=4, same_host=True, state=None):
+        self.fetcher = fetcher        # AsyncFetcher парсера (ограничения по хостам и паузы уже в нем)
+        self.state = state            # CrawlState: очередь и обработанные страницы переживают перезапуск
+        self.max_pages = max_pages    # Защита от бесконечных каталогов и ловушек
+        self.window = window          # Страниц в одной параллельной порции
+        self.same_host = same_host    # Переходить только по ссылкам того же хоста
+
+    def crawl(self, start_urls, contents=None, scope=None, parse=None):
+        """Генератор (url, content) по всем страницам каталогов
+
+        start_urls - одна или несколько стартовых страниц;
+        contents - уже загруженные страницы {url: content}, чтобы не запрашивать их повторно;
+        scope - имя области в CrawlState: обработанные страницы пропускаются, очередь восстанавливается;
+        parse - разбор порции страниц [(url, content), ...] -> [{'records': ..., 'hrefs': ...}, ...]
+        (ParsePool.parser): тогда вместо content отдается результат разбора, а ссылки на
+        следующие страницы берутся из него - документ в этом процессе не разбирается.
+        """
+        if isinstance(start_urls, str):
+            start_urls = [start_urls]
+        contents = dict(contents or {})
+        state = self.state if scope else None
+
+        queue = deque()
+        seen = set()
+        if state:
+            # Продолжаем с очереди прерванного запуска; готовые страницы повторно не загружаем
+            for key, (url, status) in state.known_pages(scope).items():
+                seen.add(key)
+                if status == 'queued':
+                    queue.append(url)
+            if queue:
+                logger.info(f"Восстановлена очередь каталога: {len(queue)} страниц")
+
+        new_urls = []
+        for url in start_urls:
+            key = self.normalize(url)
+            if key not in seen:
+                seen.add(key)
+                queue.append(url)
+                new_urls.append(url)
+        if state:
+            state.add_pages(scope, new_urls)
+
+        pages = 0
+        while queue and pages < self.max_pages:
+            batch = []
+            while queue and len(batch) < min(self.window, self.max_pages - pages):
+                batch.append(queue.popleft())
+
+            # Уже загруженные страницы не запрашиваем повторно
+            to_fetch = [url for url in batch if url not in contents]
+            fetched = dict(self.fetcher.fetch_all(to_fetch)) if to_fetch else {}
+            loaded = [(url, contents.pop(url) if url in contents else fetched.get(url)) for url in batch]
+
+            # Вся порция разбирается параллельно
+            parsed = {}
+            if parse:
+                pages_to_parse = [(url, content) for url, content in loaded if content]
+                parsed = dict(zip([url for url, _ in pages_to_parse], parse(pages_to_parse)))
+
+            for url, content in loaded:
+                pages += 1
+                if not content:  # Ошибка загрузки уже залогирована
+                    continue
+
+                if parse:
+                    content = parsed[url]
+                    next_urls = self.filter_urls(url, content['hrefs'])
+                else:
+                    next_urls = self.find_next_urls(url, content)
+
+                new_urls = []
+                for next_url in next_urls:
+                    key = self.normalize(next_url)
+                    if key not in seen:
+                        seen.add(key)
+                        queue.append(next_url)
+                        new_urls.append(next_url)
+                if state:
+                    state.add_pages(scope, new_urls)
+
+                yield url, content
+
+                # Потребитель обработал страницу - отмечаем ее выполненной
+                if state:
+                    state.mark_page_done(url)
+
+            logger.info(f"Обработано страниц каталога: {pages}, в очереди: {len(queue)}")
+
+        if queue:
+            logger.warning(f"Достигнут лимит страниц ({self.max_pages}), пропущено: {len(queue)}")
+
+    def find_next_urls(self, url, content):
+        """Адреса следующих страниц списка, найденные на странице"""
+        return self.filter_urls(url, next_page_hrefs(url, make_soup(content)))
+
+    def filter_urls(self, url, hrefs):
+        """Абсолютные адреса без якорей и скриптов, при необходимости только с того же хоста"""
+        host = urlparse(url).netloc.lower()
+        result = []
+        for href in hrefs:
+            href = href.strip()
+            if not href or href.startswith(('#', 'javascript:', 'mailto:', 'tel:')):
+                continue
+            absolute = urljoin(url, href).split('#', 1)[0]
+            if not absolute.startswith('http'):
+                continue
+            if self.same_host and urlparse(absolute).netloc.lower() != host:
+                continue
+            if self.normalize(absolute) == self.normalize(url):
+                continue
+            result.append(absolute)
+        return list(dict.fromkeys(result))
+
+    def normalize(self, url):
+        """Ключ для сравнения адресов: без якоря, с отсортированными параметрами"""
+        return normalize_url(url)
+
+
+def next_page_hrefs(url, soup):
+    """Ссылки на следующие страницы в разобранном документе (без фильтрации)
+
+    Отдельная функция, чтобы ее можно было выполнять в процессах разбора (parse_pool).
+    """
+    found = []
+
+    # <link rel="next"> и <a rel="next">
+    for tag in soup.find_all(['link', 'a'], rel=True, href=True):
+        if 'next' in [value.lower() for value in tag.get('rel', [])]:
+            found.append(tag['href'])
+
+    for link in soup.find_all('a', href=True):
+        text = link.get_text(strip=True).lower()
+        classes = ' '.join(link.get('class', []))
+
+        # "Дальше" по тексту, классу или подписи
+        if (text in NEXT_TEXTS or NEXT_CLASS_PATTERN.search(classes) or
+                link.get('aria-label', '').lower() in NEXT_TEXTS or LOAD_MORE_PATTERN.search(text)):
+            found.append(link['href'])
+            continue
+
+        # Номера страниц внутри блока пагинации
+        if text.isdigit() and link.find_parent(class_=PAGINATION_CLASS_PATTERN):
+            found.append(link['href'])
+
+    # Кнопки "загрузить еще" с адресом или смещением следующей порции
+    # (текст проверяем только у кнопок и ссылок, чтобы не извлекать текст крупных контейнеров)
+    for tag in soup.find_all(is_load_more):
+        next_url = next((tag[name] for name in NEXT_URL_ATTRIBUTES if tag.get(name)), None)
+        next_url = next_url or tag.get('data-url') or tag.get('data-href')
+        offsets = {param: tag[name] for name, param in OFFSET_ATTRIBUTES.items() if tag.get(name)}
+        if next_url or offsets:
+            found.append(with_params(urljoin(url, next_url or url), offsets))
+
+    return found
+
+
+def is_load_more(tag):
+    """Элемент с адресом следующей порции или кнопка подгрузки"""
+    if any(tag.get(name) for name in NEXT_URL_ATTRIBUTES):
+        return True
+    return tag.name in ('button', 'a') and bool(LOAD_MORE_PATTERN.search(tag.get_text(strip=True)))
+
+
+def with_params(url, params):
+    """URL с замененными параметрами запроса"""
+    if not params:
+        return url
+    parts = urlparse(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update(params)
+    return urlunparse(parts._replace(query=urlencode(query)))
@@ -0,0 +1,203 @@
+"""
+Разбор страниц каталогов в пуле процессов: обратно возвращаются только записи участников
+"""
+
+import os
+import time
+import functools
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bs4 import BeautifulSoup
+from html_parser import PARSER
+from block_detector import BlockSelector, find_candidate_blocks
+from extraction_rules import ExtractionRules
+from crawl_state import block_hash
+from pagination import next_page_hrefs
+from browser_extractor import embedded_records, fingerprint_hash
+from metrics import get_default_metrics
+
+logger = logging.getLogger(__name__)
+
+# Скомпилированные профили в процессе-обработчике (имя -> CompiledProfile)
+_compiled = {}
+
+# Хэши блоков из снимка инкрементального режима (выставка -> set)
+_known = {}
+
+
+class PageProfile:
+    """Как разбирать страницы одного каталога
+
+    Передается в процессы-обработчики, поэтому содержит только простые данные:
+    словарь правил ExtractionRules, селекторы блоков и аргументы
+    find_candidate_blocks для поиска по структуре, если селекторы ничего не нашли.
+    """
+
+    def __init__(self, rules, selectors, candidates=None):
+        self.rules = rules
+        self.selectors = list(selectors)
+        self.candidates = candidates
+
+
+class CompiledProfile:
+    """Профиль с правилами и селекторами, скомпилированными один раз на процесс"""
+
+    def __init__(self, profile):
+        self.rules = ExtractionRules(profile.rules)
+        self.selector = BlockSelector(profile.selectors)
+        self.candidates = profile.candidates
+
+    def find_blocks(self, soup):
+        blocks = []
+        for _, found in self.selector.select(soup):
+            blocks.extend(found)
+        if not blocks and self.candidates is not None:
+            blocks = find_candidate_blocks(soup, **self.candidates)
+        return blocks
+
+
+def install_profiles(profiles, known=None):
+    """Компиляция профилей и хэшей снимка (инициализатор процесса-обработчика)"""
+    for name, profile in profiles.items():
+        _compiled[name] = CompiledProfile(profile)
+    _known.clear()
+    _known.update(known or {})
+
+
+def parse_page(name, url, content, scope=None):
+    """Записи участников и ссылки на следующие страницы одной страницы каталога
+
+    Выполняется в процессе-обработчике. Результат - простые данные:
+    {'records': [(поля или None, хэш блока), ...], 'hrefs': [...],
+     'error': ошибка страницы или None, 'block_errors': [ошибки отдельных блоков]}.
+    Блоки, хэш которых есть в снимке выставки scope, правилами не извлекаются:
+    вместо полей возвращается None, запись берется из снимка.
+    """
+    block_errors = []
+    try:
+        # Записи, уже извлеченные в браузере, только переводятся в тот же вид
+        records = embedded_records(content)
+        soup = BeautifulSoup(content, PARSER)
+        if records is not None:
+            records = [(record['fields'], fingerprint_hash(record['fingerprint'])) for record in records]
+        else:
+            profile = _compiled[name]
+            known = _known.get(scope, ())
+            records = []
+            for block in profile.find_blocks(soup):
+                try:
+                    content_hash = block_hash(block)
+                    records.append((None if content_hash in known else profile.rules.extract(block), content_hash))
+                except Exception as e:
+                    block_errors.append(str(e))
+        return {'records': records, 'hrefs': next_page_hrefs(url, soup), 'error': None, 'block_errors': block_errors}
+    except Exception as e:
+        return {'records': [], 'hrefs': [], 'error': str(e), 'block_errors': block_errors}
+
+
+class ParsePool:
+    """Пул процессов для разбора HTML и извлечения участников
+
+    BeautifulSoup и обход блоков занимают процессор и под GIL выполняются на
+    одном ядре. Пул отправляет процессам текст страниц, а получает только
+    компактные записи (поля и хэш блока) и ссылки пагинации - объекты soup
+    между процессами не передаются. Правила компилируются один раз в каждом
+    процессе. При workers <= 1 страницы разбираются в текущем процессе.
+
+    known_hashes - функция, возвращающая хэши блоков снимка по выставкам
+    (инкрементальный режим); они передаются процессам один раз при запуске
+    пула, и неизмененные блоки не извлекаются правилами.
+
+    SCRAPER_PARSE_WORKERS - число процессов (по умолчанию - число ядер, 0 - без пула)
+    """
+
+    def __init__(self, profiles, workers=None, known_hashes=None):
+        self.profiles = profiles    # Имя -> PageProfile
+        self.known_hashes = known_hashes
+        if workers is None:
+            workers = int(os.environ.get('SCRAPER_PARSE_WORKERS') or os.cpu_count() or 1)
+        self.workers = workers
+        self.metrics = get_default_metrics()
+        self._executor = None
+        self._local = False      # Разбор в текущем процессе (один обработчик или пул сломан)
+        self._lock = threading.Lock()
+
+    def executor(self):
+        """Пул процессов; создается при первом разборе"""
+        with self._lock:
+            if self._local or self.workers <= 1:
+                if not self._local:
+                    install_profiles(self.profiles, self.known())
+                    self._local = True
+                return None
+            if self._executor is None:
+                # spawn, а не fork: к моменту запуска в парсере уже работают потоки загрузки,
+                # и fork скопировал бы их захваченные блокировки
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=install_profiles,
+                    initargs=(self.profiles, self.known()),
+                )
+                logger.info(f"Запущен пул разбора страниц: {self.workers} процессов")
+            return self._executor
+
+    def known(self):
+        return self.known_hashes() if self.known_hashes else {}
+
+    def parse_all(self, name, pages, scope=None):
+        """Результаты parse_page для списка (url, content) в том же порядке (scope - выставка для снимка)"""
+        if not pages:
+            return []
+        started = time.monotonic()
+        executor = self.executor()
+        results = None
+        if executor is not None:
+            try:
+                results = list(executor.map(parse_page, [name] * len(pages), [url for url, _ in pages],
+                                            [content for _, content in pages], [scope] * len(pages)))
+            except BrokenProcessPool as e:
+                logger.error(f"Пул разбора страниц остановлен, разбираем в текущем процессе: {e}")
+                self.close()
+                with self._lock:
+                    install_profiles(self.profiles, self.known())
+                    self._local = True
+        if results is None:
+            results = [parse_page(name, url, content, scope) for url, content in pages]
+
+        # Время порции делится поровну между страницами: в пуле они разбираются параллельно
+        elapsed = (time.monotonic() - started) / len(pages)
+        for (url, _), result in zip(pages, results):
+            for error in result['block_errors']:
+                logger.error(f"Ошибка при парсинге участника: {error}")
+            if result['error']:
+                logger.error(f"Ошибка при разборе страницы {url}: {result['error']}")
+            else:
+                logger.info(f"Найдено {len(result['records'])} блоков участников ({url})")
+            errors = len(result['block_errors']) + (1 if result['error'] else 0)
+            if errors:
+                self.metrics.inc('scraper_stage_errors', errors, stage='parse')
+            self.metrics.observe('scraper_stage_seconds', elapsed, stage='parse')
+            self.metrics.inc('scraper_stage_items', stage='parse')
+            self.metrics.inc('scraper_records', len(result['records']), stage='parse')
+        return results
+
+    def parse(self, name, url, content, scope=None):
+        """Результат parse_page для одной страницы"""
+        return self.parse_all(name, [(url, content)], scope)[0]
+
+    def parser(self, name, scope=None):
+        """Функция разбора порции страниц для PaginationCrawler.crawl(parse=...)"""
+        return functools.partial(self.parse_all, name, scope=scope)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            # Следующий запуск заново получит хэши снимка
+            self._local = False
+        if executor is not None:
+            executor.shutdown()
+
@@ -0,0 +1,160 @@
+"""
+Конвейер обработки: стадии с собственными потоками, связанные ограниченными очередями
+"""
+
+import time
+import queue
+import threading
+import logging
+from metrics import get_default_metrics
+
+logger = logging.getLogger(__name__)
+
+# Признак конца входа стадии
+STOP = object()
+
+
+class Stage:
+    """Стадия конвейера: функция, число потоков и очередь входа"""
+
+    def __init__(self, name, func, workers=1, queue_size=None, on_done=None):
+        self.name = name
+        self.func = func              # item -> iterable результатов для следующей стадии или None
+        self.workers = workers
+        # Ограниченная очередь: если стадия не успевает, put() предыдущей стадии ждет (backpressure)
+        self.queue = queue.Queue(maxsize=queue_size or workers * 2)
+        self.on_done = on_done        # Вызывается один раз, когда все потоки стадии завершились
+        self.next = None
+        self.threads = []
+        self.running = 0
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0.0               # Время в функции стадии, с
+        self.blocked = 0.0            # Время ожидания места в очереди следующей стадии, с
+        self._lock = threading.Lock()
+
+    def put(self, item):
+        self.queue.put(item)
+
+    def emit(self, item):
+        """Передача результата следующей стадии (ждет, если ее очередь заполнена)"""
+        if self.next is None:
+            return
+        started = time.monotonic()
+        self.next.put(item)
+        with self._lock:
+            self.blocked += time.monotonic() - started
+
+    def work(self):
+        while True:
+            item = self.queue.get()
+            if item is STOP:
+                break
+            started = time.monotonic()
+            try:
+                results = self.func(item)
+                for result in results or ():
+                    self.emit(result)
+                with self._lock:
+                    self.processed += 1
+            except Exception as e:
+                logger.error(f"Ошибка на стадии {self.name}: {e}")
+                with self._lock:
+                    self.errors += 1
+            with self._lock:
+                self.busy += time.monotonic() - started
+        self.finish_worker()
+
+    def finish_worker(self):
+        with self._lock:
+            self.running -= 1
+            last = self.running == 0
+        if not last:
+            return
+        # Последний поток стадии: следующая стадия получит конец входа после всех результатов
+        if self.on_done:
+            try:
+                self.on_done()
+            except Exception as e:
+                logger.error(f"Ошибка при завершении стадии {self.name}: {e}")
+        if self.next is not None:
+            for _ in range(self.next.workers):
+                self.next.put(STOP)
+
+    def start(self):
+        self.running = self.workers
+        for index in range(self.workers):
+            thread = threading.Thread(target=self.work, name=f"{self.name}-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'processed': self.processed,
+                'errors': self.errors,
+                'busy': round(self.busy, 2),
+                'blocked': round(self.blocked, 2),
+                'queued': self.queue.qsize(),
+            }
+
+
+class Pipeline:
+    """Конвейер из стадий с ограниченными очередями
+
+    Каждая стадия работает в своих потоках и получает элементы из своей
+    очереди; результаты функции стадии уходят в очередь следующей. Очереди
+    ограничены, поэтому быстрая стадия ждет медленную и в памяти находится
+    не больше элементов, чем помещается в очереди. Элементы можно добавлять
+    в любую стадию и извне (put), например из обратного вызова парсера.
+    """
+
+    def __init__(self, name='pipeline'):
+        self.name = name
+        self.stages = []
+        self.by_name = {}
+
+    def stage(self, name, func, workers=1, queue_size=None, on_done=None):
+        """Добавление стадии в конец конвейера"""
+        stage = Stage(name, func, workers=workers, queue_size=queue_size, on_done=on_done)
+        if self.stages:
+            self.stages[-1].next = stage
+        self.stages.append(stage)
+        self.by_name[name] = stage
+        return self
+
+    def put(self, name, item):
+        """Элемент во вход стадии (ждет, если ее очередь заполнена)"""
+        self.by_name[name].put(item)
+
+    def run(self, items):
+        """Обработка элементов первой стадией и всеми следующими; возвращает статистику стадий"""
+        started = time.monotonic()
+        for stage in self.stages:
+            stage.start()
+
+        first = self.stages[0]
+        try:
+            for item in items:
+                first.put(item)
+        finally:
+            for _ in range(first.workers):
+                first.put(STOP)
+            for stage in self.stages:
+                for thread in stage.threads:
+                    thread.join()
+
+        stats = self.stats()
+        metrics = get_default_metrics()
+        for name, values in stats.items():
+            logger.info(f"Стадия {name}: обработано {values['processed']}, ошибок {values['errors']}, "
+                        f"в работе {values['busy']} с, ожидание очереди {values['blocked']} с")
+            metrics.set('scraper_pipeline_processed', values['processed'], pipeline=self.name, stage=name)
+            metrics.set('scraper_pipeline_busy_seconds', values['busy'], pipeline=self.name, stage=name)
+            metrics.set('scraper_pipeline_blocked_seconds', values['blocked'], pipeline=self.name, stage=name)
+        logger.info(f"Конвейер {self.name} завершен за {time.monotonic() - started:.1f} с")
+        return stats
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
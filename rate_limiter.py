@@ -0,0 +1,30 @@
+"""
+Ограничение частоты запросов (token bucket)
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """Потокобезопасный token bucket: не больше rate запросов в секунду"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate      # Пополнение токенов в секунду
+        self.burst = burst    # Максимальный запас токенов
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Ожидание свободного токена"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
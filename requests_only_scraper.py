@@ -4,121 +4,166 @@
 """
 
 import requests
-import pandas as pd
 import time
-import re
 from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
+import os
 import logging
+import threading
+from http_session import SessionPool
+from host_scheduler import get_default_scheduler
+from http_cache import get_default_cache
+from consent import get_default_consent
+from export_sinks import open_stream, write_excel, WrittenRecords, OUTPUT_DIR, EXHIBITOR_COLUMNS, CONTACT_COLUMNS, DELTA_COLUMNS
+from crawl_state import CrawlState
+from async_fetcher import AsyncFetcher
+from pagination import PaginationCrawler
+from html_parser import find_links
+from block_detector import BlockSelector
+from extraction_rules import REQUESTS_ONLY_RULES, select_text, find_email
+from parse_pool import ParsePool, PageProfile
+from pipeline import Pipeline
+from metrics import get_default_metrics
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Селекторы блоков участников (компилируются один раз)
+EXHIBITOR_SELECTORS = BlockSelector([
+    '.exhibitor-item',
+    '.aussteller-item',
+    '.company-item',
+    '.exhibitor-card',
+    '.aussteller-card',
+    '.exhibitor-list-item',
+    '.aussteller-list-item',
+    '[data-exhibitor]',
+    '[data-aussteller]',
+    '.exhibitor',
+    '.aussteller'
+])
+
+# Разбор страниц каталога в пуле процессов: блоки по селекторам, иначе по структуре
+# (правила извлечения компилируются один раз в каждом процессе)
+PAGE_PROFILES = {
+    'exhibitors': PageProfile(REQUESTS_ONLY_RULES, EXHIBITOR_SELECTORS.selectors, candidates={
+        'min_text': 10,
+        'max_text': 500,
+        'skip_words': ['exhibition management', 'navigation', 'menu', 'footer', 'header', 'cookie'],
+    }),
+}
+
+# Сайты выставок; SCRAPER_ELTEFA_SITE / SCRAPER_IHM_SITE позволяют направить парсер на другой адрес
+# (например, на локальный mock_fair_server.py для нагрузочных прогонов)
+ELTEFA_SITE = os.environ.get('SCRAPER_ELTEFA_SITE', 'https://www.messe-stuttgart.de').rstrip('/')
+IHM_SITE = os.environ.get('SCRAPER_IHM_SITE', 'https://www.ihm.de').rstrip('/')
+
+# Выставки (области состояния обхода)
+FAIRS = ('eltefa', 'ihm')
+
+# Потоков поиска контактов в конвейере
+CONTACT_WORKERS = 4
+
 class RequestsOnlyScraper:
-    def __init__(self):
+    def __init__(self, incremental=None, pipeline=None):
         self.ua = UserAgent()
-        self.exhibitors_data = []
-        self.contacts_data = []
+        # Состояние обхода для продолжения прерванного запуска и снимок прошлых запусков
+        self.state = CrawlState(os.path.join(OUTPUT_DIR, 'requests_state.db'))
+        # Записи сразу пишутся на диск (JSONL и CSV) - при сбое найденные данные сохраняются;
+        # после сбоя файлы дописываются, а не создаются заново (см. restore_from_state)
+        mode = 'a' if self.state.interrupted() else 'w'
+        self.exhibitors_data = open_stream('requests_exhibitors', EXHIBITOR_COLUMNS, mode)
+        self.contacts_data = open_stream('requests_contacts', CONTACT_COLUMNS, mode)
+        self.delta_data = open_stream('requests_delta', DELTA_COLUMNS)  # Изменения относительно прошлого запуска
+        self.written_exhibitors = None  # Записи, оставшиеся в файлах от прерванного запуска
+        self.written_contacts = None
+        # Инкрементальный режим: неизменившиеся участники не извлекаются и не ищутся повторно
+        self.incremental = os.environ.get('SCRAPER_INCREMENTAL') == '1' if incremental is None else incremental
+        # Конвейер: контакты ищутся, пока каталоги еще обходятся (SCRAPER_PIPELINE=0 - последовательно)
+        self.use_pipeline = os.environ.get('SCRAPER_PIPELINE', '1') != '0' if pipeline is None else pipeline
+        self.on_exhibitor = None    # Вызывается для каждого нового участника (scope, запись)
+        self.sessions = SessionPool(headers={
+            'User-Agent': self.ua.random,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'de-DE,de;q=0.9,en;q=0.8',  # Немецкий язык в приоритете
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Cache-Control': 'max-age=0',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Sec-Fetch-User': '?1',
+        }, cache=get_default_cache(), scheduler=get_default_scheduler())
+        self.consent = get_default_consent()
+        self.metrics = get_default_metrics()
+        self.fetcher = AsyncFetcher(self.get_page_content)
+        # В инкрементальном режиме блоки из снимка не извлекаются правилами
+        # HTML разбирается на всех ядрах; порция страниц не меньше числа процессов разбора
+        self.parse_pool = ParsePool(PAGE_PROFILES, known_hashes=self.state.snapshot_hashes if self.incremental else None)
+        self.paginator = PaginationCrawler(self.fetcher, window=max(4, self.parse_pool.workers), state=self.state)
         
     def get_page_content(self, url):
         """Получение содержимого страницы с помощью requests"""
+        started = time.monotonic()
+        content = None
         try:
-            headers = {
-                'User-Agent': self.ua.random,
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'de-DE,de;q=0.9,en;q=0.8',  # Немецкий язык в приоритете
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Cache-Control': 'max-age=0',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Sec-Fetch-User': '?1',
-            }
-            
-            # Создаем сессию для сохранения cookies
-            session = requests.Session()
-            session.headers.update(headers)
-            
-            # Сначала получаем страницу для установки cookies
-            response = session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            # Проверяем, есть ли cookie banner и принимаем cookies
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Ищем и нажимаем кнопки принятия cookies
-            cookie_buttons = soup.find_all(['button', 'a'], string=re.compile(r'accept|akzeptieren|einverstanden|ok|zulassen', re.I))
-            
-            if cookie_buttons:
-                logger.info(f"Найдены кнопки cookies на {url}")
-                # Пытаемся принять cookies через POST запрос
-                for button in cookie_buttons:
-                    try:
-                        # Ищем форму для cookies
-                        form = button.find_parent('form')
-                        if form:
-                            form_action = form.get('action', '')
-                            if not form_action.startswith('http'):
-                                form_action = url + form_action
-                            
-                            # Отправляем POST запрос для принятия cookies
-                            session.post(form_action, data={'accept': '1'}, timeout=30)
-                            logger.info("Cookies приняты через форму")
-                            break
-                    except:
-                        continue
-            
-            # Получаем финальную страницу с принятыми cookies
-            final_response = session.get(url, timeout=30)
-            final_response.raise_for_status()
-            
-            return final_response.text
+            # Общая сессия хоста: keep-alive соединения и принятые cookies сохраняются между страницами
+            session = self.sessions.get_session(url)
+            # Способ согласия на cookies определяется один раз для домена, дальше cookies берутся с диска
+            content = self.consent.get(session, url, timeout=30)
             
         except Exception as e:
             logger.error(f"Ошибка при получении страницы {url}: {e}")
-            return None
+        finally:
+            self.metrics.page(url, 'http', started, content)
+        return content
     
     def scrape_eltefa(self):
         """Парсинг выставки ELTEFA"""
         logger.info("Начинаем парсинг ELTEFA...")
-        url = "https://www.messe-stuttgart.de/eltefa/"
+        
+        # Каталог, найденный в прерванном запуске, продолжаем без повторного поиска ссылки
+        directory = self.state.get_meta('eltefa:directory')
+        if directory:
+            self.scrape_eltefa_exhibitors(directory)
+            self.state.mark_done('eltefa')
+            return
+        
+        url = f"{ELTEFA_SITE}/eltefa/"
         
         # Получаем основную страницу
         content = self.get_page_content(url)
         if not content:
             return
         
-        soup = BeautifulSoup(content, 'html.parser')
-        
         # Ищем ссылку на список участников
         exhibitors_link = None
-        links = soup.find_all('a', href=True)
         
-        # Более точный поиск ссылок на участников
-        for link in links:
-            link_text = link.get_text(strip=True).lower()
-            link_href = link.get('href', '').lower()
+        # Более точный поиск ссылок на участников (быстрый XPath-путь без построения soup)
+        for link_text, href in find_links(content):
+            link_text = link_text.lower()
+            link_href = href.lower()
             
             # Ищем по тексту ссылки
             if any(keyword in link_text for keyword in ['aussteller', 'exhibitor', 'teilnehmer', 'teilnehmen']):
-                exhibitors_link = link['href']
+                exhibitors_link = href
                 logger.info(f"Найдена ссылка на участников: {link_text} -> {exhibitors_link}")
                 break
             
             # Ищем по URL
             if any(keyword in link_href for keyword in ['aussteller', 'exhibitor', 'teilnehmer']):
-                exhibitors_link = link['href']
+                exhibitors_link = href
                 logger.info(f"Найдена ссылка на участников по URL: {link_href}")
                 break
         
         if exhibitors_link:
             if not exhibitors_link.startswith('http'):
-                exhibitors_link = f"https://www.messe-stuttgart.de{exhibitors_link}"
+                exhibitors_link = f"{ELTEFA_SITE}{exhibitors_link}"
             
             # Парсим страницу участников
+            self.state.set_meta('eltefa:directory', exhibitors_link)
             self.scrape_eltefa_exhibitors(exhibitors_link)
         else:
             logger.warning("Ссылка на участников не найдена, пробуем стандартные пути...")
@@ -131,134 +176,106 @@ class RequestsOnlyScraper:
                 "/exhibitors/",
                 "/teilnehmer/"
             ]
-            for path in standard_paths:
-                test_url = f"https://www.messe-stuttgart.de{path}"
+            # Запрашиваем все кандидаты параллельно, а разбираем по порядку
+            test_urls = [f"{ELTEFA_SITE}{path}" for path in standard_paths]
+            for test_url, test_content in self.fetcher.fetch_all(test_urls):
                 logger.info(f"Пробуем: {test_url}")
-                self.scrape_eltefa_exhibitors(test_url)
-                if self.exhibitors_data:  # Если нашли данные, прекращаем
+                if test_content is None:  # Ошибка загрузки уже залогирована
+                    continue
+                # Если нашли участников, прекращаем (IHM может обрабатываться параллельно)
+                if self.scrape_eltefa_exhibitors(test_url, test_content):
                     break
-    
-    def scrape_eltefa_exhibitors(self, url):
-        """Парсинг участников ELTEFA"""
-        content = self.get_page_content(url)
-        if not content:
-            return
-        
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        # Более точные селекторы для поиска участников
-        exhibitor_blocks = []
-        
-        # 1. Ищем по специфичным классам
-        specific_selectors = [
-            '.exhibitor-item',
-            '.aussteller-item', 
-            '.company-item',
-            '.exhibitor-card',
-            '.aussteller-card',
-            '.exhibitor-list-item',
-            '.aussteller-list-item',
-            '[data-exhibitor]',
-            '[data-aussteller]',
-            '.exhibitor',
-            '.aussteller'
-        ]
         
-        for selector in specific_selectors:
-            blocks = soup.select(selector)
-            if blocks:
-                exhibitor_blocks.extend(blocks)
-                logger.info(f"Найдено {len(blocks)} блоков с селектором: {selector}")
-        
-        # 2. Если не нашли, ищем по структуре с более строгими критериями
-        if not exhibitor_blocks:
-            # Ищем блоки, которые содержат название компании и контактную информацию
-            all_divs = soup.find_all('div')
-            for div in all_divs:
-                # Проверяем, что блок содержит заголовок и ссылку
-                has_title = div.find(['h1', 'h2', 'h3', 'h4', 'strong', 'b'])
-                has_link = div.find('a', href=True)
-                has_text = div.get_text(strip=True)
-                
-                # Фильтруем блоки с осмысленным содержимым
-                if (has_title and has_link and 
-                    len(has_text) > 10 and len(has_text) < 500 and
-                    not any(skip_word in has_text.lower() for skip_word in 
-                           ['exhibition management', 'navigation', 'menu', 'footer', 'header', 'cookie'])):
-                    exhibitor_blocks.append(div)
-        
-        logger.info(f"Найдено {len(exhibitor_blocks)} потенциальных блоков участников")
-        
-        # Убираем дубликаты и ограничиваем количество
-        unique_blocks = []
+        # Выставка обработана полностью - при продолжении запуска не повторяется
+        self.state.mark_done('eltefa')
+    
+    def scrape_eltefa_exhibitors(self, url, content=None):
+        """Парсинг участников ELTEFA по всем страницам каталога; возвращает число добавленных"""
         seen_names = set()
+        added = 0
+        contents = {url: content} if content else None
         
-        for block in exhibitor_blocks[:20]:  # Ограничиваем для демонстрации
+        # Страницы отдаются по мере загрузки и разбираются в пуле процессов - документы не накапливаются
+        parse = self.parse_pool.parser('exhibitors', 'eltefa')
+        for page_url, page in self.paginator.crawl(url, contents, scope='eltefa', parse=parse):
+            added += self.scrape_eltefa_exhibitors_page(page_url, page, seen_names)
+        return added
+    
+    def scrape_eltefa_exhibitors_page(self, url, page, seen_names):
+        """Добавление участников ELTEFA с одной разобранной страницы каталога; возвращает их число"""
+        added = 0
+        # Блоки найдены и извлечены правилами в пуле разбора: здесь только фильтрация и запись
+        # Убираем дубликаты (seen_names общий для всех страниц каталога)
+        for exhibitor, content_hash in page['records']:
             try:
-                name = self.extract_text(block, ['h1', 'h2', 'h3', 'h4', '.company-name', '.exhibitor-name', 'strong', 'b'])
+                # В инкрементальном режиме блок с тем же текстом берется из снимка
+                if self.incremental:
+                    snapshot = self.state.unchanged_exhibitor('eltefa', content_hash)
+                    if snapshot is not None:
+                        exhibitor = snapshot
+                if not exhibitor:
+                    continue
+                name = exhibitor['Name']
                 
                 # Фильтруем нежелательные названия
-                if (name and len(name) > 2 and len(name) < 100 and
+                if (len(name) > 2 and len(name) < 100 and
                     name not in seen_names and
                     not any(skip_word in name.lower() for skip_word in 
                            ['exhibition', 'management', 'navigation', 'menu', 'footer', 'header', 'cookie', 'privacy'])):
                     
                     seen_names.add(name)
-                    unique_blocks.append(block)
-                    
-                    city = self.extract_text(block, ['.city', '.location', '[data-city]'])
-                    country = self.extract_text(block, ['.country', '[data-country]'])
-                    website = self.extract_link(block, 'a[href*="http"]')
-                    email = self.extract_email(block)
                     
-                    self.exhibitors_data.append({
-                        'Name': name.strip(),
-                        'City': city.strip() if city else '',
-                        'Country': country.strip() if country else 'Germany',
-                        'Website': website if website else '',
-                        'Email': email if email else ''
-                    })
-                    logger.info(f"Добавлен участник: {name}")
+                    # Участники, записанные до перезапуска, повторно не добавляются
+                    if self.add_exhibitor('eltefa', exhibitor, content_hash):
+                        added += 1
+                        logger.info(f"Добавлен участник: {name}")
                     
             except Exception as e:
                 logger.error(f"Ошибка при парсинге участника: {e}")
+        return added
     
     def scrape_ihm(self):
         """Парсинг выставки IHM"""
         logger.info("Начинаем парсинг IHM...")
-        url = "https://www.ihm.de/de/home"
+        
+        # Каталог, найденный в прерванном запуске, продолжаем без повторного поиска ссылки
+        directory = self.state.get_meta('ihm:directory')
+        if directory:
+            self.scrape_ihm_exhibitors(directory)
+            self.state.mark_done('ihm')
+            return
+        
+        url = f"{IHM_SITE}/de/home"
         
         content = self.get_page_content(url)
         if not content:
             return
         
-        soup = BeautifulSoup(content, 'html.parser')
-        
         # Ищем ссылку на список участников
         exhibitors_link = None
-        links = soup.find_all('a', href=True)
         
-        # Более точный поиск ссылок на участников
-        for link in links:
-            link_text = link.get_text(strip=True).lower()
-            link_href = link.get('href', '').lower()
+        # Более точный поиск ссылок на участников (быстрый XPath-путь без построения soup)
+        for link_text, href in find_links(content):
+            link_text = link_text.lower()
+            link_href = href.lower()
             
             # Ищем по тексту ссылки
             if any(keyword in link_text for keyword in ['aussteller', 'exhibitor', 'teilnehmer', 'teilnehmen']):
-                exhibitors_link = link['href']
+                exhibitors_link = href
                 logger.info(f"Найдена ссылка на участников: {link_text} -> {exhibitors_link}")
                 break
             
             # Ищем по URL
             if any(keyword in link_href for keyword in ['aussteller', 'exhibitor', 'teilnehmer']):
-                exhibitors_link = link['href']
+                exhibitors_link = href
                 logger.info(f"Найдена ссылка на участников по URL: {link_href}")
                 break
         
         if exhibitors_link:
             if not exhibitors_link.startswith('http'):
-                exhibitors_link = f"https://www.ihm.de{exhibitors_link}"
+                exhibitors_link = f"{IHM_SITE}{exhibitors_link}"
             
+            self.state.set_meta('ihm:directory', exhibitors_link)
             self.scrape_ihm_exhibitors(exhibitors_link)
         else:
             logger.warning("Ссылка на участников не найдена, пробуем стандартные пути...")
@@ -272,105 +289,149 @@ class RequestsOnlyScraper:
                 "/en/aussteller/",
                 "/de/exhibitors/"
             ]
-            for path in standard_paths:
-                test_url = f"https://www.ihm.de{path}"
+            # Запрашиваем все кандидаты параллельно, а разбираем по порядку
+            test_urls = [f"{IHM_SITE}{path}" for path in standard_paths]
+            for test_url, test_content in self.fetcher.fetch_all(test_urls):
                 logger.info(f"Пробуем: {test_url}")
-                self.scrape_ihm_exhibitors(test_url)
-                if len(self.exhibitors_data) > 0:  # Если нашли данные, прекращаем
+                if test_content is None:  # Ошибка загрузки уже залогирована
+                    continue
+                # Если нашли участников, прекращаем (ELTEFA может обрабатываться параллельно)
+                if self.scrape_ihm_exhibitors(test_url, test_content):
                     break
-    
-    def scrape_ihm_exhibitors(self, url):
-        """Парсинг участников IHM"""
-        content = self.get_page_content(url)
-        if not content:
-            return
         
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        # Более точные селекторы для поиска участников
-        exhibitor_blocks = []
-        
-        # 1. Ищем по специфичным классам
-        specific_selectors = [
-            '.exhibitor-item',
-            '.aussteller-item', 
-            '.company-item',
-            '.exhibitor-card',
-            '.aussteller-card',
-            '.exhibitor-list-item',
-            '.aussteller-list-item',
-            '[data-exhibitor]',
-            '[data-aussteller]',
-            '.exhibitor',
-            '.aussteller'
-        ]
-        
-        for selector in specific_selectors:
-            blocks = soup.select(selector)
-            if blocks:
-                exhibitor_blocks.extend(blocks)
-                logger.info(f"Найдено {len(blocks)} блоков с селектором: {selector}")
-        
-        # 2. Если не нашли, ищем по структуре с более строгими критериями
-        if not exhibitor_blocks:
-            # Ищем блоки, которые содержат название компании и контактную информацию
-            all_divs = soup.find_all('div')
-            for div in all_divs:
-                # Проверяем, что блок содержит заголовок и ссылку
-                has_title = div.find(['h1', 'h2', 'h3', 'h4', 'strong', 'b'])
-                has_link = div.find('a', href=True)
-                has_text = div.get_text(strip=True)
-                
-                # Фильтруем блоки с осмысленным содержимым
-                if (has_title and has_link and 
-                    len(has_text) > 10 and len(has_text) < 500 and
-                    not any(skip_word in has_text.lower() for skip_word in 
-                           ['exhibition management', 'navigation', 'menu', 'footer', 'header', 'cookie'])):
-                    exhibitor_blocks.append(div)
-        
-        logger.info(f"Найдено {len(exhibitor_blocks)} потенциальных блоков участников")
-        
-        # Убираем дубликаты и ограничиваем количество
-        unique_blocks = []
+        # Выставка обработана полностью - при продолжении запуска не повторяется
+        self.state.mark_done('ihm')
+    
+    def scrape_ihm_exhibitors(self, url, content=None):
+        """Парсинг участников IHM по всем страницам каталога; возвращает число добавленных"""
         seen_names = set()
+        added = 0
+        contents = {url: content} if content else None
         
-        for block in exhibitor_blocks[:20]:  # Ограничиваем для демонстрации
+        # Страницы отдаются по мере загрузки и разбираются в пуле процессов - документы не накапливаются
+        parse = self.parse_pool.parser('exhibitors', 'ihm')
+        for page_url, page in self.paginator.crawl(url, contents, scope='ihm', parse=parse):
+            added += self.scrape_ihm_exhibitors_page(page_url, page, seen_names)
+        return added
+    
+    def scrape_ihm_exhibitors_page(self, url, page, seen_names):
+        """Добавление участников IHM с одной разобранной страницы каталога; возвращает их число"""
+        added = 0
+        # Блоки найдены и извлечены правилами в пуле разбора: здесь только фильтрация и запись
+        # Убираем дубликаты (seen_names общий для всех страниц каталога)
+        for exhibitor, content_hash in page['records']:
             try:
-                name = self.extract_text(block, ['h1', 'h2', 'h3', 'h4', '.company-name', '.exhibitor-name', 'strong', 'b'])
+                # В инкрементальном режиме блок с тем же текстом берется из снимка
+                if self.incremental:
+                    snapshot = self.state.unchanged_exhibitor('ihm', content_hash)
+                    if snapshot is not None:
+                        exhibitor = snapshot
+                if not exhibitor:
+                    continue
+                name = exhibitor['Name']
                 
                 # Фильтруем нежелательные названия
-                if (name and len(name) > 2 and len(name) < 100 and
+                if (len(name) > 2 and len(name) < 100 and
                     name not in seen_names and
                     not any(skip_word in name.lower() for skip_word in 
                            ['exhibition', 'management', 'navigation', 'menu', 'footer', 'header', 'cookie', 'privacy'])):
                     
                     seen_names.add(name)
-                    unique_blocks.append(block)
                     
-                    city = self.extract_text(block, ['.city', '.location', '[data-city]'])
-                    country = self.extract_text(block, ['.country', '[data-country]'])
-                    website = self.extract_link(block, 'a[href*="http"]')
-                    email = self.extract_email(block)
-                    
-                    self.exhibitors_data.append({
-                        'Name': name.strip(),
-                        'City': city.strip() if city else '',
-                        'Country': country.strip() if country else 'Germany',
-                        'Website': website if website else '',
-                        'Email': email if email else ''
-                    })
-                    logger.info(f"Добавлен участник: {name}")
+                    # Участники, записанные до перезапуска, повторно не добавляются
+                    if self.add_exhibitor('ihm', exhibitor, content_hash):
+                        added += 1
+                        logger.info(f"Добавлен участник: {name}")
                     
             except Exception as e:
                 logger.error(f"Ошибка при парсинге участника: {e}")
+        return added
+    
+    def add_exhibitor(self, scope, exhibitor, content_hash=None):
+        """Запись участника; False, если он уже был сохранен до перезапуска"""
+        if not self.state.add_exhibitor(scope, exhibitor, content_hash):
+            return False
+        self.exhibitors_data.append(exhibitor)
+        if self.on_exhibitor:
+            self.on_exhibitor(scope, exhibitor)
+        return True
+    
+    def add_contacts(self, company_name, contacts):
+        """Запись найденных контактов компании"""
+        for contact in contacts:
+            record = {
+                'Company Name': company_name,
+                'Full Name': contact.get('name', ''),
+                'Position': contact.get('position', ''),
+                'Email': contact.get('email', ''),
+                'Source': contact.get('source', '')
+            }
+            if self.written_contacts is None or not self.written_contacts.take(record):
+                self.contacts_data.append(record)
+    
+    def companies_to_search(self):
+        """Компании, для которых нужен поиск контактов
+        
+        Поиски, выполненные до перезапуска, пропускаются; в инкрементальном режиме
+        контакты неизменившихся компаний берутся из снимка прошлого запуска.
+        """
+        for exhibitor, scope, change in self.state.exhibitor_changes():
+            company = self.company_to_search(exhibitor, scope, change)
+            if company:
+                yield company
+    
+    def company_to_search(self, exhibitor, scope, change):
+        """(компания, сайт) для поиска контактов или None, если искать не нужно"""
+        company_name = exhibitor['Name']
+        if self.state.get_contacts(company_name) is not None:
+            return None
+        if self.incremental and change == 'unchanged':
+            contacts = self.state.snapshot_contacts(scope, exhibitor)
+            if contacts is not None:
+                self.state.store_contacts(company_name, exhibitor.get('Website'), contacts)
+                self.add_contacts(company_name, contacts)
+                return None
+        return company_name, exhibitor.get('Website')
+    
+    def write_changes(self):
+        """Запись изменений относительно прошлого запуска
+        
+        В инкрементальном режиме к результатам добавляются участники выставок, не
+        обработанных в этом запуске, - получается объединенный снимок.
+        Возвращает список полностью обработанных выставок.
+        """
+        done_scopes = [scope for scope in FAIRS if self.state.is_done(scope)]
+        if self.incremental:
+            for exhibitor, contacts in self.state.carried_over(done_scopes):
+                if self.written_exhibitors is None or not self.written_exhibitors.take(exhibitor):
+                    self.exhibitors_data.append(exhibitor)
+                self.add_contacts(exhibitor['Name'], contacts)
+        for change in self.state.delta(done_scopes):
+            self.delta_data.append(change)
+        logger.info(f"Изменений относительно прошлого запуска: {len(self.delta_data)}")
+        return done_scopes
+    
+    def restore_from_state(self):
+        """Перенос результатов прерванного запуска в файлы вывода
+
+        Файлы открыты на дописывание: записи, которые прерванный запуск успел
+        сохранить, остаются на месте, дописываются только недостающие.
+        """
+        self.written_exhibitors = WrittenRecords(self.exhibitors_data)
+        self.written_contacts = WrittenRecords(self.contacts_data)
+        kept = len(self.exhibitors_data)
+        for exhibitor in self.state.exhibitors():
+            if not self.written_exhibitors.take(exhibitor):
+                self.exhibitors_data.append(exhibitor)
+            contacts = self.state.get_contacts(exhibitor['Name'])
+            if contacts:
+                self.add_contacts(exhibitor['Name'], contacts)
+        logger.info(f"Восстановлено {len(self.exhibitors_data)} участников и {len(self.contacts_data)} контактов "
+                    f"(из файлов прерванного запуска: {kept})")
     
     def extract_text(self, element, selectors):
         """Извлечение текста по селекторам"""
-        for selector in selectors:
-            found = element.select_one(selector)
-            if found and found.get_text(strip=True):
-                return found.get_text(strip=True)
-        return None
+        return select_text(element, selectors)
     
     def extract_link(self, element, selector):
         """Извлечение ссылки"""
@@ -384,10 +445,7 @@ class RequestsOnlyScraper:
     
     def extract_email(self, element):
         """Извлечение email"""
-        text = element.get_text()
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        return emails[0] if emails else None
+        return find_email(element.get_text())
     
     def search_contacts(self, company_name, website_url=None):
         """Поиск контактных лиц для компании (заглушка)"""
@@ -410,58 +468,108 @@ class RequestsOnlyScraper:
                 logger.warning("Нет данных для сохранения")
                 return
             
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                # Сохраняем данные участников
-                if self.exhibitors_data:
-                    df_exhibitors = pd.DataFrame(self.exhibitors_data)
-                    df_exhibitors.to_excel(writer, sheet_name='Exhibitors', index=False)
-                    logger.info(f"Сохранено {len(self.exhibitors_data)} участников")
-                else:
-                    # Создаем пустой лист с заголовками
-                    df_exhibitors = pd.DataFrame(columns=['Name', 'City', 'Country', 'Website', 'Email'])
-                    df_exhibitors.to_excel(writer, sheet_name='Exhibitors', index=False)
-                    logger.info("Создан пустой лист участников")
-                
-                # Сохраняем данные контактов
-                if self.contacts_data:
-                    df_contacts = pd.DataFrame(self.contacts_data)
-                    df_contacts.to_excel(writer, sheet_name='Contacts', index=False)
-                    logger.info(f"Сохранено {len(self.contacts_data)} контактов")
-                else:
-                    # Создаем пустой лист с заголовками
-                    df_contacts = pd.DataFrame(columns=['Company Name', 'Full Name', 'Position', 'Email', 'Source'])
-                    df_contacts.to_excel(writer, sheet_name='Contacts', index=False)
-                    logger.info("Создан пустой лист контактов")
-            
+            # Книга собирается построчно из файлов потока, данные целиком в память не загружаются
+            with self.metrics.stage('export', len(self.exhibitors_data) + len(self.contacts_data)):
+                write_excel(filename, [
+                    ('Exhibitors', self.exhibitors_data, EXHIBITOR_COLUMNS),
+                    ('Contacts', self.contacts_data, CONTACT_COLUMNS),
+                    ('Changes', self.delta_data, DELTA_COLUMNS),
+                ])
+            logger.info(f"Сохранено {len(self.exhibitors_data)} участников")
+            logger.info(f"Сохранено {len(self.contacts_data)} контактов")
             logger.info(f"Данные сохранены в файл: {filename}")
             
         except Exception as e:
             logger.error(f"Ошибка при сохранении файла: {e}")
     
+    def run_pipeline(self):
+        """Обход выставок и поиск контактов конвейером
+
+        Стадии: выставки (поиск каталога, загрузка и разбор страниц) -> поиск
+        контактов -> запись. Очереди между стадиями ограничены: если поиск
+        контактов не успевает, обход каталогов ждет, и память не растет.
+        """
+        pipeline = Pipeline('requests')
+        pipeline.stage('fairs', self.scrape_fair, workers=len(FAIRS))
+        pipeline.stage('contacts', self.find_contacts, workers=CONTACT_WORKERS)
+        pipeline.stage('export', self.store_found_contacts)
+        
+        # Компания может встретиться на обеих выставках - в очередь она попадает один раз
+        queued = set()
+        lock = threading.Lock()
+        
+        def queue_contacts(scope, exhibitor):
+            company = self.company_to_search(exhibitor, scope, self.state.exhibitor_change(scope, exhibitor))
+            if not company:
+                return
+            with lock:
+                if company[0] in queued:
+                    return
+                queued.add(company[0])
+            pipeline.put('contacts', company)
+        
+        self.on_exhibitor = queue_contacts
+        try:
+            pipeline.run([fair for fair in FAIRS if not self.state.is_done(fair)])
+        finally:
+            self.on_exhibitor = None
+    
+    def scrape_fair(self, fair):
+        """Парсинг одной выставки (стадия конвейера)"""
+        {'eltefa': self.scrape_eltefa, 'ihm': self.scrape_ihm}[fair]()
+    
+    def find_contacts(self, company):
+        """Поиск контактов компании (стадия конвейера)"""
+        company_name, website_url = company
+        return [(company_name, website_url, self.search_contacts(company_name, website_url))]
+    
+    def store_found_contacts(self, result):
+        """Запись найденных контактов (стадия конвейера)"""
+        company_name, website_url, contacts = result
+        self.state.store_contacts(company_name, website_url, contacts)
+        self.add_contacts(company_name, contacts)
+    
     def run(self):
         """Запуск парсинга"""
         logger.info("Начинаем парсинг выставок (только requests)...")
         
-        # Парсим ELTEFA
-        self.scrape_eltefa()
+        # Прерванный запуск продолжается с места остановки
+        if self.state.begin_run():
+            self.restore_from_state()
         
-        # Парсим IHM
-        self.scrape_ihm()
+        if self.use_pipeline:
+            # Выставки обходятся параллельно, контакты ищутся по мере появления участников
+            self.run_pipeline()
+        else:
+            # Парсим ELTEFA
+            if not self.state.is_done('eltefa'):
+                self.scrape_eltefa()
+            
+            # Парсим IHM
+            if not self.state.is_done('ihm'):
+                self.scrape_ihm()
+        
+        # Закрываем keep-alive соединения с сайтами выставок и процессы разбора
+        self.sessions.close()
+        self.parse_pool.close()
         
-        # Поиск контактов для каждой компании
-        for exhibitor in self.exhibitors_data:
-            contacts = self.search_contacts(exhibitor['Name'], exhibitor.get('Website'))
-            for contact in contacts:
-                self.contacts_data.append({
-                    'Company Name': exhibitor['Name'],
-                    'Full Name': contact.get('name', ''),
-                    'Position': contact.get('position', ''),
-                    'Email': contact.get('email', ''),
-                    'Source': contact.get('source', '')
-                })
+        # Поиск контактов для каждой компании (уже выполненные поиски и неизменившиеся компании пропускаются;
+        # в режиме конвейера остаются только участники, записанные до перезапуска)
+        for company_name, website_url in self.companies_to_search():
+            contacts = self.search_contacts(company_name, website_url)
+            self.state.store_contacts(company_name, website_url, contacts)
+            self.add_contacts(company_name, contacts)
+        
+        # Изменения и объединенный снимок
+        done_scopes = self.write_changes()
         
         # Сохраняем результаты
         self.save_to_excel()
+        self.state.commit_snapshot(done_scopes)
+        self.state.finish_run()
+        
+        # Счетчики и задержки по хостам и стадиям для мониторинга
+        self.metrics.write()
 
 if __name__ == "__main__":
     scraper = RequestsOnlyScraper()
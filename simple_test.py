@@ -4,10 +4,10 @@
 """
 
 import requests
-import pandas as pd
 from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
 import logging
+from export_sinks import write_excel, EXHIBITOR_COLUMNS
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -71,9 +71,8 @@ def test_simple_parsing():
     
     # Сохраняем тестовые данные
     if exhibitors_data:
-        df = pd.DataFrame(exhibitors_data)
         filename = "test_data.xlsx"
-        df.to_excel(filename, index=False)
+        write_excel(filename, [('Exhibitors', exhibitors_data, EXHIBITOR_COLUMNS)])
         logger.info(f"Тестовые данные сохранены в {filename}")
         return True
     else:
@@ -0,0 +1,371 @@
+"""
+Поиск JSON-API каталога участников по XHR-трафику браузера и постраничная загрузка без браузера
+"""
+
+import json
+import base64
+import hashlib
+import logging
+from collections import deque
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+from extraction_rules import find_email
+
+logger = logging.getLogger(__name__)
+
+# Параметры постраничной выдачи (сравниваются без учета регистра)
+PAGE_PARAMS = ('page', 'pagenumber', 'page_number', 'pageindex', 'page_index', 'currentpage', 'p')
+OFFSET_PARAMS = ('offset', 'start', 'skip', 'from', 'startindex', 'start_index', 'first')
+SIZE_PARAMS = ('limit', 'size', 'pagesize', 'page_size', 'per_page', 'perpage', 'rows', 'hitsperpage', 'max', 'take')
+
+# Ключи общего количества записей в ответе
+TOTAL_KEYS = ('total', 'totalcount', 'total_count', 'totalhits', 'totalresults', 'total_results', 'numfound', 'count')
+
+# Ключи полей участника в записях JSON (в порядке приоритета)
+FIELD_KEYS = {
+    'Name': ('name', 'companyname', 'company_name', 'exhibitorname', 'exhibitor_name', 'displayname',
+             'firma', 'company', 'title'),
+    'City': ('city', 'ort', 'town', 'locality'),
+    'Country': ('country', 'countryname', 'country_name', 'land', 'countrycode'),
+    'Website': ('website', 'homepage', 'web', 'www', 'url'),
+    'Email': ('email', 'e_mail', 'mail'),
+}
+
+# Минимум записей с названием, чтобы считать ответ списком участников
+MIN_RECORDS = 3
+
+# Размер страницы при загрузке через API (если сервер его не принимает, используется исходный)
+API_PAGE_SIZE = 100
+
+# Заголовки исходного запроса, которые нужно повторить
+REPLAY_HEADERS = ('accept', 'content-type', 'x-requested-with', 'accept-language')
+
+
+def capture_json_responses(driver):
+    """Ответы XHR/fetch с JSON из журнала производительности Chrome
+
+    Возвращает список (запрос, данные), где запрос - словарь url, method, headers, postData.
+    Драйвер должен быть запущен с goog:loggingPrefs {'performance': 'ALL'}.
+    """
+    requests_by_id = {}
+    json_responses = []
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        params = message.get('params', {})
+        if message.get('method') == 'Network.requestWillBeSent':
+            requests_by_id[params.get('requestId')] = params.get('request', {})
+        elif message.get('method') == 'Network.responseReceived':
+            response = params.get('response', {})
+            if params.get('type') in ('XHR', 'Fetch') and 'json' in response.get('mimeType', ''):
+                json_responses.append((params.get('requestId'), response.get('url')))
+
+    captured = []
+    for request_id, url in json_responses:
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            text = body.get('body', '')
+            if body.get('base64Encoded'):
+                text = base64.b64decode(text).decode('utf-8', errors='replace')
+            data = json.loads(text)
+        except Exception as e:
+            logger.debug(f"Не удалось получить тело ответа {url}: {e}")
+            continue
+        request = requests_by_id.get(request_id) or {'url': url, 'method': 'GET'}
+        captured.append((request, data))
+    return captured
+
+
+def find_record_list(data, path=()):
+    """Самый большой список записей с названием: (путь, количество) или (None, 0)"""
+    best_path, best_count = None, 0
+    if isinstance(data, list):
+        count = sum(1 for item in data if isinstance(item, dict) and record_name(item))
+        if count > best_count:
+            best_path, best_count = path, count
+        items = enumerate(data[:1])  # Вложенные списки ищем по первому элементу
+    elif isinstance(data, dict):
+        items = data.items()
+    else:
+        return best_path, best_count
+
+    for key, value in items:
+        if isinstance(value, (list, dict)):
+            nested_path, nested_count = find_record_list(value, path + (key,))
+            if nested_count > best_count:
+                best_path, best_count = nested_path, nested_count
+    return best_path, best_count
+
+
+def get_path(data, path):
+    for key in path:
+        try:
+            data = data[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return data
+
+
+def flatten_record(record):
+    """Скалярные значения записи по ключам в нижнем регистре (ближайший к корню ключ важнее)"""
+    values = {}
+    queue = deque([record])
+    while queue:
+        current = queue.popleft()
+        for key, value in current.items():
+            if isinstance(value, dict):
+                queue.append(value)
+            elif isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                values.setdefault(str(key).lower(), value)
+    return values
+
+
+def record_name(record):
+    values = flatten_record(record)
+    for key in FIELD_KEYS['Name']:
+        value = values.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+def map_record(record):
+    """Запись JSON -> словарь участника в формате парсеров"""
+    values = flatten_record(record)
+    exhibitor = {}
+    for field, keys in FIELD_KEYS.items():
+        exhibitor[field] = None
+        for key in keys:
+            value = values.get(key)
+            if isinstance(value, str) and value.strip():
+                exhibitor[field] = value.strip()
+                break
+
+    website = exhibitor['Website']
+    if website and not website.startswith('http'):
+        exhibitor['Website'] = f"https://{website}" if '.' in website else None
+    if not exhibitor['Email']:
+        exhibitor['Email'] = find_email(' '.join(str(value) for value in values.values()))
+    return exhibitor
+
+
+def record_hash(record):
+    """Отпечаток записи JSON для инкрементального режима"""
+    return hashlib.sha1(json.dumps(record, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def find_total(data):
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if str(key).lower() in TOTAL_KEYS and isinstance(value, int) and not isinstance(value, bool):
+                return value
+        for value in data.values():
+            if isinstance(value, dict):
+                total = find_total(value)
+                if total is not None:
+                    return total
+    return None
+
+
+class JsonEndpoint:
+    """JSON-API каталога: адрес, способ передачи параметров и параметры постраничной выдачи"""
+
+    def __init__(self, url, method='GET', headers=None, body=None, records_path=(),
+                 page_param=None, offset_param=None, size_param=None, start=0, size=None):
+        self.url = url                      # Адрес без параметров постраничной выдачи
+        self.method = method
+        self.headers = headers or {}
+        self.body = body                    # Тело POST-запроса (JSON) или None - параметры в URL
+        self.records_path = tuple(records_path)
+        self.page_param = page_param
+        self.offset_param = offset_param
+        self.size_param = size_param
+        self.start = start                  # Первый номер страницы или смещение
+        self.size = size
+
+    @property
+    def key(self):
+        return f"{self.method} {self.url}"
+
+    def to_dict(self):
+        return dict(self.__dict__, records_path=list(self.records_path))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def paging_values(self, index, size):
+        values = {}
+        if self.page_param:
+            values[self.page_param] = self.start + index
+        elif self.offset_param:
+            values[self.offset_param] = self.start + index * (size or 0)
+        if self.size_param and size:
+            values[self.size_param] = size
+        return values
+
+    def request_args(self, index, size):
+        """Аргументы session.request для страницы с номером index (с нуля)"""
+        values = self.paging_values(index, size)
+        if self.body is not None:
+            return {'method': self.method, 'url': self.url, 'json': dict(self.body, **values)}
+        parts = urlparse(self.url)
+        query = parse_qsl(parts.query, keep_blank_values=True) + [(k, str(v)) for k, v in values.items()]
+        return {'method': self.method, 'url': urlunparse(parts._replace(query=urlencode(query)))}
+
+    def fetch_records(self, session, index, size, headers=None):
+        args = self.request_args(index, size)
+        response = session.request(headers=dict(self.headers, **(headers or {})), timeout=30, **args)
+        response.raise_for_status()
+        data = response.json()
+        records = get_path(data, self.records_path)
+        return (records if isinstance(records, list) else []), data
+
+    def first_page(self, session, size, headers=None):
+        """Нумерация страниц с 0 или с 1: страница 0 считается первой, только если она отличается от страницы 1
+
+        Если был перехвачен запрос не первой страницы, выдача начинается с начала.
+        """
+        if self.offset_param:
+            return self.start if self.start <= 1 else 0
+        if not self.page_param or self.start == 0:
+            return self.start
+        return self.probe_first_page(session, size, headers)
+
+    def probe_first_page(self, session, size, headers=None):
+        """0 или 1: сравнение первых записей страниц 0 и 1"""
+        try:
+            self.start = 0
+            zero, _ = self.fetch_records(session, 0, size, headers)
+            self.start = 1
+            one, _ = self.fetch_records(session, 0, size, headers)
+        except Exception as e:
+            logger.debug(f"Страница 0 API {self.url} недоступна: {e}")
+            return 1
+        finally:
+            self.start = 1
+        if zero and (not one or record_hash(zero[0]) != record_hash(one[0])):
+            return 0
+        return 1
+
+    def pages(self, session, headers=None, max_pages=1000):
+        """Списки записей постранично, пока сервер их отдает"""
+        size = self.size
+        self.start = self.first_page(session, size, headers)
+        if self.size_param and API_PAGE_SIZE > (size or 0):
+            # Пробуем страницы побольше: меньше запросов на весь каталог. Сервер может ограничить
+            # размер страницы, поэтому шаг смещения и признак последней страницы - фактическое число записей
+            try:
+                records, data = self.fetch_records(session, 0, API_PAGE_SIZE, headers)
+                if len(records) > (size or 0):
+                    size = len(records)
+            except Exception as e:
+                logger.debug(f"Сервер не принял размер страницы {API_PAGE_SIZE}: {e}")
+
+        collected = 0
+        previous_first = None
+        for index in range(max_pages):
+            try:
+                records, data = self.fetch_records(session, index, size, headers)
+            except Exception as e:
+                logger.error(f"Ошибка загрузки страницы {index} API {self.url}: {e}")
+                return
+            if not records:
+                return
+            first = record_hash(records[0])
+            if first == previous_first:
+                logger.warning(f"API {self.url} возвращает одну и ту же страницу, остановка")
+                return
+            previous_first = first
+
+            yield records
+            collected += len(records)
+            if size is None:
+                size = len(records)  # Шаг смещения - размер первой страницы
+
+            total = find_total(data)
+            if (total is not None and collected >= total) or (size and len(records) < size):
+                return
+            if not (self.page_param or self.offset_param):
+                return  # Параметров постраничной выдачи нет - весь список в одном ответе
+
+
+def endpoint_from_request(request, records_path):
+    """JsonEndpoint по перехваченному запросу: параметры постраничной выдачи выносятся отдельно"""
+    parts = urlparse(request.get('url', ''))
+    method = request.get('method', 'GET').upper()
+    headers = {name: value for name, value in (request.get('headers') or {}).items()
+               if name.lower() in REPLAY_HEADERS}
+
+    body = None
+    if method == 'POST':
+        try:
+            body = json.loads(request.get('postData') or '')
+        except ValueError:
+            return None
+        if not isinstance(body, dict):
+            return None
+        params = list(body.items())
+        query = parts.query
+    else:
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        query = ''
+
+    endpoint = JsonEndpoint(None, method, headers, records_path=records_path)
+    kept = []
+    for name, value in params:
+        lowered = name.lower()
+        number = to_int(value)
+        if lowered in PAGE_PARAMS and number is not None and not endpoint.page_param:
+            endpoint.page_param, endpoint.start = name, number
+        elif lowered in OFFSET_PARAMS and number is not None and not endpoint.offset_param:
+            endpoint.offset_param, endpoint.start = name, number
+        elif lowered in SIZE_PARAMS and number is not None and not endpoint.size_param:
+            endpoint.size_param, endpoint.size = name, number
+        else:
+            kept.append((name, value))
+
+    if body is not None:
+        endpoint.body = dict(kept)
+    else:
+        query = urlencode(kept)
+    endpoint.url = urlunparse(parts._replace(query=query))
+    return endpoint
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def discover_endpoint(captured):
+    """Эндпоинт с наибольшим списком участников среди перехваченных ответов (или None)
+
+    Если страница подгружала несколько страниц одного API (прокрутка, "показать еще"),
+    выдача начинается с наименьшего увиденного номера страницы или смещения.
+    """
+    best = None
+    best_count = 0
+    starts = {}
+    for request, data in captured:
+        records_path, count = find_record_list(data)
+        if count < MIN_RECORDS:
+            continue
+        endpoint = endpoint_from_request(request, records_path)
+        if endpoint is None:
+            continue
+        starts[endpoint.key] = min(starts.get(endpoint.key, endpoint.start), endpoint.start)
+        if count > best_count:
+            best, best_count = endpoint, count
+
+    if best is None:
+        return None
+    best.start = starts[best.key]
+    if best.page_param and best.start > 1:
+        best.start = 1  # Увидели не первую страницу; 0 или 1 уточняется при загрузке
+    logger.info(f"Найден API каталога: {best.key} ({best_count} записей на странице, "
+                f"параметр страницы: {best.page_param or best.offset_param or 'нет'})")
+    return best